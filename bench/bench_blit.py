@@ -0,0 +1,95 @@
+"""
+Blit benchmark for the Interstate 75
+Compares the old per-pixel Python loop with webpdec.blit() when copying
+one RGB565 frame into the PicoGraphics framebuffer, and a full blit with
+webpdec.diff() plus a blit of just the changed regions (a ticking clock).
+
+Run on the device:
+    mpremote run bench/bench_blit.py
+"""
+
+import time
+import gc
+
+import webpdec
+from interstate75 import Interstate75, DISPLAY_INTERSTATE75_64X32, DISPLAY_INTERSTATE75_64X64
+
+# Panel under test and iterations per method
+WIDTH = 64
+HEIGHT = 32
+PIXEL_LOOP_ITERATIONS = 3
+BLIT_ITERATIONS = 200
+
+
+def python_loop(graphics, rgb565_data, width, height):
+    """The pre-webpdec.blit() display path, pixel by pixel."""
+    for y in range(height):
+        for x in range(width):
+            idx = (y * width + x) * 2
+            pixel = rgb565_data[idx] | (rgb565_data[idx + 1] << 8)
+            r = ((pixel >> 11) & 0x1F) << 3
+            g = ((pixel >> 5) & 0x3F) << 2
+            b = (pixel & 0x1F) << 3
+            graphics.set_pen(graphics.create_pen(r, g, b))
+            graphics.pixel(x, y)
+
+
+def time_us(fn, iterations):
+    """Average microseconds per call of fn()."""
+    gc.collect()
+    start = time.ticks_us()
+    for _ in range(iterations):
+        fn()
+    return time.ticks_diff(time.ticks_us(), start) // iterations
+
+
+def main():
+    display = DISPLAY_INTERSTATE75_64X64 if HEIGHT == 64 else DISPLAY_INTERSTATE75_64X32
+    i75 = Interstate75(display=display)
+    graphics = i75.display
+    fb = memoryview(graphics)
+
+    print("=" * 60)
+    print(f"[BENCH] Blit {WIDTH}x{HEIGHT}, framebuffer {len(fb) // (WIDTH * HEIGHT)} bytes/pixel")
+    print("=" * 60)
+
+    # Gradient test frame so every pixel differs
+    rgb565_data = bytearray(WIDTH * HEIGHT * 2)
+    for i in range(WIDTH * HEIGHT):
+        pixel = (i * 37) & 0xFFFF
+        rgb565_data[i * 2] = pixel & 0xFF
+        rgb565_data[i * 2 + 1] = pixel >> 8
+
+    loop_us = time_us(lambda: python_loop(graphics, rgb565_data, WIDTH, HEIGHT),
+                      PIXEL_LOOP_ITERATIONS)
+    blit_us = time_us(lambda: webpdec.blit(fb, rgb565_data), BLIT_ITERATIONS)
+    update_us = time_us(i75.update, 20)
+    
+    # A clock-like frame: the same image with one 5x7 digit changed
+    shown = bytearray(rgb565_data)
+    changed = bytearray(rgb565_data)
+    for y in range(10, 17):
+        for x in range(30, 35):
+            changed[(y * WIDTH + x) * 2] ^= 0xFF
+    
+    def diff_blit():
+        # Flip between the two frames so every call finds the digit
+        cur = changed if shown[(10 * WIDTH + 30) * 2] == rgb565_data[(10 * WIDTH + 30) * 2] else rgb565_data
+        rects = webpdec.diff(shown, cur, WIDTH)
+        webpdec.blit(fb, cur, rects, WIDTH)
+        return rects
+    
+    rects = diff_blit()
+    skipped = 100 - 100 * sum(w * h for _, _, w, h in rects) // (WIDTH * HEIGHT)
+    diff_us = time_us(diff_blit, BLIT_ITERATIONS)
+    unchanged_us = time_us(lambda: webpdec.diff(shown, shown, WIDTH), BLIT_ITERATIONS)
+
+    print(f"[BENCH] Python pixel loop: {loop_us / 1000:.1f} ms/frame")
+    print(f"[BENCH] webpdec.blit:      {blit_us / 1000:.3f} ms/frame")
+    print(f"[BENCH] i75.update:        {update_us / 1000:.3f} ms/frame")
+    print(f"[BENCH] Speedup:           {loop_us / max(blit_us, 1):.0f}x")
+    print(f"[BENCH] diff + rect blit:  {diff_us / 1000:.3f} ms/frame ({skipped}% of pixels skipped)")
+    print(f"[BENCH] diff, no change:   {unchanged_us / 1000:.3f} ms/frame (update skipped too)")
+
+
+main()
@@ -0,0 +1,158 @@
+/*
+ * Host benchmark for the webpdec output stage (webpdec/convert.c)
+ *
+ * Times convert_rows() on a 64x32 RGB888 frame against the plain shift
+ * conversion it replaced, with and without dithering, so changes to the
+ * per-pixel loop can be checked on a PC without flashing a board.
+ *
+ * Build and run from the repo root (-fno-tree-vectorize keeps the host
+ * compiler from using SIMD, which the RP2350's Cortex-M33 doesn't have):
+ *   cc -O2 -fno-tree-vectorize -Iwebpdec bench/bench_convert.c webpdec/convert.c -lm -o /tmp/bench_convert
+ *   /tmp/bench_convert
+ *
+ * Exits with 1 if dithering costs more than DITHER_TOLERANCE percent over
+ * the undithered conversion to the same format.
+ */
+
+#include <stdio.h>
+#include <stdlib.h>
+#include <string.h>
+#include <time.h>
+
+#include "convert.h"
+
+#define WIDTH (64)
+#define HEIGHT (32)
+#define FRAMES (4000)
+#define RUNS (25)
+
+#define PAIRS (401)
+
+// Most dithering may add to a conversion, in percent
+#define DITHER_TOLERANCE (5.0)
+
+static uint8_t src[WIDTH * HEIGHT * 3];
+static uint8_t dst[WIDTH * HEIGHT * 4];
+
+// The conversion before colour correction: plain shifts, no tables
+static void plain_rgb565(const uint8_t *rgb, uint8_t *out, size_t num_pixels) {
+    for (size_t i = 0; i < num_pixels; i++, rgb += 3) {
+        uint16_t p = ((rgb[0] & 0xF8) << 8) | ((rgb[1] & 0xFC) << 3) | (rgb[2] >> 3);
+        *out++ = p & 0xFF;
+        *out++ = p >> 8;
+    }
+}
+
+static double now_s(void) {
+    struct timespec ts;
+    clock_gettime(CLOCK_MONOTONIC, &ts);
+    return ts.tv_sec + ts.tv_nsec / 1e9;
+}
+
+static int compare_double(const void *a, const void *b) {
+    double x = *(const double *)a, y = *(const double *)b;
+    return (x > y) - (x < y);
+}
+
+// Report the best of RUNS and return its time per frame in microseconds
+static double report(const char *name, const double *elapsed) {
+    double best = elapsed[0];
+    for (int i = 1; i < RUNS; i++) {
+        best = elapsed[i] < best ? elapsed[i] : best;
+    }
+    double us = best * 1e6 / FRAMES;
+    printf("[BENCH] %-26s %7.2f us/frame  %6.1f Mpix/s\n", name, us, WIDTH * HEIGHT / us);
+    return us;
+}
+
+static double bench_plain(void) {
+    double elapsed[RUNS];
+    for (int run = 0; run < RUNS; run++) {
+        double start = now_s();
+        for (int i = 0; i < FRAMES; i++) {
+            plain_rgb565(src, dst, WIDTH * HEIGHT);
+        }
+        elapsed[run] = now_s() - start;
+    }
+    return report("plain shift (RGB565)", elapsed);
+}
+
+static double bench_rows(const char *name, int fmt) {
+    convert_out_t out;
+    convert_out_init(&out, fmt, dst, WIDTH, HEIGHT, NULL, 0);
+
+    double elapsed[RUNS];
+    for (int run = 0; run < RUNS; run++) {
+        double start = now_s();
+        for (int i = 0; i < FRAMES; i++) {
+            convert_rows(&out, src, WIDTH * 3, 3, 0, HEIGHT);
+        }
+        elapsed[run] = now_s() - start;
+    }
+    return report(name, elapsed);
+}
+
+/*
+ * Dithered over undithered time for one format, in percent
+ * 
+ * The two alternate in short runs and the result is the median of each
+ * pair's ratio, so a busy host slows both alike rather than skewing it.
+ */
+static double dither_cost(const float *gamma, const float *brightness, int fmt) {
+    convert_out_t out;
+    convert_out_init(&out, fmt, dst, WIDTH, HEIGHT, NULL, 0);
+
+    double ratios[PAIRS];
+    for (int run = 0; run < PAIRS; run++) {
+        double elapsed[2];
+        for (int d = 0; d < 2; d++) {
+            convert_lut_set(gamma, brightness, d ? CONVERT_DITHER_ORDERED : CONVERT_DITHER_NONE);
+            double start = now_s();
+            for (int i = 0; i < FRAMES / 16; i++) {
+                convert_rows(&out, src, WIDTH * 3, 3, 0, HEIGHT);
+            }
+            elapsed[d] = now_s() - start;
+        }
+        ratios[run] = elapsed[1] / elapsed[0];
+    }
+    qsort(ratios, PAIRS, sizeof(ratios[0]), compare_double);
+    return (ratios[PAIRS / 2] - 1) * 100;
+}
+
+int main(void) {
+    // Gradient so every pixel differs
+    for (int i = 0; i < WIDTH * HEIGHT; i++) {
+        src[i * 3 + 0] = i * 7;
+        src[i * 3 + 1] = i * 3;
+        src[i * 3 + 2] = i >> 3;
+    }
+
+    printf("[BENCH] %dx%d frame, best of %d runs of %d frames\n", WIDTH, HEIGHT, RUNS, FRAMES);
+
+    double plain = bench_plain();
+    double identity = bench_rows("LUT identity (RGB565)", CONVERT_RGB565);
+
+    const float gamma[3] = { 2.2f, 2.2f, 2.2f };
+    const float brightness[3] = { 0.5f, 0.5f, 0.5f };
+    convert_lut_set(gamma, brightness, CONVERT_DITHER_NONE);
+    double corrected = bench_rows("LUT gamma 2.2, 50% (RGB565)", CONVERT_RGB565);
+    bench_rows("LUT gamma 2.2, 50% (RGB888)", CONVERT_RGB888);
+    bench_rows("LUT gamma 2.2, 50% (RGB332)", CONVERT_RGB332);
+
+    convert_lut_set(gamma, brightness, CONVERT_DITHER_ORDERED);
+    bench_rows("Bayer dither (RGB565)", CONVERT_RGB565);
+    bench_rows("Bayer dither (RGB565 BE)", CONVERT_RGB565_BE);
+    bench_rows("Bayer dither (RGB332)", CONVERT_RGB332);
+
+    printf("[BENCH] LUT vs plain: identity %+.1f%%, corrected %+.1f%%\n",
+        (identity / plain - 1) * 100, (corrected / plain - 1) * 100);
+
+    double cost565 = dither_cost(gamma, brightness, CONVERT_RGB565);
+    double cost332 = dither_cost(gamma, brightness, CONVERT_RGB332);
+    printf("[BENCH] Dither vs undithered: RGB565 %+.1f%%, RGB332 %+.1f%%\n", cost565, cost332);
+    if (cost565 > DITHER_TOLERANCE || cost332 > DITHER_TOLERANCE) {
+        printf("[BENCH] FAIL: dithering costs more than %.0f%%\n", DITHER_TOLERANCE);
+        return 1;
+    }
+    return 0;
+}
@@ -0,0 +1,167 @@
+"""
+Decode benchmark for webpdec
+Runs every file in bench/corpus through header probing, decoding into
+each pen format (stills with decode_into(), animations frame by frame
+with Animation) and blit(), and reports ms/frame, bytes allocated per
+frame and peak heap. Results are compared with bench/baseline.json; the
+exit status is 1 if any case got slower than TIME_TOLERANCE allows or
+allocates more than it did, or (with --require-baseline, as in CI) if
+there is no baseline.
+
+Build the MicroPython unix port with webpdec, from a micropython checkout:
+    make -C mpy-cross
+    make -C ports/unix submodules
+    make -C ports/unix USER_C_MODULES=/path/to/tronbyt-interstate75
+
+Run from the repo root:
+    micropython bench/bench_decode.py          # compare with the baseline
+    micropython bench/bench_decode.py --save   # record a new baseline
+
+Timings are per machine, allocations are not (for a given MicroPython
+version on a 64-bit build). The committed baseline only holds the
+allocations, so CI checks those; cases without "ms" aren't timed
+against anything. --save records both, for comparing on one machine.
+bench/make_corpus.py regenerates the corpus.
+"""
+
+import gc
+import json
+import os
+import sys
+import time
+
+import webpdec
+
+CORPUS_DIR = "bench/corpus"
+BASELINE = "bench/baseline.json"
+ITERATIONS = 20             # Passes over each still or animation
+TIME_TOLERANCE = 0.20       # Slowdown allowed before a case fails...
+TIME_SLACK_MS = 0.01        # ...and never less than this (timer noise)
+
+# Pen formats to decode into: name, FMT_* constant, bytes per pixel
+FORMATS = (
+    ("rgb565", webpdec.FMT_RGB565, 2),
+    ("rgb888", webpdec.FMT_RGB888, 4),
+    ("rgb332", webpdec.FMT_RGB332, 1),
+)
+
+
+def measure(fn, iterations):
+    """Time iterations calls of fn(), which returns the frames it showed.
+
+    The GC is off while timing so nothing is freed: the heap growth is
+    what the calls allocated, and the heap at the end is the peak.
+    Returns (ms per frame, bytes allocated per frame, peak heap bytes).
+    """
+    gc.collect()
+    gc.disable()
+    base = gc.mem_alloc()
+    frames = 0
+    start = time.ticks_us()
+    for _ in range(iterations):
+        frames += fn()
+    elapsed = time.ticks_diff(time.ticks_us(), start)
+    peak = gc.mem_alloc()
+    gc.enable()
+    frames = max(frames, 1)
+    return elapsed / 1000 / frames, (peak - base) // frames, peak
+
+
+def bench_file(name, data):
+    """Benchmark one corpus file; returns {case: result}."""
+    info = webpdec.info(data)
+    width, height = info["width"], info["height"]
+    kind = "animation" if info["animated"] else "still"
+    print(f"[BENCH] {name}: {width}x{height} {kind}, {info['frames']} frames, "
+          f"{'lossless' if info['lossless'] else 'lossy'}, {len(data)} bytes")
+
+    results = {}
+    results[name + ":info"] = measure(lambda: webpdec.info(data) and 1, ITERATIONS)
+
+    rgb565 = None
+    for fmt_name, fmt, bpp in FORMATS:
+        buf = bytearray(width * height * bpp)
+        if info["animated"]:
+            anim = webpdec.Animation(data, buf, fmt=fmt)
+
+            def play():
+                anim.rewind()
+                n = 0
+                for _ in anim:
+                    n += 1
+                return n
+            fn = play
+        else:
+            def fn():
+                webpdec.decode_into(data, buf, fmt=fmt)
+                return 1
+        results[f"{name}:{fmt_name}"] = measure(fn, ITERATIONS)
+        if fmt == webpdec.FMT_RGB565:
+            rgb565 = buf
+
+    # The RGB565 fallback path: blit the last frame into an RGB888 framebuffer
+    fb = bytearray(width * height * 4)
+    results[name + ":blit"] = measure(lambda: webpdec.blit(fb, rgb565) or 1, ITERATIONS)
+
+    arena = webpdec.arena_info(reset=True)
+    print(f"[BENCH]   arena peak {arena['peak']}/{arena['size']} bytes")
+    return results
+
+
+def compare(results, baseline):
+    """Print regressions against the baseline; returns how many."""
+    failures = 0
+    for case, (ms, alloc, _) in results.items():
+        if case not in baseline:
+            continue
+        base = baseline[case]
+        if "ms" in base and ms > base["ms"] * (1 + TIME_TOLERANCE) and ms - base["ms"] > TIME_SLACK_MS:
+            print(f"[BENCH] REGRESSION {case}: {ms:.3f} ms/frame, baseline {base['ms']:.3f}")
+            failures += 1
+        if alloc > base["alloc"]:
+            print(f"[BENCH] REGRESSION {case}: {alloc} bytes/frame allocated, baseline {base['alloc']}")
+            failures += 1
+    return failures
+
+
+def main():
+    save = "--save" in sys.argv
+
+    results = {}
+    for name in sorted(os.listdir(CORPUS_DIR)):
+        if not name.endswith(".webp"):
+            continue
+        with open(CORPUS_DIR + "/" + name, "rb") as f:
+            data = f.read()
+        results.update(bench_file(name, data))
+
+    print("[BENCH]")
+    print("[BENCH] %-40s %10s %10s %10s" % ("case", "ms/frame", "B/frame", "peak heap"))
+    for case in sorted(results):
+        ms, alloc, peak = results[case]
+        print("[BENCH] %-40s %10.3f %10d %10d" % (case, ms, alloc, peak))
+
+    if save:
+        with open(BASELINE, "w") as f:
+            json.dump({case: {"ms": round(ms, 4), "alloc": alloc}
+                       for case, (ms, alloc, _) in results.items()}, f)
+        print(f"[BENCH] Baseline saved to {BASELINE}")
+        return
+
+    try:
+        with open(BASELINE) as f:
+            baseline = json.load(f)
+    except OSError:
+        print(f"[BENCH] No baseline at {BASELINE}; run with --save to record one")
+        if "--require-baseline" in sys.argv:
+            sys.exit(1)
+        return
+
+    failures = compare(results, baseline)
+    if failures:
+        print(f"[BENCH] FAILED: {failures} regressions")
+        sys.exit(1)
+    print("[BENCH] OK: no regressions against the baseline")
+
+
+main()
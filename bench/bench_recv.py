@@ -0,0 +1,118 @@
+"""
+HTTP receive benchmark
+Serves WebP-sized bodies (20-60 KB, like Pixlet animations) over a
+loopback socket and times the two ways main.py has received them:
+
+  concat    recv() 4 KB at a time, response += chunk, then slice the
+            headers and body out of the response (the old fetch loop)
+  readinto  recv() just the headers, then readinto() a buffer allocated
+            once and take a memoryview of the body (HttpClient)
+
+Reports ms per response and bytes allocated per response for each.
+Runs on the MicroPython unix port (see bench/bench_decode.py for the
+build line; webpdec isn't needed), from the repo root:
+    micropython bench/bench_recv.py
+"""
+
+import gc
+import socket
+import time
+import _thread
+
+SIZES = (20 * 1024, 40 * 1024, 60 * 1024)
+ITERATIONS = 20
+PORT = 8575
+
+
+def serve(listener, body):
+    """Answer ITERATIONS requests per connection with body, then close."""
+    # One write per response, built up front: no Nagle stalls, and the
+    # server thread allocates the same (next to nothing) for both methods
+    response = b"HTTP/1.1 200 OK\r\nContent-Type: image/webp\r\nContent-Length: %d\r\n\r\n" % len(body) + body
+    while True:
+        conn, _ = listener.accept()
+        for _ in range(ITERATIONS):
+            if not conn.readline():
+                break
+            while conn.readline() not in (b"\r\n", b""):
+                pass
+            conn.write(response)
+        conn.close()
+
+
+def request(s):
+    s.write(b"GET /next HTTP/1.1\r\nHost: localhost\r\n\r\n")
+
+
+def recv_concat(s, size):
+    # Body length is known to the benchmark, not parsed
+    request(s)
+    response = b""
+    while True:
+        chunk = s.recv(4096)
+        if not chunk:
+            break
+        response += chunk
+        header_end = response.find(b"\r\n\r\n")
+        if header_end != -1 and len(response) - header_end - 4 >= size:
+            break
+    headers = response[:header_end]
+    body = response[header_end + 4:]
+    return len(body)
+
+
+def recv_readinto(s, size, mv):
+    request(s)
+    data = b""
+    while True:
+        data += s.recv(1024)
+        end = data.find(b"\r\n\r\n")
+        if end != -1:
+            break
+    length = 0
+    for line in data[:end].split(b"\r\n"):
+        if line.lower().startswith(b"content-length:"):
+            length = int(line[15:])
+    received = len(data) - end - 4
+    mv[:received] = data[end + 4:]
+    while received < length:
+        received += s.readinto(mv[received:length])
+    return len(mv[:received])
+
+
+def measure(fn):
+    """Time ITERATIONS responses; returns (ms per response, bytes allocated per response)."""
+    gc.collect()
+    gc.disable()
+    base = gc.mem_alloc()
+    start = time.ticks_us()
+    for _ in range(ITERATIONS):
+        fn()
+    elapsed = time.ticks_diff(time.ticks_us(), start)
+    alloc = gc.mem_alloc() - base
+    gc.enable()
+    return elapsed / 1000 / ITERATIONS, alloc // ITERATIONS
+
+
+def main():
+    print("[BENCH] %-10s %8s %10s %10s" % ("method", "bytes", "ms/resp", "B/resp"))
+    for i, size in enumerate(SIZES):
+        body = bytes(range(256)) * (size // 256)
+        listener = socket.socket()
+        listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        listener.bind(socket.getaddrinfo("127.0.0.1", PORT + i)[0][-1])
+        listener.listen(1)
+        _thread.start_new_thread(serve, (listener, body))
+
+        buf = bytearray(64 * 1024)
+        mv = memoryview(buf)
+        for name, fn in (("concat", lambda: recv_concat(s, size)),
+                         ("readinto", lambda: recv_readinto(s, size, mv))):
+            s = socket.socket()
+            s.connect(socket.getaddrinfo("127.0.0.1", PORT + i)[0][-1])
+            ms, alloc = measure(fn)
+            s.close()
+            print("[BENCH] %-10s %8d %10.3f %10d" % (name, size, ms, alloc))
+
+
+main()
@@ -0,0 +1,86 @@
+"""
+Generate the WebP corpus for bench/bench_decode.py
+Renders Pixlet-style content (small bitmap text on black, a scrolling
+marquee, a photo-like gradient) at the panel sizes Tronbyt serves, as
+static and animated, lossy and lossless files in bench/corpus/.
+
+Runs on the host with CPython and Pillow (built with WebP support):
+    pip install pillow
+    python3 bench/make_corpus.py
+"""
+
+import math
+import os
+
+from PIL import Image, ImageDraw, ImageFont
+
+SIZES = ((64, 32), (64, 64), (128, 64))
+FRAMES = 20
+FRAME_MS = 50
+CORPUS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "corpus")
+
+
+def clock(size, frame=0):
+    """Big digits with a blinking colon, like the Pixlet clock app."""
+    img = Image.new("RGB", size)
+    draw = ImageDraw.Draw(img)
+    font = ImageFont.load_default()
+    text = "12:34" if frame % 2 == 0 else "12 34"
+    w = draw.textlength(text, font=font)
+    draw.text(((size[0] - w) // 2, size[1] // 2 - 6), text, font=font, fill=(255, 160, 0))
+    draw.line((4, size[1] - 6, size[0] - 5, size[1] - 6), fill=(40, 40, 40))
+    return img
+
+
+def marquee(size, frame=0):
+    """Scrolling text over a header bar, like news and ticker apps."""
+    img = Image.new("RGB", size)
+    draw = ImageDraw.Draw(img)
+    font = ImageFont.load_default()
+    draw.rectangle((0, 0, size[0] - 1, 8), fill=(0, 60, 140))
+    draw.text((2, -2), "NEWS", font=font, fill=(255, 255, 255))
+    text = "Tronbyt on the Interstate 75 - scrolling text"
+    x = size[0] // 2 - frame * 3
+    draw.text((x, size[1] // 2), text, font=font, fill=(0, 255, 120))
+    return img
+
+
+def photo(size, frame=0):
+    """Smooth colour gradients with noise, like weather and image apps."""
+    img = Image.new("RGB", size)
+    px = img.load()
+    for y in range(size[1]):
+        for x in range(size[0]):
+            t = frame / FRAMES * 2 * math.pi
+            r = int(127 + 127 * math.sin(x / 9 + t))
+            g = int(127 + 127 * math.sin(y / 7 + x / 23))
+            b = int(127 + 127 * math.cos((x + y) / 13 - t))
+            n = (x * 7919 + y * 104729 + frame * 31) % 17 - 8
+            px[x, y] = (max(0, min(255, r + n)), max(0, min(255, g + n)), max(0, min(255, b + n)))
+    return img
+
+
+def save(name, frames, lossless):
+    path = os.path.join(CORPUS_DIR, name)
+    opts = {"lossless": lossless, "quality": 80, "method": 6}
+    if len(frames) > 1:
+        frames[0].save(path, save_all=True, append_images=frames[1:],
+                       duration=FRAME_MS, loop=0, **opts)
+    else:
+        frames[0].save(path, **opts)
+    print(f"{name}: {os.path.getsize(path)} bytes")
+
+
+def main():
+    os.makedirs(CORPUS_DIR, exist_ok=True)
+    for size in SIZES:
+        tag = f"{size[0]}x{size[1]}"
+        # Pixlet encodes text apps losslessly; photos compress better lossy
+        save(f"clock_{tag}.webp", [clock(size)], lossless=True)
+        save(f"photo_{tag}_lossy.webp", [photo(size)], lossless=False)
+        save(f"marquee_{tag}_anim.webp", [marquee(size, i) for i in range(FRAMES)], lossless=True)
+        save(f"photo_{tag}_anim_lossy.webp", [photo(size, i) for i in range(FRAMES)], lossless=False)
+
+
+if __name__ == "__main__":
+    main()
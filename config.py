@@ -18,9 +18,92 @@ DISPLAY_HEIGHT = 32
 # Update/Retry configuration
 MAX_RETRIES = 3           # Number of fetch retries
 RETRY_DELAY = 2           # Seconds between retries
+RETRY_MAX_DELAY = 60      # Failed fetches in a row back off, doubling up to this
 
 # Debug mode (prints extra info on serial console)
 DEBUG = False
 
 # Default brightness (0-100) - overridden by server header if provided
 DEFAULT_BRIGHTNESS = 50
+
+# Gamma correction applied while decoding, so dim colours don't wash out
+# on the LEDs. A float, or an (r, g, b) tuple for per-channel gamma;
+# 1.0 turns it off.
+GAMMA = 2.2
+
+# Dithering when quantising to RGB565/RGB332 pens, to hide banding on
+# gradients: "none", "ordered" (4x4 Bayer) or "temporal" (the Bayer
+# pattern moves every animation frame). RGB888 pens don't need it.
+DITHER = "none"
+
+# Fitting server images to the panel: IMAGE_SCALE is an integer upscale
+# (0 = largest that fits, e.g. 64x32 -> 128x64); images that are still too
+# big are center-cropped. IMAGE_VIEWPORT = (x, y, w, h) shows just that
+# part of the source image.
+IMAGE_SCALE = 0
+IMAGE_VIEWPORT = None
+
+# PicoGraphics pen type: None for the Interstate 75 default (RGB888), or
+# "RGB565", "RGB332" or "P8" to save framebuffer memory on big panels.
+# Frames are decoded straight into whichever format is in use.
+PEN_TYPE = None
+
+# Largest source image (width * height) to decode. Bigger or malformed
+# payloads are rejected from their headers, before any decoding.
+MAX_IMAGE_PIXELS = 128 * 128
+
+# Diff each frame against the one on the panel and draw only what
+# changed (unchanged frames skip the panel update). Costs one extra frame
+# of RAM; turn off on big panels if memory is tight.
+FRAME_DIFF = True
+
+# Pipelined mode: decode and animate on the RP2350's second core while
+# the first fetches the next app, so apps switch without waiting for the
+# network. Needs _thread; streaming decode is not used in this mode.
+PIPELINE = False
+
+# Decode into a back buffer and flip it to the panel in one step, so a
+# frame is never shown half-drawn. Costs one framebuffer of RAM.
+DOUBLE_BUFFER = True
+
+# Response bodies are received into a buffer of this many bytes,
+# allocated once at startup (twice with PIPELINE). A bigger response
+# grows it, once; one over MAX_BODY_BYTES is refused.
+HTTP_BUFFER_SIZE = 64 * 1024
+MAX_BODY_BYTES = 256 * 1024
+
+# Seconds a resolved server address is reused before looking it up
+# again. If a lookup fails, the last address that worked is used.
+DNS_TTL = 300
+
+# The endpoint that last served a frame (after any redirect) is saved to
+# flash and used directly; the API paths are only probed again after
+# it answers 404/410 this many times in a row (an unreachable server
+# just backs off).
+ENDPOINT_RETRIES = 3
+
+# Fetch the next app this many seconds before the current dwell ends and
+# decode its first frame ahead, so apps switch with no gap. Costs a
+# second body buffer and a framebuffer of RAM; 0 turns it off. Not used
+# with PIPELINE, which overlaps fetching on its own.
+PREFETCH_SECS = 3
+
+# Push mode: keep a WebSocket open to the server's device socket
+# (PUSH_PATH, {id} being DISPLAY_ID) and show frames the moment they're
+# pushed, instead of polling once per dwell. If the server has no socket,
+# the client polls and tries it again every PUSH_RETRY_SECS. Off by
+# default: the message format follows tools/push_server.py and hasn't
+# been checked against a Tronbyt server yet. Set True to try it.
+PUSH = False
+PUSH_PATH = "/{id}/ws"
+PUSH_RETRY_SECS = 300
+
+# The last CACHE_FRAMES frames received (CACHE_BYTES in all at most) are
+# kept in /cache on flash and replayed at boot while WiFi comes up, so
+# content is back on the panel within a second, and whenever the server
+# can't be reached. Live content replaces them as soon as it arrives.
+# 0 turns the cache off. CACHE_DIR = None keeps them in RAM instead
+# (nothing to replay at boot, and CACHE_BYTES comes out of the heap).
+CACHE_FRAMES = 8
+CACHE_BYTES = 256 * 1024
+CACHE_DIR = "cache"
@@ -87,6 +87,18 @@ except ImportError as e:
     print(f"[MAIN] WARNING: webpdec module not found: {e}")
     WEBP_AVAILABLE = False
 
+# Second core for the optional pipelined mode (PIPELINE in config)
+try:
+    import _thread
+except ImportError:
+    _thread = None
+
+# Fetching, playback, WiFi and housekeeping run as tasks on one scheduler
+try:
+    import asyncio
+except ImportError:
+    import uasyncio as asyncio
+
 # Display driver imports - try different options
 print("[MAIN] Detecting display driver...")
 BOARD_TYPE = "unknown"
@@ -114,9 +126,767 @@ print("[MAIN] All imports completed successfully")
 print("="*60)
 
 
+class PayloadHandoff:
+    """Lock-protected double buffer passing payloads from core 0 to core 1.
+    
+    The front slot holds what core 1 is showing and the back slot what
+    core 0 fetched next; take() flips them once core 1 is ready for it.
+    
+    Core 1 owns the display, so it also carries the other traffic
+    between the cores: status messages core 0 wants shown, and core 1's
+    word that a payload failed to play.
+    """
+    
+    def __init__(self):
+        self._lock = _thread.allocate_lock()
+        self._front = None
+        self._back = None
+        self._message = None
+        self._failed = False
+    
+    def put(self, payload):
+        """Queue the next payload; False while the back slot is still full."""
+        with self._lock:
+            if self._back is not None:
+                return False
+            self._back = payload
+            return True
+    
+    def empty(self):
+        """True once core 1 has taken the queued payload."""
+        return self._back is None
+    
+    def take(self):
+        """Flip to the queued payload and return it, or None if there's none."""
+        with self._lock:
+            if self._back is None:
+                return None
+            self._front, self._back = self._back, None
+            # Whatever it said is stale once there's an app to show
+            self._message = None
+            return self._front
+    
+    def post_message(self, text, color):
+        """Ask core 1 to show a status message (replacing any not yet shown)."""
+        with self._lock:
+            self._message = (text, color)
+    
+    def take_message(self):
+        """The status message to show, or None."""
+        with self._lock:
+            message, self._message = self._message, None
+            return message
+    
+    def fail(self):
+        """Core 1 couldn't play the payload it took."""
+        with self._lock:
+            self._failed = True
+    
+    def take_failure(self):
+        """True once after fail()."""
+        with self._lock:
+            failed, self._failed = self._failed, False
+            return failed
+
+
+class HttpClient:
+    """HTTP/1.1 client keeping one connection open between requests.
+    
+    Sockets are non-blocking asyncio streams: while a request waits on
+    the network, other tasks run. A request that takes longer than
+    timeout seconds in all is abandoned.
+    
+    Requests reuse the socket for as long as the server allows. A
+    connection the server has since closed (idle timeout, restart) is
+    replaced and the request retried transparently; a request to another
+    host opens a new connection.
+    
+    Resolved addresses are cached for dns_ttl seconds, so reconnecting
+    doesn't cost a DNS query; when a lookup fails, the last address that
+    resolved is used instead.
+    
+    Bodies (Content-Length, chunked or read to close) are received with
+    readinto() into a buffer allocated once (grown only for a bigger
+    response) and returned as a memoryview of it, valid until the next
+    request into the same buffer. With
+    buffers=2, next_buffer() switches between two so one body can be
+    in use while the next is received. A body over max_body bytes, or
+    one there isn't the RAM for, fails the request with OSError and
+    leaves the buffers as they were.
+    
+    upgrade() turns the connection into a WebSocket instead, for push
+    mode: binary messages are received into the same buffers.
+    """
+    
+    WS_TEXT = 1
+    WS_BINARY = 2
+    WS_CLOSE = 8
+    WS_PING = 9
+    WS_PONG = 10
+    WS_TEXT_MAX = 512       # Text messages are short JSON control messages
+    HEAD_MAX = 8 * 1024     # Status line and headers
+    
+    def __init__(self, timeout=10, buffer_size=64 * 1024, buffers=1, dns_ttl=300,
+                 max_body=256 * 1024):
+        self.timeout = timeout
+        self.max_body = max_body
+        self.dns_ttl = dns_ttl
+        self._dns = {}          # (host, port) -> [address, ticks_ms resolved]
+        self.dns_hits = 0
+        self.dns_misses = 0     # Lookups sent to the resolver
+        self.dns_failures = 0   # ...that failed (the cached address was used)
+        self._reader = None
+        self._writer = None
+        self._addr = None       # (host, port) the socket is connected to
+        self._bufs = [bytearray(buffer_size) for _ in range(buffers)]
+        self._buf_index = 0
+        self.connects = 0       # Connections opened
+        self.reused = 0         # Requests served on an open connection
+        self.recv_us = 0        # Time spent receiving the last body
+        self.body_size = 0      # ...and its length
+        # Bumped whenever a body buffer is written to: a body returned
+        # earlier is intact while this hasn't changed
+        self.body_generation = 0
+        self._mv = None         # Body being received, and its state
+        self._received = 0
+        self._pending = None
+        self._status = 0
+        self._start = None
+        self._feed = None
+        self._streaming = False
+    
+    def next_buffer(self):
+        """Receive the next bodies into the other buffer."""
+        self._buf_index = (self._buf_index + 1) % len(self._bufs)
+    
+    def spare_buffer(self, n):
+        """n bytes of the buffer bodies aren't being received into, for
+        a body from elsewhere (the frame cache)."""
+        i = (self._buf_index + 1) % len(self._bufs)
+        if len(self._bufs[i]) < n:
+            self._allocate(i, n)
+        self.body_generation += 1
+        return memoryview(self._bufs[i])[:n]
+    
+    def close(self):
+        """Drop the connection (the next request opens a new one)."""
+        if self._writer is not None:
+            try:
+                self._writer.close()
+            except OSError:
+                pass
+        self._reader = self._writer = None
+        self._addr = None
+    
+    def _resolve(self, host, port):
+        """Address for host:port, from the cache while it's fresh.
+        
+        The lookup itself blocks, which is one more reason to cache it.
+        """
+        import socket
+        key = (host, port)
+        entry = self._dns.get(key)
+        now = time.ticks_ms()
+        if entry is not None:
+            age = time.ticks_diff(now, entry[1])
+            if 0 <= age < self.dns_ttl * 1000:
+                self.dns_hits += 1
+                return entry[0]
+        
+        self.dns_misses += 1
+        try:
+            addr = socket.getaddrinfo(host, port)[0][-1]
+        except OSError as e:
+            if entry is None:
+                raise
+            # Keep the last good address, and don't stall on the resolver
+            # again until another TTL has passed
+            self.dns_failures += 1
+            print(f"[HTTP] DNS lookup for {host} failed ({e}), using last known address")
+            entry[1] = now
+            return entry[0]
+        self._dns[key] = [addr, now]
+        return addr
+    
+    def stats(self):
+        """Connection and DNS cache counters, for logging."""
+        return (f"{self.connects} connections, {self.reused} reused; DNS "
+                f"{self.dns_hits} hits, {self.dns_misses} misses, "
+                f"{self.dns_failures} failures")
+    
+    async def _connect(self, host, port):
+        self.close()
+        if DEBUG:
+            print(f"[HTTP] Connecting to {host}:{port}")
+        addr = self._resolve(host, port)
+        # Connect to the address itself, so open_connection() has nothing
+        # to look up (ports that give raw sockaddrs fall back to the name)
+        ip = addr[0] if isinstance(addr, tuple) else host
+        try:
+            self._reader, self._writer = await asyncio.open_connection(ip, port)
+        except OSError:
+            # The server may have moved: look it up again next time (the
+            # address stays as the fallback if that lookup fails)
+            entry = self._dns.get((host, port))
+            if entry is not None:
+                entry[1] = time.ticks_add(time.ticks_ms(), -self.dns_ttl * 1000)
+            raise
+        self._addr = (host, port)
+        self.connects += 1
+    
+    async def _read_head(self):
+        """Receive and parse the status line and headers.
+        
+        Chunks are scanned for the blank line as they arrive, and only
+        joined once it's found. Returns (version, status, headers, rest):
+        headers with lowercase names, and whatever body bytes came in
+        with them. Headers over HEAD_MAX bytes close the connection with
+        OSError.
+        """
+        chunks = []
+        size = 0
+        tail = b""
+        end = -1
+        while end == -1:
+            if size > self.HEAD_MAX:
+                self.close()
+                raise OSError(f"Response headers over {self.HEAD_MAX} bytes")
+            chunk = await self._reader.read(1024)
+            if not chunk:
+                raise OSError("Connection closed before response headers")
+            # The blank line may straddle the last chunk
+            end = (tail + chunk).find(b"\r\n\r\n")
+            if end != -1:
+                end += size - len(tail)
+            chunks.append(chunk)
+            size += len(chunk)
+            tail = (tail + chunk)[-3:]
+        if end > self.HEAD_MAX:
+            self.close()
+            raise OSError(f"Response headers over {self.HEAD_MAX} bytes")
+        
+        data = b"".join(chunks)
+        
+        lines = data[:end].decode('utf-8', 'ignore').split("\r\n")
+        parts = lines[0].split()
+        if len(parts) < 2 or not parts[1].isdigit():
+            raise ValueError("Invalid HTTP status line")
+        headers = {}
+        for line in lines[1:]:
+            if ':' in line:
+                key, value = line.split(':', 1)
+                headers[key.strip().lower()] = value.strip()
+        return parts[0], int(parts[1]), headers, data[end + 4:]
+    
+    async def get(self, host, port, path, headers=None, start=None, feed=None):
+        """GET path from host:port; returns (status, headers, body, streamed).
+        
+        body is a memoryview of the body buffer. With start and feed,
+        start(status, body) is called as body bytes arrive: None asks for
+        more, False keeps buffering, True means it took the body so far
+        and the rest goes to feed(chunk) as it's received. streamed is
+        True in that case.
+        """
+        try:
+            return await asyncio.wait_for(
+                self._request(host, port, path, headers, start, feed), self.timeout)
+        except asyncio.TimeoutError:
+            self.close()
+            raise OSError(f"Request to {host}:{port} timed out")
+    
+    async def _request(self, host, port, path, headers, start, feed):
+        lines = [f"GET {path} HTTP/1.1", f"Host: {host}:{port}"]
+        if headers:
+            for name, value in headers.items():
+                lines.append(f"{name}: {value}")
+        request = ("\r\n".join(lines) + "\r\n\r\n").encode()
+        
+        for attempt in range(2):
+            reuse = attempt == 0 and self._addr == (host, port)
+            if not reuse:
+                await self._connect(host, port)
+            try:
+                self._writer.write(request)
+                await self._writer.drain()
+                version, status, resp_headers, rest = await self._read_head()
+                break
+            except OSError:
+                self.close()
+                if not reuse:
+                    raise
+                # The server dropped the connection since the last request
+                if DEBUG:
+                    print("[HTTP] Connection went stale, reconnecting")
+            except ValueError:
+                self.close()
+                raise
+        if reuse:
+            self.reused += 1
+        
+        keep = (version != "HTTP/1.0"
+                and resp_headers.get('connection', '').lower() != 'close')
+        chunked = 'chunked' in resp_headers.get('transfer-encoding', '').lower()
+        try:
+            if status in (204, 304):
+                length = 0
+                chunked = False
+            elif chunked:
+                length = -1
+            elif 'content-length' in resp_headers:
+                try:
+                    length = int(resp_headers['content-length'])
+                except ValueError:
+                    length = -1
+                if length < 0:
+                    raise ValueError("Invalid Content-Length")
+            else:
+                # No framing: the body runs until the server closes
+                length = -1
+                keep = False
+            
+            body, streamed = await self._read_body(status, rest, length, chunked,
+                                                   start, feed)
+        except Exception:
+            self.close()
+            raise
+        finally:
+            self._pending = self._start = self._feed = None
+        if not keep:
+            self.close()
+        return status, resp_headers, body, streamed
+    
+    async def _read_body(self, status, rest, length, chunked, start, feed):
+        """Receive the body into the body buffer; returns (body, streamed).
+        
+        rest is the start of the body (or chunk framing), received with
+        the headers. Chunked bodies are unframed as they arrive: only the
+        size lines are read separately, the data goes straight into the
+        buffer like any other body.
+        """
+        self._pending = rest
+        self._received = 0
+        self._status = status
+        self._start = start
+        self._feed = feed
+        self._streaming = None if start is not None else False
+        self._mv = memoryview(self._bufs[self._buf_index])
+        
+        t0 = time.ticks_us()
+        if chunked:
+            while True:
+                try:
+                    size = int((await self._read_line()).split(b";")[0], 16)
+                except ValueError:
+                    raise ValueError("Invalid chunk size")
+                if size == 0:
+                    break
+                await self._take(size)
+                if await self._read_line():
+                    raise ValueError("Invalid chunk framing")
+            # Trailers, if any, up to the blank line
+            while await self._read_line():
+                pass
+        elif length >= 0:
+            await self._take(length)
+        else:
+            while await self._take(max(4096, len(self._mv) - self._received), eof_ok=True):
+                pass
+        self.recv_us = time.ticks_diff(time.ticks_us(), t0)
+        self.body_size = self._received
+        return self._mv[:self._received], self._streaming is True
+    
+    async def _read_line(self):
+        """Read a chunk framing line, without its line ending."""
+        pending = self._pending
+        if pending:
+            end = pending.find(b"\n")
+            if end != -1:
+                self._pending = pending[end + 1:]
+                line = pending[:end + 1]
+            else:
+                self._pending = b""
+                line = pending + await self._reader.readline()
+        else:
+            line = await self._reader.readline()
+        if not line.endswith(b"\n"):
+            raise OSError("Connection closed mid-body")
+        return line.strip()
+    
+    def _reserve(self, n):
+        """Make room in the body buffer for n more bytes."""
+        need = self._received + n
+        if need <= len(self._mv):
+            return
+        if need > self.max_body:
+            raise OSError(f"Body over {self.max_body} bytes")
+        i = self._buf_index
+        if self._received:
+            # More body than expected (chunked or unframed): double up
+            try:
+                grown = bytearray(min(max(need, 2 * len(self._mv)), self.max_body))
+            except MemoryError:
+                raise OSError(f"No RAM for a {need} byte body")
+            grown[:self._received] = self._mv[:self._received]
+            self._bufs[i] = grown
+        else:
+            # Only the first response this big pays for the allocation
+            self._mv = None
+            grown = self._allocate(i, need)
+        self._mv = memoryview(grown)
+    
+    def _allocate(self, i, n):
+        """Replace body buffer i with one of n bytes, and return it.
+        
+        The old buffer is dropped first so its RAM can go towards the new
+        one. If there still isn't enough, one of the old size is put back
+        and OSError raised, so later (smaller) bodies are still received.
+        """
+        old = len(self._bufs[i])
+        self._bufs[i] = None
+        try:
+            self._bufs[i] = bytearray(n)
+        except MemoryError:
+            self._bufs[i] = bytearray(old)
+            raise OSError(f"No RAM for a {n} byte body")
+        return self._bufs[i]
+    
+    async def _take(self, n, eof_ok=False):
+        """Receive up to n body bytes into the buffer; returns how many.
+        
+        Bytes already received with the headers or framing go first, then
+        readinto() straight into place as the rest arrives. While a
+        streaming consumer may take the body, it's read 4 KB at a time so
+        it sees bytes as they arrive. Fewer than n bytes only with eof_ok, at end of stream.
+        """
+        if n:
+            self.body_generation += 1
+        self._reserve(n)
+        mv = self._mv
+        first = self._received
+        end = first + n
+        if self._pending:
+            k = min(n, len(self._pending))
+            mv[first:first + k] = self._pending[:k]
+            self._pending = self._pending[k:]
+            self._consumed(k)
+        while self._received < end:
+            want = end - self._received
+            if self._streaming is not False:
+                want = min(want, 4096)
+            k = await self._reader.readinto(mv[self._received:self._received + want])
+            if not k:
+                if eof_ok:
+                    break
+                raise OSError("Connection closed mid-body")
+            self._consumed(k)
+        return self._received - first
+    
+    def _consumed(self, n):
+        """Account for n new body bytes, handing them to the consumer."""
+        first = self._received
+        self._received += n
+        if self._streaming is None:
+            self._streaming = self._start(self._status, self._mv[:self._received])
+        elif self._streaming and self._feed is not None:
+            try:
+                self._feed(self._mv[first:self._received])
+            except Exception as e:
+                # Receive the rest anyway so the connection stays usable
+                print(f"[HTTP] Streaming decode error: {e}")
+                self._feed = None
+    
+    async def upgrade(self, host, port, path, headers=None):
+        """Open a WebSocket to host:port/path; returns the HTTP status.
+        
+        On 101 the connection carries WebSocket messages (ws_recv(),
+        ws_send()) until close(), and the next get() opens a new one.
+        Any other status closes it.
+        """
+        import binascii
+        import os
+        key = binascii.b2a_base64(os.urandom(16)).decode().strip()
+        lines = [f"GET {path} HTTP/1.1", f"Host: {host}:{port}",
+                 "Upgrade: websocket", "Connection: Upgrade",
+                 f"Sec-WebSocket-Key: {key}", "Sec-WebSocket-Version: 13"]
+        if headers:
+            for name, value in headers.items():
+                lines.append(f"{name}: {value}")
+        request = ("\r\n".join(lines) + "\r\n\r\n").encode()
+        
+        async def handshake():
+            await self._connect(host, port)
+            self._writer.write(request)
+            await self._writer.drain()
+            return await self._read_head()
+        
+        try:
+            _, status, _, rest = await asyncio.wait_for(handshake(), self.timeout)
+        except asyncio.TimeoutError:
+            self.close()
+            raise OSError(f"WebSocket to {host}:{port} timed out")
+        except Exception:
+            self.close()
+            raise
+        if status != 101:
+            self.close()
+            return status
+        self._addr = None       # Not for HTTP requests any more
+        self._pending = rest
+        return status
+    
+    async def ws_recv(self):
+        """Receive the next WebSocket message; returns (opcode, data).
+        
+        Binary messages go into the body buffer like HTTP bodies (data
+        is a memoryview, valid until the next message into the same
+        buffer); text comes back as bytes. Pings are answered and pongs
+        returned; the server closing the socket raises OSError. So does
+        a message over max_body bytes (binary), WS_TEXT_MAX (text) or
+        125 (control), before any of it is read; the caller then drops
+        the connection.
+        """
+        self._mv = memoryview(self._bufs[self._buf_index])
+        self._received = 0
+        self._streaming = False
+        opcode = 0
+        text = b""
+        try:
+            while True:
+                head = await self._read_exact(2)
+                fin = head[0] & 0x80
+                frame_op = head[0] & 0x0f
+                n = head[1] & 0x7f
+                if n == 126:
+                    n = int.from_bytes(await self._read_exact(2), 'big')
+                elif n == 127:
+                    n = int.from_bytes(await self._read_exact(8), 'big')
+                if head[1] & 0x80:
+                    raise ValueError("Masked frame from server")
+                
+                if frame_op >= self.WS_CLOSE:
+                    # Control frames are short and may come between fragments
+                    if n > 125:
+                        raise OSError("WebSocket control frame too long")
+                    data = await self._read_exact(n)
+                    if frame_op == self.WS_CLOSE:
+                        raise OSError("WebSocket closed by server")
+                    if frame_op == self.WS_PING:
+                        await self.ws_send(data, self.WS_PONG)
+                        continue
+                    return frame_op, data
+                
+                if frame_op:
+                    opcode = frame_op   # Else a continuation
+                if opcode == self.WS_BINARY:
+                    if n > self.max_body - self._received:
+                        raise OSError(f"WebSocket message over {self.max_body} bytes")
+                    t0 = time.ticks_us()
+                    await self._take(n)
+                    self.recv_us = time.ticks_diff(time.ticks_us(), t0)
+                else:
+                    if n > self.WS_TEXT_MAX - len(text):
+                        raise OSError(f"WebSocket text over {self.WS_TEXT_MAX} bytes")
+                    text += await self._read_exact(n)
+                if fin:
+                    break
+        except EOFError:
+            raise OSError("WebSocket connection closed")
+        
+        if opcode == self.WS_BINARY:
+            self.body_size = self._received
+            return opcode, self._mv[:self._received]
+        return opcode, text
+    
+    async def ws_send(self, data, opcode=WS_TEXT):
+        """Send a WebSocket message of up to 125 bytes (masked, as
+        clients must)."""
+        import os
+        if isinstance(data, str):
+            data = data.encode()
+        mask = os.urandom(4)
+        frame = bytearray(6 + len(data))
+        frame[0] = 0x80 | opcode
+        frame[1] = 0x80 | len(data)
+        frame[2:6] = mask
+        for i in range(len(data)):
+            frame[6 + i] = data[i] ^ mask[i & 3]
+        self._writer.write(frame)
+        await self._writer.drain()
+    
+    async def _read_exact(self, n):
+        """Read n bytes of WebSocket framing, taking pending bytes first."""
+        pending = self._pending
+        if pending:
+            if len(pending) >= n:
+                self._pending = pending[n:]
+                return pending[:n]
+            self._pending = b""
+            return pending + await self._reader.readexactly(n - len(pending))
+        return await self._reader.readexactly(n)
+
+
+class FrameCache:
+    """The last frames received, kept on flash to show while offline.
+    
+    Each frame is a file named after its hash (a frame already cached
+    isn't written again), listed with its dwell in an index, most
+    recently used first. Files and the index are written under a
+    temporary name and renamed into place, so a reset mid-write leaves
+    the previous state. Past max_frames or max_bytes the least recently
+    used frames are evicted. Recency is only saved along with new
+    frames, to spare the flash.
+    
+    With no directory the frames are kept in RAM instead, and start
+    empty at every boot.
+    """
+    
+    def __init__(self, directory="cache", max_frames=8, max_bytes=256 * 1024):
+        import json
+        import os
+        self.directory = directory
+        self.max_frames = max_frames
+        self.max_bytes = max_bytes
+        self.entries = []       # [name, dwell_secs, size], most recent first
+        self._next = 0
+        self._frames = None if directory else {}    # name -> bytes, in RAM
+        if not directory:
+            return
+        try:
+            os.mkdir(directory)
+        except OSError:
+            pass
+        try:
+            with open(self._path("index.json")) as f:
+                saved = json.load(f)
+        except (OSError, ValueError):
+            saved = []
+        for name, dwell_secs, size in saved:
+            try:
+                if os.stat(self._path(name))[6] == size:
+                    self.entries.append([name, dwell_secs, size])
+            except OSError:
+                pass
+        # Whatever isn't listed is a leftover of an interrupted write
+        listed = [entry[0] for entry in self.entries]
+        for name in os.listdir(directory):
+            if name != "index.json" and name not in listed:
+                try:
+                    os.remove(self._path(name))
+                except OSError:
+                    pass
+    
+    def __len__(self):
+        return len(self.entries)
+    
+    def _path(self, name):
+        return self.directory + "/" + name
+    
+    def _remove(self, name):
+        import os
+        if self._frames is not None:
+            self._frames.pop(name, None)
+            return
+        try:
+            os.remove(self._path(name))
+        except OSError:
+            pass
+    
+    async def store(self, data, dwell_secs):
+        """Add a frame, written a piece at a time so other tasks keep running."""
+        import binascii
+        import hashlib
+        import os
+        if len(data) > self.max_bytes:
+            return
+        name = binascii.hexlify(hashlib.sha256(data).digest()[:8]).decode() + ".webp"
+        for i, entry in enumerate(self.entries):
+            if entry[0] == name:
+                entry[1] = dwell_secs
+                self.entries.insert(0, self.entries.pop(i))
+                return
+        
+        if self._frames is not None:
+            self._frames[name] = bytes(data)
+        else:
+            tmp = self._path(name + ".tmp")
+            with open(tmp, "wb") as f:
+                for i in range(0, len(data), 4096):
+                    f.write(data[i:i + 4096])
+                    await asyncio.sleep_ms(0)
+            os.rename(tmp, self._path(name))
+        self.entries.insert(0, [name, dwell_secs, len(data)])
+        
+        total = 0
+        for i, entry in enumerate(self.entries):
+            total += entry[2]
+            if i and (i >= self.max_frames or total > self.max_bytes):
+                for old in self.entries[i:]:
+                    self._remove(old[0])
+                del self.entries[i:]
+                break
+        self._save()
+        if DEBUG:
+            print(f"[CACHE] Stored {name}, {len(self.entries)} frames, "
+                  f"{sum(entry[2] for entry in self.entries)} bytes")
+    
+    def _save(self):
+        import json
+        import os
+        if self._frames is not None:
+            return
+        tmp = self._path("index.json.tmp")
+        with open(tmp, "w") as f:
+            json.dump(self.entries, f)
+        os.rename(tmp, self._path("index.json"))
+    
+    def load_next(self, http):
+        """Read the next cached frame in turn into http's spare body
+        buffer; returns (memoryview, dwell_secs), or None if there's none."""
+        while self.entries:
+            entry = self.entries[self._next % len(self.entries)]
+            self._next += 1
+            try:
+                if self._frames is not None:
+                    mv = http.spare_buffer(entry[2])
+                    mv[:] = self._frames[entry[0]]
+                    return mv, entry[1]
+                with open(self._path(entry[0]), "rb") as f:
+                    mv = http.spare_buffer(entry[2])
+                    n = f.readinto(mv)
+                if n == entry[2]:
+                    return mv, entry[1]
+            except OSError as e:
+                print(f"[CACHE] Could not read {entry[0]}: {e}")
+            self.entries.remove(entry)
+        return None
+
+
+def split_url(url):
+    """Split an http:// URL (scheme optional) into (host, port, path)."""
+    url = url.replace('http://', '').replace('https://', '')
+    if '/' in url:
+        host_port, path = url.split('/', 1)
+        path = '/' + path
+    else:
+        host_port = url
+        path = '/'
+    if ':' in host_port:
+        host, port = host_port.split(':')
+        return host, int(port), path
+    return host_port, 80, path
+
+
 class TronbytClient:
     """Client for connecting to Tronbyt server and displaying frames."""
     
+    # Where the endpoint that last served a frame is kept across reboots
+    ENDPOINT_FILE = "endpoint.json"
+    WIFI_CHECK_SECS = 5         # How often the WiFi task checks the link
+    HOUSEKEEPING_SECS = 5       # ...and housekeeping collects garbage
+    PUSH_PING_SECS = 30         # Push socket keepalive...
+    PUSH_IDLE_SECS = 75         # ...and how long it may stay silent
+    OFFLINE_AFTER = 2           # Failed fetches in a row before cached frames play
+    
     def __init__(self):
         """Initialize the Tronbyt client."""
         print("[CLIENT] Initializing TronbytClient...")
@@ -127,6 +897,92 @@ class TronbytClient:
         self.current_brightness = DEFAULT_BRIGHTNESS
         self.width = DISPLAY_WIDTH
         self.height = DISPLAY_HEIGHT
+        self.pen_type = PEN_TYPE if 'PEN_TYPE' in globals() else None
+        
+        self.pipeline = PIPELINE if 'PIPELINE' in globals() else False
+        # How long before the dwell ends the next app is fetched (the
+        # pipelined mode fetches as soon as core 1 has taken a payload)
+        self.prefetch_secs = PREFETCH_SECS if 'PREFETCH_SECS' in globals() else 3
+        if (self.pipeline and _thread) or not WEBP_AVAILABLE:
+            self.prefetch_secs = 0
+        
+        # The last frames received, replayed while the server can't be
+        # reached, and from flash until it answers after a reboot
+        cache_frames = CACHE_FRAMES if 'CACHE_FRAMES' in globals() else 8
+        self.cache = None
+        if cache_frames and WEBP_AVAILABLE:
+            try:
+                self.cache = FrameCache(directory=CACHE_DIR if 'CACHE_DIR' in globals() else "cache",
+                                        max_frames=cache_frames,
+                                        max_bytes=CACHE_BYTES if 'CACHE_BYTES' in globals() else 256 * 1024)
+                print(f"[CACHE] {len(self.cache)} frames cached")
+            except OSError as e:
+                print(f"[CACHE] Frame cache unavailable: {e}")
+        self._offline = bool(self.cache)
+        
+        # One keep-alive connection to the server, shared by every fetch.
+        # Body buffers are allocated now, before the heap fragments; a
+        # second one holds the payload playing while the next is received.
+        self._host, self._port, _ = split_url(self.server_url)
+        self._auth_headers = {"Authorization": self.api_key} if self.api_key else None
+        buffer_size = HTTP_BUFFER_SIZE if 'HTTP_BUFFER_SIZE' in globals() else 64 * 1024
+        two = (self.pipeline and _thread) or self.prefetch_secs or self.cache is not None
+        self.http = HttpClient(timeout=10, buffer_size=buffer_size,
+                               buffers=2 if two else 1,
+                               dns_ttl=DNS_TTL if 'DNS_TTL' in globals() else 300,
+                               max_body=MAX_BODY_BYTES if 'MAX_BODY_BYTES' in globals() else 256 * 1024)
+        self._endpoint = self._load_endpoint()
+        self._endpoint_failures = 0
+        
+        # Failed fetches in a row: polling backs off from RETRY_DELAY,
+        # doubling up to RETRY_MAX_DELAY, so an outage isn't hammered
+        self._failures = 0
+        self.retry_max = RETRY_MAX_DELAY if 'RETRY_MAX_DELAY' in globals() else 60
+        
+        # Conditional fetches: the last frame, its ETag/Last-Modified and
+        # how often the server answered 304 Not Modified instead of a body
+        self._requested = None
+        self._conditional = False
+        self._validators = None
+        self._last_frame = None
+        self._last_generation = 0
+        self._last_dwell = 15
+        self._last_size = 0
+        self._last_type = None
+        self._not_modified = False
+        self.full_fetches = 0
+        self.not_modified = 0
+        self.bytes_saved = 0
+        
+        # Fetch task -> player: the next (payload, dwell, unchanged, ready),
+        # when the next fetch is due, and whether the player is waiting
+        # on the network (the panel is then free for streaming decode)
+        self._queued = None
+        self._urgent = False    # The queued payload cuts the one playing short
+        self._fetch_at = None
+        self._player_idle = True
+        self._played = 0
+        self._first_shown = False
+        self._raw_frame = None
+        self._wlan = None
+        self._link_up = None
+        
+        # Push mode: frames come over a WebSocket while it's up, polling
+        # takes over while it isn't
+        self.push = PUSH if 'PUSH' in globals() else False
+        self.push_path = (PUSH_PATH if 'PUSH_PATH' in globals() else "/{id}/ws").format(id=self.display_id)
+        self.push_retry_secs = PUSH_RETRY_SECS if 'PUSH_RETRY_SECS' in globals() else 300
+        self._push_active = False
+        self._push_retry_at = None
+        self._push_seq = 0
+        self._push_received = None
+        self._push_t0 = None
+        self._push_shown = None
+        
+        # Pipelined mode: set once the player thread is running on core 1
+        self._handoff = None
+        self._player_id = None
+        self._next_brightness = None
         
         print(f"[CLIENT] Display: {self.width}x{self.height}")
         print(f"[CLIENT] Display ID: {self.display_id}")
@@ -142,8 +998,36 @@ class TronbytClient:
             sys.print_exception(e)
             raise
         
-        # Set initial brightness
+        # Pick where frames are decoded to: the framebuffer itself in its
+        # native pen format when we can, else an RGB565 buffer drawn by hand
+        self._init_decode_target()
+        
+        # The next app's first frame is decoded here during the dwell,
+        # and copied to the back buffer when it's due
+        self._standby = None
+        if self.prefetch_secs:
+            self._standby = bytearray(len(self._decode_buf))
+        self._switch_t0 = None
+        
+        # Streaming decoder for still images, fed straight from recv()
+        self._stream = None
+        if WEBP_AVAILABLE:
+            self._stream = webpdec.StreamDecoder(self._decode_buf, **self._decode_opts)
+        
+        # Colour correction folded into webpdec's lookup table with the
+        # brightness (config.py has the same defaults)
+        self.gamma = GAMMA if 'GAMMA' in globals() else 2.2
+        dither = DITHER if 'DITHER' in globals() else "none"
+        self.dither = None
+        if WEBP_AVAILABLE:
+            self.dither = getattr(webpdec, "DITHER_" + str(dither).upper(), None)
+            if self.dither is None:
+                print(f"[CLIENT] Unknown DITHER '{dither}', dithering off")
+                self.dither = webpdec.DITHER_NONE
+        
+        # Set initial brightness (and build the gamma table)
         print("[CLIENT] Setting initial brightness...")
+        self._lut_brightness = None
         self.set_brightness(DEFAULT_BRIGHTNESS)
         
         # Show startup message
@@ -154,7 +1038,8 @@ class TronbytClient:
         except Exception as e:
             print(f"[CLIENT] Warning: Could not show startup message: {e}")
         
-        time.sleep(1)
+        if not self._offline:
+            time.sleep(1)
         print("[CLIENT] Initialization complete")
         
     def _init_display(self):
@@ -176,9 +1061,28 @@ class TronbytClient:
                     display_type = DISPLAY_INTERSTATE75_64X32
                     print("[DISPLAY] Using 64x32 display type")
                 
-                self.i75 = Interstate75(display=display_type)
+                self._palette = None
+                if self.pen_type:
+                    import picographics
+                    pen = getattr(picographics, "PEN_" + self.pen_type)
+                    self.i75 = Interstate75(display=display_type, pen_type=pen)
+                    print(f"[DISPLAY] Pen type: {self.pen_type}")
+                else:
+                    self.i75 = Interstate75(display=display_type)
                 self.graphics = self.i75.display
+                if self.pen_type == "P8":
+                    self._init_palette()
                 self._display_type = "interstate75"
+                
+                # PicoGraphics exposes its framebuffer via the buffer
+                # protocol, which lets webpdec.blit() write it natively
+                try:
+                    self._fb = memoryview(self.graphics)
+                    self._fb_bpp = len(self._fb) // (self.width * self.height)
+                    print(f"[DISPLAY] Framebuffer: {self._fb_bpp} bytes/pixel")
+                except TypeError:
+                    self._fb = None
+                    print("[DISPLAY] Framebuffer not exposed, using pixel writes")
                 print("[DISPLAY] Interstate 75 initialized successfully")
             except Exception as e:
                 print(f"[DISPLAY] Failed to init Interstate 75: {e}")
@@ -195,9 +1099,90 @@ class TronbytClient:
             raise RuntimeError(f"Unknown board type: {BOARD_TYPE}")
         
         print(f"[DISPLAY] Display initialized: {self.width}x{self.height}")
+    
+    def _init_palette(self):
+        """Load a 3-3-2 palette so P8 frames can use every entry."""
+        self._palette = bytearray(256 * 3)
+        for i in range(256):
+            r = (i >> 5) * 255 // 7
+            g = ((i >> 2) & 0x07) * 255 // 7
+            b = (i & 0x03) * 85
+            self._palette[i * 3:i * 3 + 3] = bytes((r, g, b))
+            self.graphics.update_pen(i, r, g, b)
+    
+    def _init_decode_target(self):
+        """Decode into the framebuffer in its own pen format, if exposed.
+        
+        This skips the RGB565 frame buffer and the conversion pass after
+        every decode. Without framebuffer access frames are decoded to
+        RGB565 and drawn pixel by pixel.
+        """
+        self._decode_fmt = None
+        if WEBP_AVAILABLE and self._fb is not None:
+            if self.pen_type == "P8":
+                self._decode_fmt = webpdec.FMT_P8
+            elif self._fb_bpp == 4:
+                self._decode_fmt = webpdec.FMT_RGB888
+            elif self._fb_bpp == 2:
+                # PicoGraphics stores RGB565 pens byte-swapped
+                self._decode_fmt = webpdec.FMT_RGB565_BE
+            elif self._fb_bpp == 1:
+                self._decode_fmt = webpdec.FMT_RGB332
+        
+        self._back = None
+        double_buffer = DOUBLE_BUFFER if 'DOUBLE_BUFFER' in globals() else True
+        if self._decode_fmt is not None:
+            self.frame_buf = None
+            if double_buffer:
+                # Back buffer in the framebuffer's own format, allocated
+                # once: frames are decoded into it and flipped to the panel
+                self._back = memoryview(bytearray(len(self._fb)))
+                self._decode_buf = self._back
+                print("[DISPLAY] Decoding into a back buffer in the framebuffer's format")
+            else:
+                self._decode_buf = self._fb
+                print("[DISPLAY] Decoding straight into the framebuffer")
+        else:
+            # Preallocate the RGB565 frame buffer once for the life of the
+            # client so decoding never allocates on the GC heap
+            self.frame_buf = bytearray(self.width * self.height * 2)
+            self._decode_buf = self.frame_buf
+            self._decode_fmt = webpdec.FMT_RGB565 if WEBP_AVAILABLE else None
+            self._palette = None
+        
+        # Output options for every decode: the image is scaled, centred
+        # and cropped to the panel in the same pass, so the server can
+        # render at a different size than the panel
+        self._decode_opts = {
+            "fmt": self._decode_fmt,
+            "palette": self._palette,
+            "width": self.width,
+            "height": self.height,
+            "scale": IMAGE_SCALE if 'IMAGE_SCALE' in globals() else 0,
+            "viewport": IMAGE_VIEWPORT if 'IMAGE_VIEWPORT' in globals() else None,
+        }
+        
+        # Each new frame is diffed against the one on the panel so only
+        # changed regions are drawn, and unchanged frames skip the panel
+        # update altogether. With a back buffer the framebuffer is that
+        # frame; otherwise keep a copy.
+        self._frame_diff = WEBP_AVAILABLE and (FRAME_DIFF if 'FRAME_DIFF' in globals() else True)
+        self._shown = None
+        self._shown_valid = False
+        self._diff_bpp = self._fb_bpp if self.frame_buf is None else 2
+        self._diff_pixels = 0
+        self._diff_skipped = 0
+        if self._frame_diff and self._back is None:
+            self._shown = bytearray(len(self._decode_buf))
         
     def show_message(self, text, color=(255, 255, 255)):
-        """Display a text message on the matrix."""
+        """Display a text message on the matrix.
+        
+        Pipelined, messages from core 0 are passed to core 1 to show.
+        """
+        if self._player_id is not None and _thread.get_ident() != self._player_id:
+            self._handoff.post_message(text, color)
+            return
         if self._display_type == "interstate75":
             try:
                 self.graphics.set_pen(self.graphics.create_pen(0, 0, 0))
@@ -210,48 +1195,72 @@ class TronbytClient:
                 self.graphics.set_pen(self.graphics.create_pen(*color))
                 self.graphics.text(text, text_x, text_y, scale=1)
                 self.i75.update()
+                self._shown_valid = False
             except Exception as e:
                 print(f"[DISPLAY] Error showing message: {e}")
         else:
             print(f"[DISPLAY] Cannot show message on {self._display_type}")
         
     def set_brightness(self, brightness):
-        """Set display brightness (0-100)."""
+        """Set display brightness (0-100).
+        
+        With webpdec the brightness is folded into its gamma lookup table,
+        which is only rebuilt when the value changes and scales colours
+        before they're quantised (the driver's global brightness crushes
+        dim colours). It applies from the next decoded frame.
+        """
         brightness = max(0, min(100, brightness))
+        if self._player_id is not None and _thread.get_ident() != self._player_id:
+            # Pipelined: the player applies it along with this payload
+            self._next_brightness = brightness
+            return
+        if brightness == self._lut_brightness:
+            return
         self.current_brightness = brightness
         
-        if self._display_type == "interstate75":
+        if WEBP_AVAILABLE:
+            webpdec.set_correction(gamma=self.gamma, brightness=brightness / 100.0,
+                                   dither=self.dither)
+            self._lut_brightness = brightness
+        elif self._display_type == "interstate75":
             if hasattr(self.i75, 'set_brightness'):
                 self.i75.set_brightness(brightness / 100.0)
         
         if DEBUG:
             print(f"[DISPLAY] Brightness set to {brightness}%")
     
-    def connect_wifi(self):
-        """Connect to WiFi network."""
+    async def connect_wifi(self, quiet=False):
+        """Connect to WiFi network.
+        
+        quiet is for reconnecting while an app is showing: no messages on
+        the panel and no scan (it blocks for a couple of seconds).
+        """
         import network
         
         print(f"[WIFI] Connecting to WiFi: {WIFI_SSID}")
-        try:
-            self.show_message("WiFi...", (255, 255, 0))
-        except:
-            pass
+        if not quiet:
+            try:
+                self.show_message("WiFi...", (255, 255, 0))
+            except:
+                pass
         
         wlan = network.WLAN(network.STA_IF)
         wlan.active(True)
+        self._wlan = wlan
         
-        print(f"[WIFI] Scanning for networks...")
-        try:
-            networks = wlan.scan()
-            found_ssids = [n[0].decode('utf-8', 'ignore') for n in networks]
-            print(f"[WIFI] Found {len(found_ssids)} networks")
-            if DEBUG:
-                print(f"[WIFI] Networks: {found_ssids[:10]}")  # Show first 10
-            
-            if WIFI_SSID not in found_ssids:
-                print(f"[WIFI] WARNING: {WIFI_SSID} not found in scan!")
-        except Exception as e:
-            print(f"[WIFI] Scan failed (non-critical): {e}")
+        if not quiet:
+            print(f"[WIFI] Scanning for networks...")
+            try:
+                networks = wlan.scan()
+                found_ssids = [n[0].decode('utf-8', 'ignore') for n in networks]
+                print(f"[WIFI] Found {len(found_ssids)} networks")
+                if DEBUG:
+                    print(f"[WIFI] Networks: {found_ssids[:10]}")  # Show first 10
+                
+                if WIFI_SSID not in found_ssids:
+                    print(f"[WIFI] WARNING: {WIFI_SSID} not found in scan!")
+            except Exception as e:
+                print(f"[WIFI] Scan failed (non-critical): {e}")
         
         print(f"[WIFI] Attempting connection...")
         wlan.connect(WIFI_SSID, WIFI_PASSWORD)
@@ -264,7 +1273,7 @@ class TronbytClient:
                 break
             max_wait -= 1
             print(f'[WIFI] Waiting for connection... ({max_wait} tries left)')
-            time.sleep(1)
+            await asyncio.sleep(1)
         
         # Check connection
         status = wlan.status()
@@ -272,129 +1281,83 @@ class TronbytClient:
         
         if status != 3:
             print(f"[WIFI] Connection failed with status: {status}")
-            try:
-                self.show_message("WiFi Fail", (255, 0, 0))
-            except:
-                pass
+            if not quiet:
+                try:
+                    self.show_message("WiFi Fail", (255, 0, 0))
+                except:
+                    pass
             raise RuntimeError(f'WiFi connection failed (status: {status})')
         else:
             status_config = wlan.ifconfig()
             print(f'[WIFI] Connected! IP: {status_config[0]}')
-            try:
-                self.show_message("WiFi OK", (0, 255, 0))
-            except:
-                pass
-            time.sleep(1)
+            if not quiet:
+                try:
+                    self.show_message("WiFi OK", (0, 255, 0))
+                except:
+                    pass
+                await asyncio.sleep(1)
             return status_config[0]
     
-    def fetch_frame(self):
-        """Fetch a frame from the Tronbyt server using raw sockets."""
-        import socket
+    async def fetch_frame(self, retry=True):
+        """Fetch a frame from the Tronbyt server.
         
-        # Parse server URL to handle ports properly
-        server = self.server_url.replace('http://', '').replace('https://', '')
-        if '/' in server:
-            server = server.split('/')[0]
+        Goes straight to the endpoint that last served a frame; the
+        endpoints are only probed again once it has answered 404 or 410
+        ENDPOINT_RETRIES times in a row. Timeouts, refused connections
+        and other errors are an outage, not a moved endpoint: they're
+        left to the fetch task's back-off.
         
-        # Split host and port
-        if ':' in server:
-            host, port = server.split(':')
-            port = int(port)
-        else:
-            host = server
-            port = 80
+        retry allows one unconditional fetch again after a 304 that
+        can't be used (see _accept_frame()).
+        """
+        if self._endpoint is None:
+            return await self._discover_frame(retry)
+        
+        host, port, path = self._endpoint
+        try:
+            status_code, headers, body, streamed = await self._get(host, port, path)
+            if status_code in (200, 304):
+                self._endpoint_failures = 0
+                return await self._accept_frame(status_code, headers, body, streamed, retry)
+            location = headers.get('location', '')
+            if status_code in (301, 302, 303, 307, 308) and location:
+                # Moved: the redirect target becomes the endpoint if it works
+                if DEBUG:
+                    print(f"[FETCH] Redirect ({status_code}) to: {location}")
+                return await self._fetch_with_redirect(location, base=(host, port), retry=retry)
+            print(f"[FETCH] Error: HTTP {status_code} from {host}:{port}{path}")
+        except Exception as e:
+            print(f"[FETCH] Error: {e}")
+            return None, 15, None
+        if status_code not in (404, 410):
+            return None, 15, None
         
+        self._endpoint_failures += 1
+        retries = ENDPOINT_RETRIES if 'ENDPOINT_RETRIES' in globals() else 3
+        if self._endpoint_failures < retries:
+            return None, 15, None
+        print(f"[FETCH] Endpoint failed {self._endpoint_failures} times, probing again")
+        self._forget_endpoint()
+        return await self._discover_frame(retry)
+    
+    async def _discover_frame(self, retry=True):
+        """Fetch a frame, probing the API paths and following redirects."""
         path = f"/v0/devices/{self.display_id}/next"
         
         if DEBUG:
-            print(f"[FETCH] Host: {host}, Port: {port}")
+            print(f"[FETCH] Host: {self._host}, Port: {self._port}")
             print(f"[FETCH] Path: {path}")
             print(f"[FETCH] API Key present: {'Yes' if self.api_key else 'No'}")
         
         try:
-            # Create socket and connect
-            addr = socket.getaddrinfo(host, port)[0][-1]
-            s = socket.socket()
-            s.settimeout(10)
-            s.connect(addr)
-            
-            # Build HTTP request
-            request_lines = [
-                f"GET {path} HTTP/1.1",
-                f"Host: {host}:{port}",
-                "Connection: close",
-            ]
-            
-            if self.api_key:
-                request_lines.append(f"Authorization: {self.api_key}")
-            
-            request_lines.append("")  # Empty line before body
-            request = "\r\n".join(request_lines) + "\r\n"
-            
-            if DEBUG:
-                print(f"[FETCH] Sending request...")
-            
-            s.send(request.encode())
-            
-            # Receive response
-            response = b""
-            while True:
-                try:
-                    chunk = s.recv(4096)
-                    if not chunk:
-                        break
-                    response += chunk
-                except:
-                    break
-            
-            s.close()
-            
-            # Parse response
-            header_end = response.find(b"\r\n\r\n")
-            if header_end == -1:
-                print("[FETCH] Invalid HTTP response")
-                return None, 15, None
-            
-            headers_bytes = response[:header_end]
-            body = response[header_end + 4:]
-            
-            # Parse status line
-            header_lines = headers_bytes.decode('utf-8', 'ignore').split("\r\n")
-            status_line = header_lines[0]
+            status_code, headers, body, streamed = await self._get(self._host, self._port, path)
             
             if DEBUG:
-                print(f"[FETCH] Status: {status_line}")
-            
-            # Extract status code
-            parts = status_line.split()
-            if len(parts) < 2:
-                print("[FETCH] Invalid status line")
-                return None, 15, None
-            
-            try:
-                status_code = int(parts[1])
-            except:
-                print("[FETCH] Could not parse status code")
-                return None, 15, None
+                print(f"[FETCH] Status: {status_code}")
             
-            # Parse headers for all responses
-            headers = {}
-            for line in header_lines[1:]:
-                if ':' in line:
-                    key, value = line.split(':', 1)
-                    headers[key.strip().lower()] = value.strip()
-            
-            if status_code == 200:
-                dwell_secs = int(headers.get('tronbyt-dwell-secs', '15'))
-                brightness = int(headers.get('tronbyt-brightness', '-1'))
-                
-                if brightness >= 0:
-                    self.set_brightness(brightness)
-                
-                if DEBUG:
-                    print(f"[FETCH] Got frame: {len(body)} bytes, dwell={dwell_secs}s")
-                
-                return body, dwell_secs, headers.get('content-type', '')
+            if status_code in (200, 304):
+                self._remember_endpoint(self._host, self._port, path)
+                return await self._accept_frame(status_code, headers, body, streamed, retry)
                 
             elif status_code in (301, 302, 303, 307, 308):
                 # Handle redirect
@@ -403,7 +1366,7 @@ class TronbytClient:
                     if DEBUG:
                         print(f"[FETCH] Redirect ({status_code}) to: {location}")
                     # Follow redirect
-                    return self._fetch_with_redirect(location)
+                    return await self._fetch_with_redirect(location, retry=retry)
                 else:
                     print(f"[FETCH] Redirect ({status_code}) but no Location header")
                     return None, 15, None
@@ -413,7 +1376,7 @@ class TronbytClient:
                 return None, 15, None
             elif status_code == 404:
                 print(f"[FETCH] Error: Endpoint not found (404)")
-                return self._fetch_frame_alternate()
+                return await self._fetch_frame_alternate(retry)
             else:
                 print(f"[FETCH] Error: HTTP {status_code}")
                 return None, 15, None
@@ -422,116 +1385,213 @@ class TronbytClient:
             print(f"[FETCH] Error: {e}")
             import sys
             sys.print_exception(e)
-            return self._fetch_frame_alternate()
+            return await self._fetch_frame_alternate(retry)
     
-    def _fetch_with_redirect(self, location, max_redirects=3):
-        """Follow a redirect to fetch the frame."""
-        import socket
+    def _load_endpoint(self):
+        """The endpoint saved in ENDPOINT_FILE for this server, or None."""
+        import json
+        try:
+            with open(self.ENDPOINT_FILE) as f:
+                saved = json.load(f)
+            if saved["server"] == self.server_url and saved["display_id"] == self.display_id:
+                print(f"[FETCH] Using saved endpoint {saved['host']}:{saved['port']}{saved['path']}")
+                return saved["host"], saved["port"], saved["path"]
+        except (OSError, ValueError, KeyError, TypeError):
+            pass
+        return None
+    
+    def _remember_endpoint(self, host, port, path):
+        """Make host:port/path the sticky endpoint, saving it to flash."""
+        self._endpoint_failures = 0
+        if self._endpoint == (host, port, path):
+            return
+        self._endpoint = (host, port, path)
+        import json
+        try:
+            with open(self.ENDPOINT_FILE, 'w') as f:
+                json.dump({"server": self.server_url, "display_id": self.display_id,
+                           "host": host, "port": port, "path": path}, f)
+            print(f"[FETCH] Saved endpoint {host}:{port}{path}")
+        except OSError as e:
+            print(f"[FETCH] Could not save endpoint: {e}")
+    
+    def _forget_endpoint(self):
+        self._endpoint = None
+        self._endpoint_failures = 0
+        import os
+        try:
+            os.remove(self.ENDPOINT_FILE)
+        except OSError:
+            pass
+    
+    async def _get(self, host, port, path):
+        """GET path over the shared connection, stream-decoding stills
+        while the player is waiting on it.
+        
+        Conditional on the last frame's validators when they came from
+        the same endpoint.
+        """
+        self._requested = (host, port, path)
+        headers = self._auth_headers
+        validators = self._validators
+        self._conditional = validators is not None and validators[0] == self._requested
+        if self._conditional:
+            headers = dict(headers) if headers else {}
+            if validators[1]:
+                headers["If-None-Match"] = validators[1]
+            if validators[2]:
+                headers["If-Modified-Since"] = validators[2]
+        start = None
+        if self._stream is not None and self._player_idle and not self._offline:
+            start = self._start_stream
+        return await self.http.get(host, port, path, headers, start, self._feed_stream)
+    
+    async def _accept_frame(self, status_code, headers, body, streamed, retry=True):
+        """Apply a 200 or 304 response; returns fetch_frame()'s tuple.
+        
+        A 304 hands back the last frame, which is still in its body
+        buffer unless a response since has overwritten it; then the
+        frame is fetched again in full, once (retry). So is one whose
+        brightness has changed: brightness is applied while decoding,
+        and a held still isn't decoded again. A 304 to a request that
+        sent no validators is a failed fetch.
+        """
+        brightness = int(headers.get('tronbyt-brightness', '-1'))
+        if status_code == 304:
+            if not self._conditional:
+                print("[FETCH] Not modified, but nothing was cached to compare")
+                self._forget_frame()
+                return None, 15, None
+            if (self._last_frame is None
+                    or self._last_generation != self.http.body_generation):
+                print("[FETCH] Not modified, but the last frame is gone: fetching it again")
+                return await self._refetch_frame(retry)
+            current = self._next_brightness if self._next_brightness is not None else self.current_brightness
+            if brightness >= 0 and max(0, min(100, brightness)) != current:
+                print("[FETCH] Not modified, but the brightness changed: fetching it again")
+                return await self._refetch_frame(retry)
+            dwell_secs = int(headers.get('tronbyt-dwell-secs', self._last_dwell))
+        else:
+            dwell_secs = int(headers.get('tronbyt-dwell-secs', '15'))
+        
+        if brightness >= 0:
+            self.set_brightness(brightness)
         
+        self._not_modified = status_code == 304
+        if self._not_modified:
+            self.not_modified += 1
+            self.bytes_saved += self._last_size
+            if DEBUG:
+                print(f"[FETCH] Not modified, keeping the current frame, dwell={dwell_secs}s")
+            return self._last_frame, dwell_secs, self._last_type
+        
+        self.full_fetches += 1
+        self._raw_frame = body
+        if streamed:
+            # The frame is already decoded (and on the panel)
+            body = self._stream if self._stream.done else None
+        if body is None:
+            print("[FETCH] Body ended before frame was decoded")
+            self._forget_frame()
+            return None, dwell_secs, None
+        
+        if DEBUG:
+            if streamed:
+                print(f"[FETCH] Got streamed frame: {self._stream.rows} rows, dwell={dwell_secs}s")
+            else:
+                print(f"[FETCH] Got frame: {len(body)} bytes in "
+                      f"{self.http.recv_us // 1000}ms, dwell={dwell_secs}s")
+        
+        # Keep what a 304 needs to show this frame again
+        etag = headers.get('etag')
+        last_modified = headers.get('last-modified')
+        self._validators = None
+        if etag or last_modified:
+            self._validators = (self._requested, etag, last_modified)
+        self._last_frame = body
+        self._last_generation = self.http.body_generation
+        self._last_dwell = dwell_secs
+        self._last_size = self.http.body_size
+        self._last_type = headers.get('content-type', '')
+        return body, dwell_secs, self._last_type
+    
+    async def _refetch_frame(self, retry):
+        """Fetch the frame again unconditionally, if retry allows."""
+        self._forget_frame()
+        if not retry:
+            return None, 15, None
+        return await self.fetch_frame(retry=False)
+    
+    def _forget_frame(self):
+        """Drop the last frame and its validators: the next fetch is in full."""
+        self._last_frame = None
+        self._validators = None
+    
+    def _start_stream(self, status_code, body):
+        """Decide whether to stream-decode a response, and start if so.
+        
+        Returns None while more bytes are needed to decide, False to keep
+        buffering (not a 200, or an animation), True once streaming.
+        """
+        if status_code != 200:
+            return False
+        
+        # Need the RIFF header plus the first chunk header to check for
+        # animation (Animation needs the whole file); anything the headers
+        # rule out is left to the buffered path to report
+        if len(body) < 30:
+            return None
+        info = self._probe(body, partial=True)
+        if info is None or info["animated"]:
+            return False
+        
+        self._stream.reset()
+        self._feed_stream(body)
+        return True
+    
+    def _feed_stream(self, chunk):
+        """Feed body bytes to the streaming decoder and show new rows."""
+        start_row = self._stream.rows
+        rows = self._stream.feed(chunk)
+        if rows > start_row:
+            self._present(start_row, rows)
+    
+    async def _fetch_with_redirect(self, location, max_redirects=3, base=None, retry=True):
+        """Follow a redirect to fetch the frame.
+        
+        base is the (host, port) that sent it, for relative locations
+        (default: the server).
+        """
         if max_redirects <= 0:
             print("[FETCH] Too many redirects")
             return None, 15, None
         
         # Parse the location URL
-        if location.startswith('http://'):
-            location = location[7:]
-        elif location.startswith('https://'):
+        if location.startswith('https://'):
             print("[FETCH] HTTPS not supported, skipping")
             return None, 15, None
-        
-        # Split path from host
-        if '/' in location:
-            host_port, path = location.split('/', 1)
-            path = '/' + path
+        if location.startswith('/'):
+            # Relative redirect: same server
+            host, port = base or (self._host, self._port)
+            path = location
         else:
-            host_port = location
-            path = '/'
-        
-        # Parse host and port
-        if ':' in host_port:
-            host, port = host_port.split(':')
-            port = int(port)
-        else:
-            host = host_port
-            port = 80
+            host, port, path = split_url(location)
         
         if DEBUG:
             print(f"[FETCH] Redirect to: {host}:{port}{path}")
         
         try:
-            addr = socket.getaddrinfo(host, port)[0][-1]
-            s = socket.socket()
-            s.settimeout(10)
-            s.connect(addr)
-            
-            request_lines = [
-                f"GET {path} HTTP/1.1",
-                f"Host: {host}:{port}",
-                "Connection: close",
-            ]
+            status_code, headers, body, streamed = await self._get(host, port, path)
             
-            if self.api_key:
-                request_lines.append(f"Authorization: {self.api_key}")
-            
-            request_lines.append("")
-            request = "\r\n".join(request_lines) + "\r\n"
-            
-            s.send(request.encode())
-            
-            response = b""
-            while True:
-                try:
-                    chunk = s.recv(4096)
-                    if not chunk:
-                        break
-                    response += chunk
-                except:
-                    break
-            
-            s.close()
-            
-            header_end = response.find(b"\r\n\r\n")
-            if header_end == -1:
-                return None, 15, None
-            
-            headers_bytes = response[:header_end]
-            body = response[header_end + 4:]
-            
-            header_lines = headers_bytes.decode('utf-8', 'ignore').split("\r\n")
-            status_line = header_lines[0]
-            parts = status_line.split()
-            
-            if len(parts) < 2:
-                return None, 15, None
-            
-            try:
-                status_code = int(parts[1])
-            except:
-                return None, 15, None
-            
-            # Parse headers
-            headers = {}
-            for line in header_lines[1:]:
-                if ':' in line:
-                    key, value = line.split(':', 1)
-                    headers[key.strip().lower()] = value.strip()
-            
-            if status_code == 200:
-                dwell_secs = int(headers.get('tronbyt-dwell-secs', '15'))
-                brightness = int(headers.get('tronbyt-brightness', '-1'))
-                
-                if brightness >= 0:
-                    self.set_brightness(brightness)
-                
-                if DEBUG:
-                    print(f"[FETCH] Got frame after redirect: {len(body)} bytes")
-                
-                return body, dwell_secs, headers.get('content-type', '')
+            if status_code in (200, 304):
+                self._remember_endpoint(host, port, path)
+                return await self._accept_frame(status_code, headers, body, streamed, retry)
             elif status_code in (301, 302, 303, 307, 308):
                 # Follow another redirect
                 new_location = headers.get('location', '')
                 if new_location and max_redirects > 1:
-                    return self._fetch_with_redirect(new_location, max_redirects - 1)
+                    return await self._fetch_with_redirect(new_location, max_redirects - 1,
+                                                     base=(host, port), retry=retry)
             
             return None, 15, None
             
@@ -539,22 +1599,8 @@ class TronbytClient:
             print(f"[FETCH] Redirect fetch error: {e}")
             return None, 15, None
 
-    def _fetch_frame_alternate(self):
-        """Try alternate API endpoint formats using raw sockets."""
-        import socket
-        
-        # Parse server URL
-        server = self.server_url.replace('http://', '').replace('https://', '')
-        if '/' in server:
-            server = server.split('/')[0]
-        
-        if ':' in server:
-            host, port = server.split(':')
-            port = int(port)
-        else:
-            host = server
-            port = 80
-        
+    async def _fetch_frame_alternate(self, retry=True):
+        """Try alternate API endpoint formats."""
         # Try different paths
         paths_to_try = [
             f"/devices/{self.display_id}/next",
@@ -566,73 +1612,14 @@ class TronbytClient:
                 print(f"[FETCH] Trying path: {path}")
             
             try:
-                addr = socket.getaddrinfo(host, port)[0][-1]
-                s = socket.socket()
-                s.settimeout(10)
-                s.connect(addr)
-                
-                request_lines = [
-                    f"GET {path} HTTP/1.1",
-                    f"Host: {host}:{port}",
-                    "Connection: close",
-                ]
-                
-                if self.api_key:
-                    request_lines.append(f"Authorization: {self.api_key}")
-                
-                request_lines.append("")
-                request = "\r\n".join(request_lines) + "\r\n"
-                
-                s.send(request.encode())
-                
-                response = b""
-                while True:
-                    try:
-                        chunk = s.recv(4096)
-                        if not chunk:
-                            break
-                        response += chunk
-                    except:
-                        break
-                
-                s.close()
-                
-                header_end = response.find(b"\r\n\r\n")
-                if header_end == -1:
-                    continue
-                
-                headers_bytes = response[:header_end]
-                body = response[header_end + 4:]
-                
-                header_lines = headers_bytes.decode('utf-8', 'ignore').split("\r\n")
-                status_line = header_lines[0]
-                parts = status_line.split()
-                
-                if len(parts) < 2:
-                    continue
+                status_code, headers, body, streamed = await self._get(self._host, self._port, path)
                 
-                try:
-                    status_code = int(parts[1])
-                except:
-                    continue
-                
-                if status_code == 200:
-                    headers = {}
-                    for line in header_lines[1:]:
-                        if ':' in line:
-                            key, value = line.split(':', 1)
-                            headers[key.strip().lower()] = value.strip()
-                    
-                    dwell_secs = int(headers.get('tronbyt-dwell-secs', '15'))
-                    brightness = int(headers.get('tronbyt-brightness', '-1'))
-                    
-                    if brightness >= 0:
-                        self.set_brightness(brightness)
-                    
+                if status_code in (200, 304):
                     if DEBUG:
                         print(f"[FETCH] Success with path: {path}")
                     
-                    return body, dwell_secs, headers.get('content-type', '')
+                    self._remember_endpoint(self._host, self._port, path)
+                    return await self._accept_frame(status_code, headers, body, streamed, retry)
                     
             except Exception as e:
                 if DEBUG:
@@ -653,18 +1640,20 @@ class TronbytClient:
             if DEBUG:
                 print(f"[DISPLAY] Decoding WebP: {len(webp_data)} bytes")
             
-            # Decode WebP to RGB565
-            rgb565_data = webpdec.decode(webp_data, self.width, self.height)
-            
-            if rgb565_data is None or len(rgb565_data) == 0:
-                print("[DISPLAY] WebP decode failed - no data returned")
-                return False
+            # Decode WebP into the back buffer, in the display's format
+            # when possible
+            webpdec.decode_into(webp_data, self._decode_buf, **self._decode_opts)
             
             if DEBUG:
-                print(f"[DISPLAY] Decoded to {len(rgb565_data)} bytes RGB565")
+                arena = webpdec.arena_info(reset=True)
+                print(f"[DISPLAY] Decoded to {len(self._decode_buf)} bytes, "
+                      f"arena peak {arena['peak']}/{arena['size']} bytes")
             
             # Display on matrix
-            self._display_rgb565(rgb565_data)
+            t0 = time.ticks_us()
+            self._present()
+            if DEBUG:
+                print(f"[DISPLAY] Presented in {time.ticks_diff(time.ticks_us(), t0)}us")
             return True
             
         except Exception as e:
@@ -673,29 +1662,352 @@ class TronbytClient:
             sys.print_exception(e)
             return False
     
-    def _display_rgb565(self, rgb565_data):
-        """Display RGB565 data on the matrix."""
+    def play(self, webp_data, dwell_secs, unchanged=False, shown=False):
+        """Show a WebP payload for dwell_secs, sleeping between frames.
+        
+        For the player thread on core 1; see _play_steps().
+        """
+        steps = self._play_steps(webp_data, dwell_secs, unchanged, shown)
+        while True:
+            try:
+                due = next(steps)
+            except StopIteration as e:
+                return e.value
+            while True:
+                wait = self._wait_ms(due)
+                if wait is None:
+                    steps.close()
+                    return True
+                if wait <= 0:
+                    break
+                time.sleep_ms(wait)
+    
+    async def play_async(self, webp_data, dwell_secs, unchanged=False, shown=False):
+        """Show a WebP payload for dwell_secs, letting other tasks run
+        until each frame is due."""
+        steps = self._play_steps(webp_data, dwell_secs, unchanged, shown)
+        while True:
+            try:
+                due = next(steps)
+            except StopIteration as e:
+                return e.value
+            while True:
+                wait = self._wait_ms(due)
+                if wait is None:
+                    steps.close()
+                    return True
+                # Yield even when late, so a long animation can't starve
+                # the fetch task
+                await asyncio.sleep_ms(max(0, wait))
+                if wait <= 0:
+                    break
+    
+    def _wait_ms(self, due):
+        """How long to sleep towards due (ticks_ms), or None to stop playing.
+        
+        Some payloads replace the app playing straight away (pushed
+        frames, live content over cached), so sleeps are kept short to
+        check for one.
+        """
+        if self._urgent:
+            return None
+        return min(time.ticks_diff(due, time.ticks_ms()), 20)
+    
+    def _play_steps(self, webp_data, dwell_secs, unchanged, shown):
+        """Show a WebP payload for dwell_secs, animating it if needed.
+        
+        A generator yielding each time.ticks_ms deadline to wait for; the
+        caller sleeps until then. Returns True at the end of the dwell,
+        False if the payload couldn't be shown.
+        
+        Stills are decoded once and held. Animations are stepped on
+        deadlines so per-frame durations don't drift, and loop until the
+        dwell expires (or the file's loop count runs out). Frames already
+        decoded by the streaming fetch, unchanged stills (the server
+        answered 304) and stills decoded ahead (shown: their first frame
+        is already on the panel) are just held.
+        """
+        dwell_end = time.ticks_add(time.ticks_ms(), dwell_secs * 1000)
+        if webp_data is self._stream:
+            yield dwell_end
+            return True
+        
+        info = self._probe(webp_data)
+        if info is None:
+            return False
+        
+        if not info["animated"]:
+            if not (unchanged or shown) and not self.decode_and_display(webp_data):
+                return False
+            yield dwell_end
+            return True
+        
+        try:
+            anim = webpdec.Animation(webp_data, self._decode_buf, **self._decode_opts)
+        except Exception as e:
+            print(f"[ANIM] Error creating animation decoder: {e}")
+            return False
+        
+        if DEBUG:
+            print(f"[ANIM] {anim.frame_count} frames, loop_count={anim.loop_count}")
+        
+        start = time.ticks_ms()
+        due = start
+        frames = 0
+        jitter_total = 0
+        jitter_max = 0
+        peak_heap = gc.mem_alloc()
+        loops = 0
+        present_us = 0
+        present_max = 0
+        self._diff_pixels = 0
+        self._diff_skipped = 0
+        
+        try:
+            while True:
+                for _, duration_ms in anim:
+                    # Present as close to the deadline as we can
+                    now = time.ticks_ms()
+                    if time.ticks_diff(due, now) > 0:
+                        yield due
+                        now = time.ticks_ms()
+                    if shown:
+                        # Decoded ahead: the first frame is already up
+                        shown = False
+                        took = 0
+                    else:
+                        t0 = time.ticks_us()
+                        self._present()
+                        took = time.ticks_diff(time.ticks_us(), t0)
+                    present_us += took
+                    present_max = max(present_max, took)
+                    
+                    late = time.ticks_diff(now, due)
+                    jitter_total += late
+                    jitter_max = max(jitter_max, late)
+                    frames += 1
+                    peak_heap = max(peak_heap, gc.mem_alloc())
+                    
+                    # Schedule from the deadline, not from now, unless we've
+                    # fallen a whole frame behind (then resync instead of
+                    # bursting to catch up)
+                    due = time.ticks_add(due, max(duration_ms, 1))
+                    if time.ticks_diff(now, due) > 0:
+                        due = now
+                    
+                    if time.ticks_diff(due, dwell_end) >= 0:
+                        break
+                else:
+                    loops += 1
+                    if not anim.loop_count or loops < anim.loop_count:
+                        anim.rewind()
+                        continue
+                break
+        except Exception as e:
+            print(f"[ANIM] Error during playback: {e}")
+            return False
+        finally:
+            # Free the decoder's arena memory now, not at the next GC
+            anim.close()
+        
+        # Hold the last frame for whatever is left of the dwell
+        yield dwell_end
+        
+        if frames:
+            print(f"[ANIM] {frames} frames in {time.ticks_diff(time.ticks_ms(), start)}ms, "
+                  f"jitter avg {jitter_total // frames}ms max {jitter_max}ms, "
+                  f"peak heap {peak_heap} bytes")
+            skipped = 100 * self._diff_skipped // self._diff_pixels if self._diff_pixels else 0
+            arena = webpdec.arena_info(reset=True)
+            print(f"[ANIM] present avg {present_us // frames}us max {present_max}us, "
+                  f"{skipped}% of pixels unchanged and skipped, "
+                  f"arena peak {arena['peak']}/{arena['size']} bytes")
+        return True
+    
+    def _probe(self, webp_data, partial=False):
+        """Read a payload's WebP headers, or None if it can't be shown.
+        
+        Rejects malformed, truncated (unless partial) and oversized files
+        before any buffers are allocated or decoding starts.
+        """
+        if not WEBP_AVAILABLE:
+            return {"animated": False}
+        
+        try:
+            info = webpdec.info(webp_data)
+        except ValueError as e:
+            print(f"[DISPLAY] Rejecting payload: {e}")
+            return None
+        
+        if not partial and info["size"] > len(webp_data):
+            print(f"[DISPLAY] Rejecting payload: truncated, "
+                  f"{len(webp_data)} of {info['size']} bytes")
+            return None
+        
+        max_pixels = MAX_IMAGE_PIXELS if 'MAX_IMAGE_PIXELS' in globals() else 128 * 128
+        if info["width"] * info["height"] > max_pixels:
+            print(f"[DISPLAY] Rejecting payload: {info['width']}x{info['height']} is too big")
+            return None
+        
+        if DEBUG:
+            print(f"[DISPLAY] WebP {info['width']}x{info['height']}, "
+                  f"{info['frames']} frames, {'lossless' if info['lossless'] else 'lossy'}")
+        return info
+    
+    def _decode_ahead(self, frame_data):
+        """Decode the next app's first frame into the standby buffer.
+        
+        Done by the fetch task while the current app is still showing.
+        Returns True if the standby buffer holds the frame; if not, it's
+        decoded from the payload at the switch.
+        """
+        info = self._probe(frame_data)
+        if info is None:
+            return False
+        try:
+            if info["animated"]:
+                anim = webpdec.Animation(frame_data, self._standby, **self._decode_opts)
+                try:
+                    for _ in anim:
+                        return True
+                finally:
+                    anim.close()
+                return False
+            webpdec.decode_into(frame_data, self._standby, **self._decode_opts)
+            return True
+        except Exception as e:
+            print(f"[PREFETCH] Could not decode ahead: {e}")
+            return False
+    
+    def _show_standby(self):
+        """Switch to the prefetched app: one copy and one present."""
+        self._decode_buf[:] = self._standby
+        self._present()
+    
+    def _present(self, y0=0, y1=None):
+        """Show freshly decoded rows y0 to y1-1 on the matrix.
+        
+        Whole frames are diffed against the one already shown, so only
+        the changed regions are drawn, or nothing if none changed.
+        """
+        if self._switch_t0 is not None:
+            # First pixels of a new app
+            print(f"[MAIN] App switch took {time.ticks_diff(time.ticks_ms(), self._switch_t0)}ms")
+            self._switch_t0 = None
+        if not self._first_shown:
+            self._first_shown = True
+            print(f"[MAIN] First frame on the panel {time.ticks_ms()}ms after boot")
+        if self._push_t0 is not None:
+            seq, received = self._push_t0
+            self._push_t0 = None
+            print(f"[PUSH] Frame {seq} received to pixels: "
+                  f"{time.ticks_diff(time.ticks_ms(), received)}ms")
+            self._push_shown = seq
+        if self._back is not None:
+            self._flip(y0, y1)
+            return
+        
+        rects = None
+        if y0 == 0 and y1 is None and self._shown is not None:
+            rects = self._diff_frame()
+            if not rects:
+                return
+        else:
+            # Rows streamed in piecemeal; resync on the next whole frame
+            self._shown_valid = False
+        
+        if self.frame_buf is not None:
+            self._display_rgb565(self.frame_buf, y0, y1, rects)
+            return
+        
+        # Already decoded into the framebuffer; the driver can only push
+        # all of it, so diffing just spares unchanged frames
+        self.i75.update()
+        if DEBUG:
+            print(f"[DISPLAY] Frame displayed: rows {y0}-{(y1 or self.height) - 1}")
+    
+    def _flip(self, y0=0, y1=None):
+        """Present the back buffer (rows y0 to y1-1) with a single update.
+        
+        Decoding never touches the framebuffer, so a slow or failed decode
+        can't leave a half-drawn frame on the panel. A flip costs one
+        fixed-size copy (with FRAME_DIFF, just the changed pixels) and
+        the update, however complex the image.
+        """
+        if y0 == 0 and y1 is None and self._frame_diff:
+            # Copies the changed pixels to the framebuffer as it goes
+            rects = webpdec.diff(self._fb, self._back, self.width, self._fb_bpp)
+            pixels = self.width * self.height
+            self._diff_pixels += pixels
+            self._diff_skipped += pixels - sum(w * h for _, _, w, h in rects)
+            if not rects:
+                return
+        else:
+            row = self.width * self._fb_bpp
+            y1 = self.height if y1 is None else y1
+            self._fb[y0 * row:y1 * row] = self._back[y0 * row:y1 * row]
+        
+        self.i75.update()
+        if DEBUG:
+            print(f"[DISPLAY] Frame flipped: rows {y0}-{(y1 or self.height) - 1}")
+    
+    def _diff_frame(self):
+        """Return the (x, y, w, h) regions changed since the last frame."""
+        pixels = self.width * self.height
+        self._diff_pixels += pixels
+        if not self._shown_valid:
+            self._shown[:] = self._decode_buf
+            self._shown_valid = True
+            return [(0, 0, self.width, self.height)]
+        
+        rects = webpdec.diff(self._shown, self._decode_buf, self.width, self._diff_bpp)
+        self._diff_skipped += pixels - sum(w * h for _, _, w, h in rects)
+        return rects
+    
+    def _display_rgb565(self, rgb565_data, y0=0, y1=None, rects=None):
+        """Display RGB565 data (rows y0 to y1-1, or just rects) on the matrix."""
+        if y1 is None:
+            y1 = self.height
+        
         if self._display_type == "interstate75":
-            # Interstate 75 uses 16-bit RGB565
-            for y in range(self.height):
-                for x in range(self.width):
-                    idx = (y * self.width + x) * 2
-                    if idx + 1 < len(rgb565_data):
-                        # RGB565 is little-endian
-                        pixel = rgb565_data[idx] | (rgb565_data[idx + 1] << 8)
-                        
-                        # Extract RGB components
-                        r = ((pixel >> 11) & 0x1F) << 3
-                        g = ((pixel >> 5) & 0x3F) << 2
-                        b = (pixel & 0x1F) << 3
-                        
-                        self.graphics.set_pen(self.graphics.create_pen(r, g, b))
-                        self.graphics.pixel(x, y)
+            if self._fb is not None and WEBP_AVAILABLE:
+                # Native blit straight into the PicoGraphics framebuffer
+                if rects is not None:
+                    webpdec.blit(self._fb, rgb565_data, rects, self.width)
+                elif y0 == 0 and y1 == self.height:
+                    webpdec.blit(self._fb, rgb565_data)
+                else:
+                    src_row = self.width * 2
+                    dst_row = self.width * self._fb_bpp
+                    webpdec.blit(self._fb[y0 * dst_row:y1 * dst_row],
+                                 memoryview(rgb565_data)[y0 * src_row:y1 * src_row])
+            elif rects is not None:
+                for x, y, w, h in rects:
+                    self._display_rgb565_pixels(rgb565_data, y, y + h, x, x + w)
+            else:
+                self._display_rgb565_pixels(rgb565_data, y0, y1)
             
             self.i75.update()
             
         if DEBUG:
-            print(f"[DISPLAY] Frame displayed: {len(rgb565_data)} bytes")
+            print(f"[DISPLAY] Frame displayed: rows {y0}-{y1 - 1}")
+    
+    def _display_rgb565_pixels(self, rgb565_data, y0, y1, x0=0, x1=None):
+        """Draw RGB565 rows pixel by pixel (no framebuffer access)."""
+        for y in range(y0, y1):
+            for x in range(x0, self.width if x1 is None else x1):
+                idx = (y * self.width + x) * 2
+                if idx + 1 < len(rgb565_data):
+                    # RGB565 is little-endian
+                    pixel = rgb565_data[idx] | (rgb565_data[idx + 1] << 8)
+                    
+                    # Extract RGB components
+                    r = ((pixel >> 11) & 0x1F) << 3
+                    g = ((pixel >> 5) & 0x3F) << 2
+                    b = (pixel & 0x1F) << 3
+                    
+                    self.graphics.set_pen(self.graphics.create_pen(r, g, b))
+                    self.graphics.pixel(x, y)
     
     def run(self):
         """Main loop - fetch and display frames."""
@@ -709,59 +2021,401 @@ class TronbytClient:
             while True:
                 time.sleep(1)
         
-        # Connect to WiFi
-        try:
-            self.connect_wifi()
-        except Exception as e:
-            print(f"[MAIN] WiFi connection failed: {e}")
-            self.show_message("WiFi Error", (255, 0, 0))
-            time.sleep(5)
-            # Retry
-            return self.run()
+        asyncio.run(self._main())
+    
+    async def _main(self):
+        """Run the client's tasks.
         
+        The fetch task talks to the server, the player task shows what it
+        fetched (or the player thread on core 1, pipelined), the WiFi task
+        keeps the link up and housekeeping collects garbage. They only
+        meet at the payload slot and the network is only touched through
+        asyncio sockets, so a slow server never holds up a frame.
+        """
         print(f"\nConnecting to Tronbyt server: {self.server_url}")
         print(f"Display ID: {self.display_id}")
         print("="*60 + "\n")
         
-        # Main loop
+        self._link_up = asyncio.Event()
+        # Cached frames first, so one is on the panel before WiFi starts
+        tasks = [self._replay_task()]
+        if self.pipeline and _thread is not None:
+            self._start_player_thread()
+        else:
+            if self.pipeline:
+                print("[MAIN] PIPELINE set but _thread is unavailable, playing on core 0")
+            tasks.append(self._player_task())
+        tasks += [self._wifi_task(), self._fetch_task(), self._housekeeping_task()]
+        await asyncio.gather(*tasks)
+    
+    async def _wifi_task(self):
+        """Bring the WiFi link up, and back up whenever it drops.
+        
+        The fetch task waits for the link; the player carries on showing
+        the current app while it's down.
+        """
+        while True:
+            if self._wlan is None or not self._wlan.isconnected():
+                if self._link_up.is_set():
+                    print("[WIFI] Link lost, reconnecting")
+                    self._link_up.clear()
+                    self.http.close()
+                    self._go_offline()
+                try:
+                    await self.connect_wifi(quiet=self._first_shown or self._offline)
+                except Exception as e:
+                    print(f"[MAIN] WiFi connection failed: {e}")
+                    if not (self._first_shown or self._offline):
+                        self.show_message("WiFi Error", (255, 0, 0))
+                    await asyncio.sleep(5)
+                    continue
+                self._link_up.set()
+            await asyncio.sleep(self.WIFI_CHECK_SECS)
+    
+    async def _fetch_task(self):
+        """Fetch each next app as soon as the player has room for it.
+        
+        Pipelined, that's as soon as core 1 has taken the last payload;
+        otherwise PREFETCH_SECS before the current dwell ends, and a new
+        app's first frame is decoded ahead into the standby buffer so the
+        switch is one copy.
+        
+        With PUSH on, the server's device socket comes first: frames are
+        received from it for as long as it's up, and polling only takes
+        over while it isn't.
+        """
         loop_count = 0
         while True:
+            await self._link_up.wait()
+            if self.push and (self._push_retry_at is None or time.ticks_diff(
+                    time.ticks_ms(), self._push_retry_at) >= 0):
+                if await self._push_session():
+                    # It was working: reconnect straight away
+                    self._push_retry_at = None
+                    await asyncio.sleep(RETRY_DELAY)
+                else:
+                    print(f"[PUSH] Polling instead; next socket attempt in {self.push_retry_secs}s")
+                    self._push_retry_at = time.ticks_add(time.ticks_ms(),
+                                                         self.push_retry_secs * 1000)
+                continue
+            
+            # The body buffer this fetch reuses held the payload before
+            # last: wait until the player has moved on to the last one
+            # (cached frames are replaced as soon as there's a live one)
+            while not self._slot_free() or (
+                    self._fetch_at is not None and not self._offline
+                    and time.ticks_diff(self._fetch_at, time.ticks_ms()) > 0):
+                await asyncio.sleep_ms(50)
+            
             try:
                 loop_count += 1
                 if DEBUG or loop_count % 10 == 1:
-                    print(f"[MAIN] Loop iteration {loop_count}")
+                    print(f"[MAIN] Fetch iteration {loop_count}")
                 
-                # Fetch frame
-                frame_data, dwell_secs, content_type = self.fetch_frame()
-                
-                if frame_data:
-                    # Decode and display
-                    if self.decode_and_display(frame_data):
-                        if DEBUG:
-                            print(f"[MAIN] Frame displayed, sleeping for {dwell_secs}s")
-                    else:
-                        self.show_message("Decode Error", (255, 0, 0))
-                else:
+                if self._handoff is not None and self._handoff.take_failure():
+                    # Core 1 couldn't play the last frame: no 304 for it
+                    self._forget_frame()
+                frame_data, dwell_secs, _ = await self.fetch_frame()
+                if not frame_data:
+                    # The player keeps showing the current app meanwhile,
+                    # then cached ones
                     print("[MAIN] No frame received from server")
-                    self.show_message("No Frame", (255, 128, 0))
-                
-                # Wait before next fetch
-                time.sleep(dwell_secs)
+                    if not (self._first_shown or self._offline):
+                        self.show_message("No Frame", (255, 128, 0))
+                    await self._back_off()
+                    continue
+                if self._failures:
+                    print(f"[MAIN] Server back after {self._failures} failed fetches")
+                    self._failures = 0
                 
+                # An unchanged payload is the one the player already has,
+                # so it stays in its buffer; a new one is in the receive
+                # buffer, and the next fetch uses the other
+                unchanged = self._not_modified
+                ready = False
+                if self._standby is not None and not unchanged and frame_data is not self._stream:
+                    ready = self._decode_ahead(frame_data)
+                # The cache may have queued a frame during the fetch
+                while not self._slot_free():
+                    await asyncio.sleep_ms(20)
+                urgent = self._offline
+                self._offline = False
+                self._hand_off(frame_data, dwell_secs, unchanged, ready, urgent)
+                frame_data = None
+                if not unchanged:
+                    self.http.next_buffer()
+                    if self.cache is not None and self._raw_frame is not None:
+                        await self.cache.store(self._raw_frame, dwell_secs)
+                self._raw_frame = None
             except Exception as e:
-                print(f"[MAIN] Error in main loop: {e}")
-                import sys
+                print(f"[MAIN] Error in fetch loop: {e}")
                 sys.print_exception(e)
-                try:
-                    self.show_message("Error", (255, 0, 0))
-                except:
-                    pass
-                time.sleep(5)
+                await self._back_off()
+    
+    def _go_offline(self):
+        """Play cached frames until live content is back, if there are any."""
+        if self.cache and not self._offline:
+            print(f"[MAIN] Server unreachable, playing {len(self.cache)} cached frames")
+            self._offline = True
+            # The panel won't be showing the last frame: no 304 for it
+            self._forget_frame()
+    
+    async def _back_off(self):
+        """Wait after a failed fetch, twice as long each time in a row.
+        
+        From OFFLINE_AFTER failures on, cached frames play meanwhile.
+        Up to a quarter is added at random, so the displays in a
+        building don't all come back at the same moment.
+        """
+        import os
+        self._failures += 1
+        if self._failures >= self.OFFLINE_AFTER:
+            self._go_offline()
+        delay_ms = int(min(RETRY_DELAY * 2 ** min(self._failures - 1, 16), self.retry_max) * 1000)
+        delay_ms += delay_ms * os.urandom(1)[0] // 1024
+        if DEBUG:
+            print(f"[MAIN] Next fetch in {delay_ms}ms")
+        await asyncio.sleep_ms(delay_ms)
+    
+    async def _push_session(self):
+        """Play frames pushed over the server's device socket until it fails.
+        
+        Text messages are JSON control messages: dwell_secs applies to
+        the frames after it, brightness straight away. Binary messages
+        are WebP frames, which replace the app playing at once. Returns
+        how many frames were received.
+        """
+        import json
+        try:
+            status = await self.http.upgrade(self._host, self._port, self.push_path,
+                                             self._auth_headers)
+        except Exception as e:
+            print(f"[PUSH] Could not open the socket: {e}")
+            return 0
+        if status != 101:
+            print(f"[PUSH] Server has no device socket at {self.push_path} (HTTP {status})")
+            return 0
+        print(f"[PUSH] Connected to {self._host}:{self._port}{self.push_path}")
+        
+        self._push_active = True
+        self._push_shown = None
+        sender = asyncio.create_task(self._push_sender())
+        frames = 0
+        dwell_secs = self._last_dwell
+        try:
+            while True:
+                # The next frame goes into the body buffer of the payload
+                # before last: wait until the player has moved on from it
+                while not self._slot_free():
+                    await asyncio.sleep_ms(20)
+                
+                opcode, data = await asyncio.wait_for(self.http.ws_recv(),
+                                                      self.PUSH_IDLE_SECS)
+                if opcode == self.http.WS_TEXT:
+                    try:
+                        message = json.loads(data)
+                    except ValueError:
+                        print(f"[PUSH] Ignoring message: {data[:40]}")
+                        continue
+                    if DEBUG:
+                        print(f"[PUSH] Message: {message}")
+                    if "dwell_secs" in message:
+                        dwell_secs = int(message["dwell_secs"])
+                    if "brightness" in message:
+                        self.set_brightness(int(message["brightness"]))
+                elif opcode == self.http.WS_BINARY:
+                    frames += 1
+                    self._push_seq = frames
+                    self._push_received = time.ticks_ms()
+                    if DEBUG:
+                        print(f"[PUSH] Frame {frames}: {len(data)} bytes in "
+                              f"{self.http.recv_us // 1000}ms, dwell={dwell_secs}s")
+                    self._offline = False
+                    self._failures = 0
+                    self._hand_off(data, dwell_secs, False, False, urgent=True)
+                    self.http.next_buffer()
+                    if self.cache is not None:
+                        await self.cache.store(data, dwell_secs)
+                    data = None
+        except asyncio.TimeoutError:
+            print(f"[PUSH] Socket silent for {self.PUSH_IDLE_SECS}s, dropping it")
+        except Exception as e:
+            print(f"[PUSH] Socket error: {e}")
+        finally:
+            sender.cancel()
+            self._push_active = False
+            self.http.close()
+        return frames
+    
+    async def _push_sender(self):
+        """Tell the server when each pushed frame is on the panel, and ping
+        the socket so a dead link is noticed."""
+        import json
+        last_ping = time.ticks_ms()
+        while True:
+            await asyncio.sleep_ms(20)
+            seq = self._push_shown
+            if seq is not None:
+                self._push_shown = None
+                await self.http.ws_send(json.dumps({"displaying": seq}))
+            if time.ticks_diff(time.ticks_ms(), last_ping) >= self.PUSH_PING_SECS * 1000:
+                last_ping = time.ticks_ms()
+                await self.http.ws_send(b"", self.http.WS_PING)
+    
+    def _slot_free(self):
+        """True once the player has taken the last payload handed off."""
+        if self._handoff is not None:
+            return self._handoff.empty()
+        return self._queued is None
+    
+    def _took_payload(self):
+        """The player has taken the queued payload: time it if pushed."""
+        self._urgent = False
+        if self._push_received is not None:
+            self._push_t0 = (self._push_seq, self._push_received)
+            self._push_received = None
+    
+    def _hand_off(self, frame_data, dwell_secs, unchanged, ready, urgent=False):
+        """Queue a payload for the player task or thread; urgent ones
+        replace the app playing at once."""
+        # Before queueing: core 1 clears it when it takes the payload
+        self._urgent = urgent
+        if self._handoff is not None:
+            self._handoff.put((frame_data, dwell_secs, self._next_brightness, unchanged))
+            self._next_brightness = None
+        else:
+            self._queued = (frame_data, dwell_secs, unchanged, ready)
+    
+    async def _player_task(self):
+        """Play each fetched payload for its dwell."""
+        while True:
+            payload = self._queued
+            if payload is None:
+                # Hold what's on the panel until the next app is fetched
+                self._player_idle = True
+                await asyncio.sleep_ms(20)
+                continue
             
-            # Force garbage collection
+            self._queued = None
+            self._player_idle = False
+            self._took_payload()
+            frame_data, dwell_secs, unchanged, ready = payload
+            payload = None
+            self._fetch_at = time.ticks_add(
+                time.ticks_ms(), max(0, dwell_secs - self.prefetch_secs) * 1000)
+            try:
+                if unchanged:
+                    # Same app: nothing new to show
+                    self._switch_t0 = None
+                elif ready:
+                    self._show_standby()
+                
+                if DEBUG:
+                    print(f"[MAIN] Playing frame for {dwell_secs}s")
+                if await self.play_async(frame_data, dwell_secs, unchanged, ready):
+                    self._played += 1
+                else:
+                    self._forget_frame()
+                    self.show_message("Decode Error", (255, 0, 0))
+                    await asyncio.sleep(dwell_secs)
+                self._switch_t0 = time.ticks_ms()
+            except Exception as e:
+                print(f"[PLAYER] Error: {e}")
+                sys.print_exception(e)
+                self._forget_frame()
+                await asyncio.sleep(1)
+            frame_data = None
+    
+    async def _replay_task(self):
+        """Play cached frames, with their dwells, until a live one arrives.
+        
+        Each is read into the spare body buffer once the player is done
+        with the last one; a live frame replaces it at once.
+        """
+        while True:
+            if (self._offline and self.cache and self._player_idle
+                    and self._slot_free()):
+                cached = self.cache.load_next(self.http)
+                if cached is not None:
+                    if DEBUG:
+                        print(f"[CACHE] Replaying a cached frame, dwell={cached[1]}s")
+                    self._hand_off(cached[0], cached[1], False, False)
+                    cached = None
+            await asyncio.sleep_ms(20)
+    
+    async def _housekeeping_task(self):
+        """Collect garbage between frames, and log stats when debugging."""
+        runs = 0
+        while True:
+            await asyncio.sleep(self.HOUSEKEEPING_SECS)
             gc.collect()
-            if DEBUG and loop_count % 10 == 0:
-                print(f"[MAIN] Free memory: {gc.mem_free()} bytes")
+            runs += 1
+            if DEBUG and runs % 12 == 0:
+                print(f"[MAIN] Free memory: {gc.mem_free()} bytes, {self._played} apps played")
+                print(f"[HTTP] {self.http.stats()}")
+                print(f"[FETCH] {self.full_fetches} full fetches, {self.not_modified} not "
+                      f"modified (304), {self.bytes_saved} bytes not downloaded")
+    
+    def _start_player_thread(self):
+        """Pipelined mode: decode and display on core 1.
+        
+        Core 0 only fetches: each payload is handed to the player thread
+        as soon as it's queued, so the next app downloads while the
+        current one is still showing and the switch costs a decode, not
+        a fetch. Core 1 owns the display, so core 0 never draws once it
+        has started (its status messages go through the handoff) and
+        the streaming decoder (which writes the framebuffer from recv())
+        is not used. Core 1 doesn't touch the fetch state either: a
+        payload that fails to play is reported back for core 0 to act on.
+        """
+        print("[MAIN] Pipelined mode: fetching on core 0, decoding on core 1")
+        self._stream = None
+        self._handoff = PayloadHandoff()
+        ready = _thread.allocate_lock()
+        ready.acquire()
+        _thread.start_new_thread(self._player_loop, (ready,))
+        ready.acquire()     # Player's thread id is set
+    
+    def _player_loop(self, ready):
+        """Core 1: play each handed-off payload for its dwell."""
+        self._player_id = _thread.get_ident()
+        ready.release()
+        
+        while True:
+            payload = self._handoff.take()
+            if payload is None:
+                # Hold what's on the panel until core 0 has the next app;
+                # its status messages only stand in for a first one
+                self._player_idle = True
+                message = self._handoff.take_message()
+                if message is not None and not self._first_shown:
+                    self.show_message(*message)
+                message = None
+                time.sleep_ms(20)
+                continue
+            
+            self._player_idle = False
+            self._took_payload()
+            frame_data, dwell_secs, brightness, unchanged = payload
+            payload = None
+            if unchanged:
+                self._switch_t0 = None
+            try:
+                if brightness is not None:
+                    self.set_brightness(brightness)
+                if self.play(frame_data, dwell_secs, unchanged):
+                    self._played += 1
+                else:
+                    self._handoff.fail()
+                    self.show_message("Decode Error", (255, 0, 0))
+                    time.sleep(dwell_secs)
+                self._switch_t0 = time.ticks_ms()
+            except Exception as e:
+                print(f"[PLAYER] Error: {e}")
+                sys.print_exception(e)
+                self._handoff.fail()
+                time.sleep(1)
+            frame_data = None
 
 
 # Entry point
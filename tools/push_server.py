@@ -0,0 +1,217 @@
+"""
+Stand-in Tronbyt server for testing push mode end to end
+Serves the WebP files in a directory, in turn, to one or more displays:
+
+  /<id>/ws                  WebSocket device socket: each frame is pushed
+                            as a {"dwell_secs": N} text message followed by
+                            the WebP as a binary message, one per dwell
+  /v0/devices/<id>/next     the polling endpoint, for the fallback
+
+The display acknowledges each pushed frame with {"displaying": seq} once
+it's on the panel; the time from sending the frame to that ack is logged
+as push to pixel (it includes the ack's trip back), with a summary on
+Ctrl-C.
+
+Runs on the host with CPython 3.8+ and no extra packages, from the repo
+root:
+    python3 tools/push_server.py --dir bench/corpus --dwell 5
+
+Point the display at it with TRONBYT_SERVER_URL = "http://<host>:8000".
+--no-push answers the socket with 404 so the display falls back to
+polling; --drop-after N closes each socket after N frames to test the
+reconnect.
+"""
+
+import argparse
+import asyncio
+import base64
+import hashlib
+import json
+import os
+import struct
+import time
+
+WS_GUID = b"258EAFA5-E914-47DA-95CA-C5AB0DC11B65"
+
+
+class Frames:
+    """The WebP files to serve, in turn."""
+
+    def __init__(self, directory):
+        self.files = []
+        for name in sorted(os.listdir(directory)):
+            if name.endswith(".webp"):
+                with open(os.path.join(directory, name), "rb") as f:
+                    self.files.append((name, f.read()))
+        if not self.files:
+            raise SystemExit(f"No .webp files in {directory}")
+        self.index = 0
+
+    def next(self):
+        name, data = self.files[self.index % len(self.files)]
+        self.index += 1
+        return name, data
+
+
+async def read_head(reader):
+    """Request line and headers (lowercase names), or None at EOF."""
+    line = await reader.readline()
+    if not line:
+        return None
+    method, path, _ = line.decode().split(" ", 2)
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, value = line.decode().split(":", 1)
+        headers[name.strip().lower()] = value.strip()
+    return method, path, headers
+
+
+async def read_message(reader):
+    """One (masked) WebSocket frame from the display: (opcode, payload)."""
+    b0, b1 = await reader.readexactly(2)
+    n = b1 & 0x7f
+    if n == 126:
+        n = struct.unpack(">H", await reader.readexactly(2))[0]
+    elif n == 127:
+        n = struct.unpack(">Q", await reader.readexactly(8))[0]
+    mask = await reader.readexactly(4) if b1 & 0x80 else b"\0\0\0\0"
+    data = bytearray(await reader.readexactly(n))
+    for i in range(n):
+        data[i] ^= mask[i & 3]
+    return b0 & 0x0f, bytes(data)
+
+
+def frame(opcode, payload):
+    """An unmasked WebSocket frame (server to display)."""
+    n = len(payload)
+    if n < 126:
+        head = struct.pack(">BB", 0x80 | opcode, n)
+    elif n < 65536:
+        head = struct.pack(">BBH", 0x80 | opcode, 126, n)
+    else:
+        head = struct.pack(">BBQ", 0x80 | opcode, 127, n)
+    return head + payload
+
+
+class Server:
+    def __init__(self, args):
+        self.args = args
+        self.frames = Frames(args.dir)
+        self.latencies = []
+
+    async def handle(self, reader, writer):
+        peer = writer.get_extra_info("peername")
+        try:
+            while True:
+                head = await read_head(reader)
+                if head is None:
+                    break
+                method, path, headers = head
+                if headers.get("upgrade", "").lower() == "websocket" and path.endswith("/ws"):
+                    if self.args.no_push:
+                        self.respond(writer, "404 Not Found", b"")
+                        await writer.drain()
+                        continue
+                    await self.push(reader, writer, headers, peer)
+                    break
+                if path.endswith("/next"):
+                    name, data = self.frames.next()
+                    print(f"[SERVER] {peer[0]} polled: {name}, {len(data)} bytes")
+                    self.respond(writer, "200 OK", data, {
+                        "Content-Type": "image/webp",
+                        "Tronbyt-Dwell-Secs": str(self.args.dwell),
+                    })
+                else:
+                    self.respond(writer, "404 Not Found", b"")
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    def respond(self, writer, status, body, headers=None):
+        lines = [f"HTTP/1.1 {status}", f"Content-Length: {len(body)}"]
+        for name, value in (headers or {}).items():
+            lines.append(f"{name}: {value}")
+        writer.write(("\r\n".join(lines) + "\r\n\r\n").encode() + body)
+
+    async def push(self, reader, writer, headers, peer):
+        accept = base64.b64encode(hashlib.sha1(
+            headers["sec-websocket-key"].encode() + WS_GUID).digest()).decode()
+        writer.write(("HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\n"
+                      "Connection: Upgrade\r\nSec-WebSocket-Accept: "
+                      f"{accept}\r\n\r\n").encode())
+        await writer.drain()
+        print(f"[SERVER] {peer[0]} opened the device socket")
+
+        sent = {}
+        sender = asyncio.ensure_future(self.push_frames(writer, sent, peer))
+        try:
+            while True:
+                opcode, data = await read_message(reader)
+                if opcode == 8:
+                    break
+                if opcode == 9:
+                    writer.write(frame(10, data))
+                    await writer.drain()
+                elif opcode == 1:
+                    seq = json.loads(data).get("displaying")
+                    if seq in sent:
+                        ms = (time.monotonic() - sent.pop(seq)) * 1000
+                        self.latencies.append(ms)
+                        print(f"[SERVER] {peer[0]} frame {seq}: push to pixel {ms:.0f}ms")
+        finally:
+            sender.cancel()
+            print(f"[SERVER] {peer[0]} device socket closed")
+
+    async def push_frames(self, writer, sent, peer):
+        seq = 0
+        while True:
+            if self.args.drop_after and seq >= self.args.drop_after:
+                print(f"[SERVER] Dropping {peer[0]} after {seq} frames")
+                writer.close()
+                return
+            seq += 1
+            name, data = self.frames.next()
+            writer.write(frame(1, json.dumps({"dwell_secs": self.args.dwell}).encode()))
+            writer.write(frame(2, data))
+            await writer.drain()
+            sent[seq] = time.monotonic()
+            print(f"[SERVER] {peer[0]} pushed frame {seq}: {name}, {len(data)} bytes")
+            await asyncio.sleep(self.args.dwell)
+
+    def summary(self):
+        if self.latencies:
+            lat = sorted(self.latencies)
+            print(f"[SERVER] Push to pixel over {len(lat)} frames: "
+                  f"avg {sum(lat) / len(lat):.0f}ms, median {lat[len(lat) // 2]:.0f}ms, "
+                  f"max {lat[-1]:.0f}ms")
+
+
+async def main(args):
+    server = Server(args)
+    listener = await asyncio.start_server(server.handle, args.host, args.port)
+    print(f"[SERVER] Serving {len(server.frames.files)} files from {args.dir} "
+          f"on {args.host}:{args.port}{' (push off)' if args.no_push else ''}")
+    try:
+        async with listener:
+            await listener.serve_forever()
+    finally:
+        server.summary()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--dir", default="bench/corpus")
+    parser.add_argument("--dwell", type=int, default=5)
+    parser.add_argument("--no-push", action="store_true")
+    parser.add_argument("--drop-after", type=int, default=0)
+    try:
+        asyncio.run(main(parser.parse_args()))
+    except KeyboardInterrupt:
+        pass
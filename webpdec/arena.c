@@ -0,0 +1,130 @@
+/*
+ * Fixed arena for libwebp's working memory
+ *
+ * Blocks are laid out back to back from the start of the arena, each
+ * behind a small header. New blocks come from the first freed block big
+ * enough (merging freed neighbours on the way) or else from the end.
+ * libwebp makes a few dozen allocations per decode, so the walk is short.
+ */
+
+#include <stdbool.h>
+#include <stdint.h>
+#include <string.h>
+
+#include "arena.h"
+
+#define ARENA_ALIGN (8)
+#define ARENA_ALIGN_UP(n) (((n) + ARENA_ALIGN - 1) & ~(size_t)(ARENA_ALIGN - 1))
+
+typedef struct _arena_block_t {
+    uint32_t size;      // Whole block, header included
+    uint32_t used;
+} arena_block_t;
+
+static uint8_t arena[WEBPDEC_ARENA_SIZE] __attribute__((aligned(ARENA_ALIGN)));
+static size_t arena_top;        // End of the last block
+static size_t arena_used;
+static size_t arena_live;       // Blocks in use
+static size_t arena_peak;
+static size_t arena_failed;
+
+static void *arena_take(arena_block_t *block) {
+    block->used = 1;
+    arena_used += block->size;
+    arena_live++;
+    if (arena_top > arena_peak) {
+        arena_peak = arena_top;
+    }
+    return block + 1;
+}
+
+void *webpdec_arena_malloc(size_t size) {
+    if (size == 0 || size > WEBPDEC_ARENA_SIZE) {
+        arena_failed++;
+        return NULL;
+    }
+    size_t need = ARENA_ALIGN_UP(size + sizeof(arena_block_t));
+
+    // First fit among freed blocks
+    size_t offset = 0;
+    while (offset < arena_top) {
+        arena_block_t *block = (arena_block_t *)(arena + offset);
+        if (!block->used) {
+            while (offset + block->size < arena_top) {
+                arena_block_t *next = (arena_block_t *)(arena + offset + block->size);
+                if (next->used) {
+                    break;
+                }
+                block->size += next->size;
+            }
+            if (offset + block->size == arena_top) {
+                // Free all the way to the end: hand it back to the tail
+                arena_top = offset;
+                break;
+            }
+            if (block->size >= need) {
+                // Split off the rest if it's worth a block of its own
+                if (block->size - need >= sizeof(arena_block_t) + ARENA_ALIGN) {
+                    arena_block_t *rest = (arena_block_t *)(arena + offset + need);
+                    rest->size = block->size - need;
+                    rest->used = 0;
+                    block->size = need;
+                }
+                return arena_take(block);
+            }
+        }
+        offset += block->size;
+    }
+
+    // Else carve a new block off the end
+    if (need > WEBPDEC_ARENA_SIZE - arena_top) {
+        arena_failed++;
+        return NULL;
+    }
+    arena_block_t *block = (arena_block_t *)(arena + arena_top);
+    block->size = need;
+    arena_top += need;
+    return arena_take(block);
+}
+
+void *webpdec_arena_calloc(size_t count, size_t size) {
+    if (size != 0 && count > SIZE_MAX / size) {
+        arena_failed++;
+        return NULL;
+    }
+    void *ptr = webpdec_arena_malloc(count * size);
+    if (ptr != NULL) {
+        memset(ptr, 0, count * size);
+    }
+    return ptr;
+}
+
+void webpdec_arena_free(void *ptr) {
+    uint8_t *p = ptr;
+    if (p < arena + sizeof(arena_block_t) || p >= arena + arena_top) {
+        return;
+    }
+    arena_block_t *block = (arena_block_t *)p - 1;
+    block->used = 0;
+    arena_used -= block->size;
+    arena_live--;
+
+    if (arena_live == 0) {
+        // Nothing live, so the whole arena is free again
+        arena_top = 0;
+    } else if ((uint8_t *)block + block->size == arena + arena_top) {
+        arena_top = (uint8_t *)block - arena;
+    }
+}
+
+void webpdec_arena_get_stats(webpdec_arena_stats_t *stats) {
+    stats->size = WEBPDEC_ARENA_SIZE;
+    stats->used = arena_used;
+    stats->peak = arena_peak;
+    stats->failed = arena_failed;
+}
+
+void webpdec_arena_reset_peak(void) {
+    arena_peak = arena_top;
+    arena_failed = 0;
+}
@@ -0,0 +1,48 @@
+/*
+ * Fixed arena for libwebp's working memory
+ *
+ * libwebp allocates through malloc/calloc/free in src/utils/utils.c; the
+ * build maps those to the functions here (see micropython.mk), so a
+ * decode never touches the MicroPython heap or the C heap. The arena is
+ * static, sized at build time, and returns to empty whenever nothing in
+ * it is live, i.e. after every one-shot decode.
+ *
+ * Plain C with no MicroPython dependencies.
+ */
+
+#ifndef WEBPDEC_ARENA_H
+#define WEBPDEC_ARENA_H
+
+#include <stddef.h>
+
+// Sized for 128x64 panels: an animation's two RGBA canvases, lossless
+// decoder state and a still being streamed in alongside. The placeholder
+// build has no libwebp to serve, so it doesn't reserve the RAM.
+#ifndef WEBPDEC_ARENA_SIZE
+#if WEBPDEC_HAVE_LIBWEBP
+#define WEBPDEC_ARENA_SIZE (160 * 1024)
+#else
+#define WEBPDEC_ARENA_SIZE (8)
+#endif
+#endif
+
+// Usage figures for sizing the arena, all in bytes
+typedef struct _webpdec_arena_stats_t {
+    size_t size;        // WEBPDEC_ARENA_SIZE
+    size_t used;        // Live allocations, headers included
+    size_t peak;        // High-water mark of the arena's extent
+    size_t failed;      // Allocations refused for lack of space
+} webpdec_arena_stats_t;
+
+// Drop-in replacements for malloc/calloc/free. Allocation returns NULL
+// when the arena is full, which libwebp reports as out of memory.
+void *webpdec_arena_malloc(size_t size);
+void *webpdec_arena_calloc(size_t count, size_t size);
+void webpdec_arena_free(void *ptr);
+
+void webpdec_arena_get_stats(webpdec_arena_stats_t *stats);
+
+// Start a new high-water mark from the current extent
+void webpdec_arena_reset_peak(void);
+
+#endif // WEBPDEC_ARENA_H
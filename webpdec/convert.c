@@ -0,0 +1,436 @@
+/*
+ * Pixel format conversion for the webpdec module
+ */
+
+#include <math.h>
+#include <string.h>
+
+#include "convert.h"
+
+#define MIN(a, b) ((a) < (b) ? (a) : (b))
+
+// Colour correction shared by all output stages
+static convert_lut_t convert_lut;
+static bool convert_lut_ready;
+
+// 4x4 Bayer matrix, thresholds 0-15
+static const uint8_t convert_bayer[4][4] = {
+    {  0,  8,  2, 10 },
+    { 12,  4, 14,  6 },
+    {  3, 11,  1,  9 },
+    { 15,  7, 13,  5 },
+};
+
+// RGB565 dither tables: the corrected value plus each threshold, clamped,
+// masked and shifted into place. A Bayer threshold t adds t / 16 of a
+// quantisation step, i.e. t >> 1 for 5-bit channels and t >> 2 for 6-bit
+// green. Block t >> 1 holds red, green and blue one after another, so a
+// matrix column needs one pointer and a dithered pixel costs the same
+// three loads as a plain one.
+static uint16_t convert_dither565[8][3 * 256];
+
+// The same for RGB332, whose steps are 32 (red, green) and 64 (blue)
+// wide: block u adds 4u to red and green and 16 (u >> 1) to blue.
+static uint8_t convert_dither332[8][3 * 256];
+
+const convert_lut_t *convert_lut_get(void) {
+    if (!convert_lut_ready) {
+        const float one[3] = { 1.0f, 1.0f, 1.0f };
+        convert_lut_set(one, one, CONVERT_DITHER_NONE);
+    }
+    return &convert_lut;
+}
+
+void convert_lut_set(const float gamma[3], const float brightness[3], int dither) {
+    uint8_t *tables[3] = { convert_lut.r, convert_lut.g, convert_lut.b };
+    
+    for (int c = 0; c < 3; c++) {
+        for (int i = 0; i < 256; i++) {
+            float v = 255.0f * brightness[c] * powf(i / 255.0f, gamma[c]) + 0.5f;
+            tables[c][i] = v >= 255.0f ? 255 : v <= 0.0f ? 0 : (uint8_t)v;
+        }
+    }
+    for (int i = 0; i < 256; i++) {
+        convert_lut.rgb565_r[i] = (convert_lut.r[i] & 0xF8) << 8;
+        convert_lut.rgb565_g[i] = (convert_lut.g[i] & 0xFC) << 3;
+        convert_lut.rgb565_b[i] = convert_lut.b[i] >> 3;
+    }
+    
+    convert_lut.dither = dither;
+    if (dither != CONVERT_DITHER_NONE) {
+        for (int u = 0; u < 8; u++) {
+            uint16_t *d565 = convert_dither565[u];
+            uint8_t *d332 = convert_dither332[u];
+            for (int i = 0; i < 256; i++) {
+                d565[i] = (MIN(convert_lut.r[i] + u, 255) & 0xF8) << 8;
+                d565[256 + i] = (MIN(convert_lut.g[i] + (u >> 1), 255) & 0xFC) << 3;
+                d565[512 + i] = MIN(convert_lut.b[i] + u, 255) >> 3;
+                
+                d332[i] = MIN(convert_lut.r[i] + u * 4, 255) & 0xE0;
+                d332[256 + i] = (MIN(convert_lut.g[i] + u * 4, 255) & 0xE0) >> 3;
+                d332[512 + i] = MIN(convert_lut.b[i] + (u >> 1) * 16, 255) >> 6;
+            }
+        }
+    }
+    convert_lut_ready = true;
+}
+
+size_t convert_bytes_per_pixel(int fmt) {
+    switch (fmt) {
+        case CONVERT_RGB565:
+        case CONVERT_RGB565_BE:
+            return 2;
+        case CONVERT_RGB888:
+            return 4;
+        case CONVERT_RGB332:
+        case CONVERT_P8:
+            return 1;
+        default:
+            return 0;
+    }
+}
+
+int convert_format_for_bpp(size_t bpp) {
+    switch (bpp) {
+        case 4:
+            return CONVERT_RGB888;
+        case 2:
+            return CONVERT_RGB565_BE;
+        case 1:
+            return CONVERT_RGB332;
+        default:
+            return -1;
+    }
+}
+
+void convert_rgb565_to(int fmt, const uint8_t *src, uint8_t *dst, size_t num_pixels) {
+    switch (fmt) {
+        case CONVERT_RGB565:
+            memcpy(dst, src, num_pixels * 2);
+            break;
+        
+        case CONVERT_RGB565_BE:
+            for (size_t i = 0; i < num_pixels; i++) {
+                dst[i * 2 + 0] = src[i * 2 + 1];
+                dst[i * 2 + 1] = src[i * 2 + 0];
+            }
+            break;
+        
+        case CONVERT_RGB888:
+            for (size_t i = 0; i < num_pixels; i++) {
+                uint16_t p = src[i * 2] | (src[i * 2 + 1] << 8);
+                
+                // Expand to 8 bits per channel, replicating the top bits so
+                // full scale stays full scale
+                uint8_t r = (p >> 11) & 0x1F;
+                uint8_t g = (p >> 5) & 0x3F;
+                uint8_t b = p & 0x1F;
+                
+                // Little-endian 0x00RRGGBB word
+                dst[i * 4 + 0] = (b << 3) | (b >> 2);
+                dst[i * 4 + 1] = (g << 2) | (g >> 4);
+                dst[i * 4 + 2] = (r << 3) | (r >> 2);
+                dst[i * 4 + 3] = 0;
+            }
+            break;
+        
+        case CONVERT_RGB332:
+            for (size_t i = 0; i < num_pixels; i++) {
+                uint16_t p = src[i * 2] | (src[i * 2 + 1] << 8);
+                
+                // Top 3 bits of red and green, top 2 of blue
+                dst[i] = ((p >> 8) & 0xE0) | ((p >> 6) & 0x1C) | ((p >> 3) & 0x03);
+            }
+            break;
+    }
+}
+
+void convert_out_init(convert_out_t *out, int fmt, uint8_t *dst, int width, int height,
+    const uint8_t *palette, size_t palette_len) {
+    out->dst = dst;
+    out->fmt = fmt;
+    out->bpp = convert_bytes_per_pixel(fmt);
+    out->width = width;
+    out->height = height;
+    out->lut = convert_lut_get();
+    out->frame = 0;
+    out->palette = palette;
+    out->palette_len = palette_len;
+    memset(out->p8_key, 0, sizeof(out->p8_key));
+    
+    // Source matches the frame until a view is set
+    out->src_width = width;
+    out->src_height = height;
+    out->src_x = 0;
+    out->src_y = 0;
+    out->cols = width;
+    out->rows = height;
+    out->scale = 1;
+    out->dst_x = 0;
+    out->dst_y = 0;
+}
+
+bool convert_out_set_view(convert_out_t *out, int src_width, int src_height,
+    int src_x, int src_y, int cols, int rows, int scale) {
+    if (src_x < 0 || src_y < 0 || cols <= 0 || rows <= 0 || scale < 0 ||
+        src_x + cols > src_width || src_y + rows > src_height) {
+        return false;
+    }
+    
+    if (scale == 0) {
+        int fit_x = out->width / cols;
+        int fit_y = out->height / rows;
+        scale = fit_x < fit_y ? fit_x : fit_y;
+        if (scale < 1) {
+            scale = 1;
+        }
+    }
+    
+    // Crop whole source pixels evenly from both sides until it fits
+    if (cols * scale > out->width) {
+        int fit = out->width / scale;
+        src_x += (cols - fit) / 2;
+        cols = fit;
+    }
+    if (rows * scale > out->height) {
+        int fit = out->height / scale;
+        src_y += (rows - fit) / 2;
+        rows = fit;
+    }
+    
+    out->src_width = src_width;
+    out->src_height = src_height;
+    out->src_x = src_x;
+    out->src_y = src_y;
+    out->cols = cols;
+    out->rows = rows;
+    out->scale = scale;
+    out->dst_x = (out->width - cols * scale) / 2;
+    out->dst_y = (out->height - rows * scale) / 2;
+    
+    // Letterbox: rows never write the border, so clear it once here
+    if (cols * scale < out->width || rows * scale < out->height) {
+        memset(out->dst, 0, (size_t)out->width * out->height * out->bpp);
+    }
+    return true;
+}
+
+void convert_out_next_frame(convert_out_t *out) {
+    out->frame++;
+}
+
+int convert_out_rows_done(const convert_out_t *out, int src_rows) {
+    if (src_rows >= out->src_y + out->rows) {
+        return out->height;
+    }
+    if (src_rows <= out->src_y) {
+        return out->dst_y;
+    }
+    return out->dst_y + (src_rows - out->src_y) * out->scale;
+}
+
+/*
+ * Repeat each of the first n pixels of a row scale times, in place
+ * 
+ * Works from the right so no pixel is overwritten before it's copied.
+ */
+static void convert_expand(uint8_t *row, int n, size_t bpp, int scale) {
+    for (int i = n - 1; i >= 0; i--) {
+        uint8_t pixel[4];
+        memcpy(pixel, row + i * bpp, bpp);
+        uint8_t *dst = row + (size_t)i * scale * bpp;
+        for (int k = 0; k < scale; k++, dst += bpp) {
+            memcpy(dst, pixel, bpp);
+        }
+    }
+}
+
+/*
+ * Find the palette entry closest to an RGB colour
+ * 
+ * Pixlet output is mostly flat colour, so results are cached by RGB555
+ * colour and the full search only runs on a cache miss.
+ */
+static uint8_t convert_nearest(convert_out_t *out, uint8_t r, uint8_t g, uint8_t b) {
+    uint16_t key = (((r >> 3) << 10) | ((g >> 3) << 5) | (b >> 3)) + 1;
+    size_t slot = (key ^ (key >> 6) ^ (key >> 12)) & (CONVERT_P8_CACHE_SIZE - 1);
+    
+    if (out->p8_key[slot] == key) {
+        return out->p8_index[slot];
+    }
+    
+    uint32_t best_dist = UINT32_MAX;
+    uint8_t best = 0;
+    for (size_t i = 0; i < out->palette_len; i++) {
+        int dr = r - out->palette[i * 3 + 0];
+        int dg = g - out->palette[i * 3 + 1];
+        int db = b - out->palette[i * 3 + 2];
+        uint32_t dist = dr * dr + dg * dg + db * db;
+        if (dist < best_dist) {
+            best_dist = dist;
+            best = i;
+            if (dist == 0) {
+                break;
+            }
+        }
+    }
+    
+    out->p8_key[slot] = key;
+    out->p8_index[slot] = best;
+    return best;
+}
+
+/*
+ * Bayer row for source row y; the temporal mode moves down one row per
+ * frame, so each pixel cycles through a whole column of the matrix
+ */
+static const uint8_t *convert_bayer_row(const convert_out_t *out, int y) {
+    if (out->lut->dither == CONVERT_DITHER_TEMPORAL) {
+        y += out->frame;
+    }
+    return convert_bayer[y & 3];
+}
+
+/*
+ * Dithered rows: RGB565 little- and big-endian (PicoGraphics PEN_RGB565)
+ * and RGB332
+ * 
+ * Unrolled by the matrix width, so each of the four columns keeps one
+ * table block for the whole row and a pixel is the same three loads and
+ * two ORs as an undithered one. The store is fixed per function rather
+ * than tested per pixel.
+ */
+#define CONVERT_STORE_LE (dst[0] = p & 0xFF, dst[1] = p >> 8)
+#define CONVERT_STORE_BE (dst[0] = p >> 8, dst[1] = p & 0xFF)
+#define CONVERT_STORE_332 (dst[0] = p)
+
+#define CONVERT_DITHER_PIXEL(d, store) do { \
+        p = d[src[0]] | d[256 + src[1]] | d[512 + src[2]]; \
+        store; \
+        src += src_bpp; \
+        dst += sizeof(p); \
+} while (0)
+
+#define CONVERT_DITHER_ROW(name, type, table, store) \
+static void name(const convert_out_t *out, const uint8_t *src, size_t src_bpp, \
+    uint8_t *dst, int width, int y) { \
+    /* Matrix columns follow source x so the pattern stays put when cropping */ \
+    const uint8_t *bayer = convert_bayer_row(out, y); \
+    const type *d0 = table[bayer[out->src_x & 3] >> 1]; \
+    const type *d1 = table[bayer[(out->src_x + 1) & 3] >> 1]; \
+    const type *d2 = table[bayer[(out->src_x + 2) & 3] >> 1]; \
+    const type *d3 = table[bayer[(out->src_x + 3) & 3] >> 1]; \
+    type p; \
+    int x = 0; \
+    for (; x + 4 <= width; x += 4) { \
+        CONVERT_DITHER_PIXEL(d0, store); \
+        CONVERT_DITHER_PIXEL(d1, store); \
+        CONVERT_DITHER_PIXEL(d2, store); \
+        CONVERT_DITHER_PIXEL(d3, store); \
+    } \
+    /* Up to three pixels left over */ \
+    if (x < width) { \
+        CONVERT_DITHER_PIXEL(d0, store); \
+    } \
+    if (x + 1 < width) { \
+        CONVERT_DITHER_PIXEL(d1, store); \
+    } \
+    if (x + 2 < width) { \
+        CONVERT_DITHER_PIXEL(d2, store); \
+    } \
+}
+
+CONVERT_DITHER_ROW(convert_row_rgb565_dither, uint16_t, convert_dither565, CONVERT_STORE_LE)
+CONVERT_DITHER_ROW(convert_row_rgb565_be_dither, uint16_t, convert_dither565, CONVERT_STORE_BE)
+CONVERT_DITHER_ROW(convert_row_rgb332_dither, uint8_t, convert_dither332, CONVERT_STORE_332)
+
+void convert_row(convert_out_t *out, const uint8_t *src, size_t src_bpp, int y) {
+    if (y < out->src_y || y >= out->src_y + out->rows) {
+        return;
+    }
+    
+    size_t dst_stride = (size_t)out->width * out->bpp;
+    int dst_y = out->dst_y + (y - out->src_y) * out->scale;
+    uint8_t *row = out->dst + dst_y * dst_stride + out->dst_x * out->bpp;
+    uint8_t *dst = row;
+    int width = out->cols;
+    src += out->src_x * src_bpp;
+    
+    // Gamma and brightness come from the LUT, so correction is just a
+    // table load per channel
+    const uint8_t *lut_r = out->lut->r;
+    const uint8_t *lut_g = out->lut->g;
+    const uint8_t *lut_b = out->lut->b;
+    const uint16_t *lut565_r = out->lut->rgb565_r;
+    const uint16_t *lut565_g = out->lut->rgb565_g;
+    const uint16_t *lut565_b = out->lut->rgb565_b;
+    
+    // One loop per format keeps the per-pixel work branch-free
+    int fmt = out->fmt;
+    if (out->lut->dither != CONVERT_DITHER_NONE) {
+        if (fmt == CONVERT_RGB565_BE) {
+            convert_row_rgb565_be_dither(out, src, src_bpp, dst, width, y);
+            fmt = -1;
+        } else if (fmt == CONVERT_RGB565) {
+            convert_row_rgb565_dither(out, src, src_bpp, dst, width, y);
+            fmt = -1;
+        } else if (fmt == CONVERT_RGB332) {
+            convert_row_rgb332_dither(out, src, src_bpp, dst, width, y);
+            fmt = -1;
+        }
+    }
+    switch (fmt) {
+        case CONVERT_RGB565:
+            for (int x = 0; x < width; x++, src += src_bpp) {
+                // Pack into RGB565: RRRRR GGGGGG BBBBB, little-endian
+                uint16_t p = lut565_r[src[0]] | lut565_g[src[1]] | lut565_b[src[2]];
+                *dst++ = p & 0xFF;
+                *dst++ = p >> 8;
+            }
+            break;
+        
+        case CONVERT_RGB565_BE:
+            for (int x = 0; x < width; x++, src += src_bpp) {
+                uint16_t p = lut565_r[src[0]] | lut565_g[src[1]] | lut565_b[src[2]];
+                *dst++ = p >> 8;
+                *dst++ = p & 0xFF;
+            }
+            break;
+        
+        case CONVERT_RGB888:
+            for (int x = 0; x < width; x++, src += src_bpp) {
+                // Little-endian 0x00RRGGBB word
+                *dst++ = lut_b[src[2]];
+                *dst++ = lut_g[src[1]];
+                *dst++ = lut_r[src[0]];
+                *dst++ = 0;
+            }
+            break;
+        
+        case CONVERT_RGB332:
+            for (int x = 0; x < width; x++, src += src_bpp) {
+                *dst++ = (lut_r[src[0]] & 0xE0) | ((lut_g[src[1]] & 0xE0) >> 3) | (lut_b[src[2]] >> 6);
+            }
+            break;
+        
+        case CONVERT_P8:
+            for (int x = 0; x < width; x++, src += src_bpp) {
+                *dst++ = convert_nearest(out, lut_r[src[0]], lut_g[src[1]], lut_b[src[2]]);
+            }
+            break;
+    }
+    
+    // Nearest-neighbour upscale: widen the row, then repeat it downwards
+    if (out->scale > 1) {
+        convert_expand(row, width, out->bpp, out->scale);
+        for (int k = 1; k < out->scale; k++) {
+            memcpy(row + k * dst_stride, row, width * out->scale * out->bpp);
+        }
+    }
+}
+
+void convert_rows(convert_out_t *out, const uint8_t *src, size_t src_stride, size_t src_bpp, int y0, int y1) {
+    for (int y = y0; y < y1; y++) {
+        convert_row(out, src + (size_t)y * src_stride, src_bpp, y);
+    }
+}
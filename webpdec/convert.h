@@ -0,0 +1,118 @@
+/*
+ * Pixel format conversion for the webpdec module
+ *
+ * Plain C with no MicroPython dependencies, so it is shared by webpdec.c
+ * and webpdec_full.c and can be benchmarked on the host.
+ */
+
+#ifndef WEBPDEC_CONVERT_H
+#define WEBPDEC_CONVERT_H
+
+#include <stdbool.h>
+#include <stddef.h>
+#include <stdint.h>
+
+// Framebuffer pixel formats (PicoGraphics pen types)
+enum {
+    CONVERT_RGB565 = 0,     // 16-bit little-endian (webpdec's own frames)
+    CONVERT_RGB565_BE,      // 16-bit byte-swapped (PicoGraphics PEN_RGB565)
+    CONVERT_RGB888,         // 32-bit word 0x00RRGGBB (PicoGraphics PEN_RGB888)
+    CONVERT_RGB332,         // 8-bit RRRGGGBB (PicoGraphics PEN_RGB332)
+    CONVERT_P8,             // 8-bit palette index (PicoGraphics PEN_P8)
+};
+
+// Dithering applied when quantising to RGB565 or RGB332
+enum {
+    CONVERT_DITHER_NONE = 0,
+    CONVERT_DITHER_ORDERED,     // 4x4 Bayer matrix
+    CONVERT_DITHER_TEMPORAL,    // Bayer matrix shifted one row per frame
+};
+
+// Per-channel colour correction applied while converting:
+// r' = r[r], g' = g[g], b' = b[b]. The rgb565 tables hold the same values
+// already masked and shifted into place, so an RGB565 pixel is just
+// rgb565_r[r] | rgb565_g[g] | rgb565_b[b].
+typedef struct _convert_lut_t {
+    uint8_t r[256];
+    uint8_t g[256];
+    uint8_t b[256];
+    uint16_t rgb565_r[256];
+    uint16_t rgb565_g[256];
+    uint16_t rgb565_b[256];
+    int dither;
+} convert_lut_t;
+
+// Entries in the P8 nearest-colour cache (power of two)
+#define CONVERT_P8_CACHE_SIZE (64)
+
+// Output stage: where and how decoded RGB888 rows are written
+typedef struct _convert_out_t {
+    uint8_t *dst;               // Frame in the output format
+    int fmt;
+    size_t bpp;                 // Bytes per output pixel
+    int width;                  // Frame size in pixels
+    int height;
+    const convert_lut_t *lut;   // Colour correction (convert_lut_get())
+    unsigned int frame;         // Frame counter for temporal dithering
+    int src_width;              // Source image size in pixels
+    int src_height;
+    int src_x;                  // First source column and row shown
+    int src_y;
+    int cols;                   // Source columns and rows shown
+    int rows;
+    int scale;                  // Each source pixel becomes scale x scale
+    int dst_x;                  // Where src_x, src_y lands in the frame
+    int dst_y;
+    const uint8_t *palette;     // CONVERT_P8: RGB triples
+    size_t palette_len;         // CONVERT_P8: number of entries
+    uint16_t p8_key[CONVERT_P8_CACHE_SIZE];     // RGB555 colour + 1, 0 = empty
+    uint8_t p8_index[CONVERT_P8_CACHE_SIZE];
+} convert_out_t;
+
+// Bytes per pixel for a format, or 0 if unknown
+size_t convert_bytes_per_pixel(int fmt);
+
+// Format whose pixels are bpp bytes wide, as used to recognise a
+// framebuffer from its size, or -1 if none
+int convert_format_for_bpp(size_t bpp);
+
+// Set up an output stage writing a width x height frame to dst, which
+// must hold width * height * convert_bytes_per_pixel(fmt) bytes.
+// CONVERT_P8 needs palette_len (1-256) RGB triples in palette.
+void convert_out_init(convert_out_t *out, int fmt, uint8_t *dst, int width, int height,
+    const uint8_t *palette, size_t palette_len);
+
+// Show the src_x, src_y, cols x rows rectangle of a src_width x
+// src_height source image, upscaled by scale (0 = the largest integer
+// that fits) and centred in the frame. Whatever doesn't fit is cropped
+// evenly from both sides and any border is cleared to zero. Returns false
+// if the rectangle isn't inside the image. Without this call the source
+// is the frame size, shown 1:1.
+bool convert_out_set_view(convert_out_t *out, int src_width, int src_height,
+    int src_x, int src_y, int cols, int rows, int scale);
+
+// Advance to the next animation frame (moves the temporal dither pattern)
+void convert_out_next_frame(convert_out_t *out);
+
+// Number of frame rows that are final once source rows 0..src_rows-1
+// have been written
+int convert_out_rows_done(const convert_out_t *out, int src_rows);
+
+// Write source row y (src_width pixels, src_bpp = 3 for RGB or 4 for RGBA)
+void convert_row(convert_out_t *out, const uint8_t *src, size_t src_bpp, int y);
+
+// Write source rows y0..y1-1 from an image whose rows are src_stride apart
+void convert_rows(convert_out_t *out, const uint8_t *src, size_t src_stride, size_t src_bpp, int y0, int y1);
+
+// The colour correction used by every output stage, identity until
+// convert_lut_set() is called
+const convert_lut_t *convert_lut_get(void);
+
+// Rebuild the correction: out = 255 * brightness * (in / 255) ^ gamma,
+// per channel (red, green, blue), clamped to 255, and the dithering mode
+void convert_lut_set(const float gamma[3], const float brightness[3], int dither);
+
+// Convert little-endian RGB565 pixels to another framebuffer format
+void convert_rgb565_to(int fmt, const uint8_t *src, uint8_t *dst, size_t num_pixels);
+
+#endif // WEBPDEC_CONVERT_H
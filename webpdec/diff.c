@@ -0,0 +1,76 @@
+/*
+ * Frame differencing for the webpdec module
+ */
+
+#include <stdbool.h>
+#include <string.h>
+
+#include "diff.h"
+
+#define MIN(a, b) ((a) < (b) ? (a) : (b))
+#define MAX(a, b) ((a) > (b) ? (a) : (b))
+
+/*
+ * Find the first and last changed pixel of a row
+ *
+ * Returns false if the row is unchanged. Most rows of mostly static
+ * content are, and memcmp rules those out at memory speed.
+ */
+static bool diff_row(const uint8_t *prev, const uint8_t *cur, size_t width, size_t bpp,
+    size_t *x0, size_t *x1) {
+    size_t stride = width * bpp;
+    if (memcmp(prev, cur, stride) == 0) {
+        return false;
+    }
+
+    size_t first = 0;
+    while (memcmp(prev + first * bpp, cur + first * bpp, bpp) == 0) {
+        first++;
+    }
+    size_t last = width - 1;
+    while (memcmp(prev + last * bpp, cur + last * bpp, bpp) == 0) {
+        last--;
+    }
+    *x0 = first;
+    *x1 = last;
+    return true;
+}
+
+int diff_frames(uint8_t *prev, const uint8_t *cur, size_t width, size_t height,
+    size_t bpp, diff_rect_t *rects, int max_rects) {
+    size_t stride = width * bpp;
+    int count = 0;
+    bool open = false;      // Last rect is still growing down the frame
+
+    for (size_t y = 0; y < height; y++, prev += stride, cur += stride) {
+        size_t x0, x1;
+        if (!diff_row(prev, cur, width, bpp, &x0, &x1)) {
+            open = false;
+            continue;
+        }
+
+        // Keep prev in step with what's on the panel
+        memcpy(prev + x0 * bpp, cur + x0 * bpp, (x1 - x0 + 1) * bpp);
+
+        // Start a new box unless this row extends the last one (or there
+        // are no boxes left, when everything lands in the last)
+        if (!open && count < max_rects) {
+            rects[count].x = x0;
+            rects[count].y = y;
+            rects[count].w = x1 - x0 + 1;
+            rects[count].h = 1;
+            count++;
+            open = true;
+            continue;
+        }
+
+        diff_rect_t *r = &rects[count - 1];
+        size_t left = MIN(r->x, x0);
+        size_t right = MAX((size_t)r->x + r->w - 1, x1);
+        r->x = left;
+        r->w = right - left + 1;
+        r->h = y - r->y + 1;
+        open = true;
+    }
+    return count;
+}
@@ -0,0 +1,30 @@
+/*
+ * Frame differencing for the webpdec module
+ *
+ * Plain C with no MicroPython dependencies, shared by webpdec.c and
+ * webpdec_full.c.
+ */
+
+#ifndef WEBPDEC_DIFF_H
+#define WEBPDEC_DIFF_H
+
+#include <stddef.h>
+#include <stdint.h>
+
+// Changed region of a frame, in pixels
+typedef struct _diff_rect_t {
+    uint16_t x;
+    uint16_t y;
+    uint16_t w;
+    uint16_t h;
+} diff_rect_t;
+
+// Compare cur against prev (both width * height pixels of bpp bytes) and
+// return the bounding boxes of the changed regions, at most max_rects.
+// Runs of changed rows become one box each; once max_rects are used the
+// rest are merged into the last one. The changed pixels are copied into
+// prev, so it always holds what the caller last showed.
+int diff_frames(uint8_t *prev, const uint8_t *cur, size_t width, size_t height,
+    size_t bpp, diff_rect_t *rects, int max_rects);
+
+#endif // WEBPDEC_DIFF_H
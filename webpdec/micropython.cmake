@@ -4,10 +4,19 @@ add_library(usermod_webpdec INTERFACE)
 
 target_sources(usermod_webpdec INTERFACE
     ${CMAKE_CURRENT_LIST_DIR}/webpdec.c
+    ${CMAKE_CURRENT_LIST_DIR}/arena.c
+    ${CMAKE_CURRENT_LIST_DIR}/convert.c
+    ${CMAKE_CURRENT_LIST_DIR}/diff.c
+    ${CMAKE_CURRENT_LIST_DIR}/webp_header.c
 )
 
 target_include_directories(usermod_webpdec INTERFACE
     ${CMAKE_CURRENT_LIST_DIR}
 )
 
+# Once libwebp is integrated (see micropython.mk), route its allocations to
+# the fixed arena in arena.c; WEBPDEC_ARENA_SIZE sets the arena's size
+# set_source_files_properties(${CMAKE_CURRENT_LIST_DIR}/libwebp/src/utils/utils.c PROPERTIES
+#     COMPILE_DEFINITIONS "malloc=webpdec_arena_malloc;calloc=webpdec_arena_calloc;free=webpdec_arena_free")
+
 target_link_libraries(usermod INTERFACE usermod_webpdec)
\ No newline at end of file
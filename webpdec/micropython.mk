@@ -4,12 +4,21 @@ WEBPDEC_MOD_DIR := $(USERMOD_DIR)
 
 # Add source files
 SRC_USERMOD += $(WEBPDEC_MOD_DIR)/webpdec.c
+SRC_USERMOD += $(WEBPDEC_MOD_DIR)/arena.c
+SRC_USERMOD += $(WEBPDEC_MOD_DIR)/convert.c
+SRC_USERMOD += $(WEBPDEC_MOD_DIR)/diff.c
+SRC_USERMOD += $(WEBPDEC_MOD_DIR)/webp_header.c
 
 # Add include directories
 CFLAGS_USERMOD += -I$(WEBPDEC_MOD_DIR)
 
 # If using libwebp (uncomment when integrated)
 # CFLAGS_USERMOD += -I$(WEBPDEC_MOD_DIR)/libwebp/src
+# CFLAGS_USERMOD += -DWEBPDEC_HAVE_LIBWEBP=1
 # SRC_USERMOD += $(wildcard $(WEBPDEC_MOD_DIR)/libwebp/src/dec/*.c)
+# SRC_USERMOD += $(wildcard $(WEBPDEC_MOD_DIR)/libwebp/src/demux/*.c)
 # SRC_USERMOD += $(wildcard $(WEBPDEC_MOD_DIR)/libwebp/src/dsp/*.c)
 # SRC_USERMOD += $(wildcard $(WEBPDEC_MOD_DIR)/libwebp/src/utils/*.c)
+# libwebp only allocates through malloc/calloc/free in utils.c; point them
+# at the fixed arena in arena.c so decodes never touch either heap
+# $(BUILD)/$(WEBPDEC_MOD_DIR)/libwebp/src/utils/utils.o: CFLAGS += -Dmalloc=webpdec_arena_malloc -Dcalloc=webpdec_arena_calloc -Dfree=webpdec_arena_free
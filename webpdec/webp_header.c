@@ -0,0 +1,204 @@
+/*
+ * WebP container (RIFF) header parsing for the webpdec module
+ */
+
+#include <string.h>
+
+#include "webp_header.h"
+
+// VP8X feature flags
+#define VP8X_FLAG_ANIMATION (0x02)
+#define VP8X_FLAG_ALPHA (0x10)
+
+/*
+ * Read the canvas size from a WebP file's headers
+ *
+ * Handles the three container layouts: extended (VP8X), simple lossy
+ * (VP8) and simple lossless (VP8L). Returns false if the data is not
+ * a WebP file or is too short to contain the size.
+ */
+bool webp_get_size(const uint8_t *data, size_t len, int *width, int *height) {
+    // RIFF header (12 bytes) + first chunk header (8 bytes)
+    if (len < 30 || memcmp(data, "RIFF", 4) != 0 || memcmp(data + 8, "WEBP", 4) != 0) {
+        return false;
+    }
+
+    const uint8_t *chunk = data + 12;
+    const uint8_t *payload = chunk + 8;
+
+    if (memcmp(chunk, "VP8X", 4) == 0) {
+        // 24-bit little-endian canvas width/height minus one
+        *width = 1 + (payload[4] | (payload[5] << 8) | (payload[6] << 16));
+        *height = 1 + (payload[7] | (payload[8] << 8) | (payload[9] << 16));
+        return true;
+    }
+
+    if (memcmp(chunk, "VP8 ", 4) == 0) {
+        // 3-byte frame tag, 3-byte start code, then 14-bit width/height
+        if (payload[3] != 0x9d || payload[4] != 0x01 || payload[5] != 0x2a) {
+            return false;
+        }
+        *width = (payload[6] | (payload[7] << 8)) & 0x3fff;
+        *height = (payload[8] | (payload[9] << 8)) & 0x3fff;
+        return true;
+    }
+
+    if (memcmp(chunk, "VP8L", 4) == 0) {
+        // Signature byte, then 14-bit width-1 and height-1 bit fields
+        if (payload[0] != 0x2f) {
+            return false;
+        }
+        uint32_t bits = payload[1] | (payload[2] << 8) | (payload[3] << 16) | ((uint32_t)payload[4] << 24);
+        *width = 1 + (bits & 0x3fff);
+        *height = 1 + ((bits >> 14) & 0x3fff);
+        return true;
+    }
+
+    return false;
+}
+
+/*
+ * Find the first image bitstream chunk (VP8 or VP8L) from offset up to end
+ *
+ * Returns true and sets lossless if one was found.
+ */
+static bool webp_find_bitstream(const uint8_t *data, size_t end, size_t offset, bool *lossless) {
+    while (offset + 8 <= end) {
+        if (memcmp(data + offset, "VP8L", 4) == 0) {
+            *lossless = true;
+            return true;
+        }
+        if (memcmp(data + offset, "VP8 ", 4) == 0) {
+            *lossless = false;
+            return true;
+        }
+        size_t next = webp_skip_chunk(data, end, offset);
+        if (next <= offset) {
+            break;
+        }
+        offset = next;
+    }
+    return false;
+}
+
+bool webp_get_info(const uint8_t *data, size_t len, webp_info_t *info) {
+    if (!webp_get_size(data, len, &info->width, &info->height) ||
+        info->width <= 0 || info->height <= 0) {
+        return false;
+    }
+
+    // A RIFF size this big would wrap on 32-bit targets
+    if (webp_chunk_size(data, 0) > UINT32_MAX - 8) {
+        return false;
+    }
+    info->file_size = 8 + webp_chunk_size(data, 0);
+    info->animated = false;
+    info->lossless = false;
+    info->alpha = false;
+    info->frame_count = 1;
+    info->loop_count = 0;
+
+    // Never look past the end of the file, even if more data follows
+    if (len > info->file_size) {
+        len = info->file_size;
+    }
+
+    const uint8_t *chunk = data + 12;
+    const uint8_t *payload = chunk + 8;
+
+    if (memcmp(chunk, "VP8L", 4) == 0) {
+        // Alpha hint is the bit after the two 14-bit size fields
+        info->lossless = true;
+        info->alpha = (payload[4] >> 4) & 1;
+        return true;
+    }
+    if (memcmp(chunk, "VP8 ", 4) == 0) {
+        return true;
+    }
+
+    // Extended format: flags in the VP8X payload, then optional chunks
+    info->animated = (payload[0] & VP8X_FLAG_ANIMATION) != 0;
+    info->alpha = (payload[0] & VP8X_FLAG_ALPHA) != 0;
+    size_t first = webp_skip_chunk(data, len, 12);
+
+    if (!info->animated) {
+        // A truncated still may not show its bitstream yet; assume lossy
+        webp_find_bitstream(data, len, first, &info->lossless);
+        return true;
+    }
+
+    size_t anim = webp_find_chunk(data, len, first, "ANIM");
+    if (anim == 0) {
+        // The whole ANIM chunk is 14 bytes; without it the file is broken
+        // unless it simply hasn't all arrived
+        return len < info->file_size;
+    }
+    if (webp_chunk_size(data, anim) < 6) {
+        return false;
+    }
+    info->loop_count = data[anim + 12] | (data[anim + 13] << 8);
+
+    // Count the frames, taking the format from the first one (its
+    // sub-chunks start after the 16-byte ANMF header)
+    info->frame_count = 0;
+    for (size_t off = webp_find_chunk(data, len, anim, "ANMF"); off != 0;
+         off = webp_find_chunk(data, len, webp_skip_chunk(data, len, off), "ANMF")) {
+        if (webp_chunk_size(data, off) < 16) {
+            return false;
+        }
+        if (info->frame_count == 0) {
+            webp_find_bitstream(data, off + 8 + webp_chunk_size(data, off), off + 8 + 16, &info->lossless);
+        }
+        info->frame_count++;
+    }
+    return info->frame_count > 0 || len < info->file_size;
+}
+
+/*
+ * Find a RIFF chunk with the given FourCC
+ *
+ * Scans chunk headers starting at offset (12 for the first chunk after
+ * the RIFF header). Returns the matching chunk's header offset, or 0 if
+ * there is none or its payload is truncated.
+ */
+size_t webp_find_chunk(const uint8_t *data, size_t len, size_t offset, const char *fourcc) {
+    while (offset + 8 <= len) {
+        if (memcmp(data + offset, fourcc, 4) == 0) {
+            return (webp_chunk_size(data, offset) <= len - offset - 8) ? offset : 0;
+        }
+        size_t next = webp_skip_chunk(data, len, offset);
+        if (next <= offset) {
+            break;
+        }
+        offset = next;
+    }
+    return 0;
+}
+
+/*
+ * Return the payload size of the chunk at offset
+ */
+uint32_t webp_chunk_size(const uint8_t *data, size_t offset) {
+    return data[offset + 4] | (data[offset + 5] << 8) |
+        (data[offset + 6] << 16) | ((uint32_t)data[offset + 7] << 24);
+}
+
+/*
+ * Return the offset of the chunk following the one at offset
+ *
+ * A chunk that runs past len ends the walk: len is returned. The size is
+ * checked before any addition, since a declared size near 0xFFFFFFFF
+ * would wrap on 32-bit targets and point back at an earlier chunk.
+ */
+size_t webp_skip_chunk(const uint8_t *data, size_t len, size_t offset) {
+    if (offset > len || len - offset < 8) {
+        return len;
+    }
+    uint32_t size = webp_chunk_size(data, offset);
+    if (size > len - offset - 8) {
+        return len;
+    }
+
+    // Chunk payloads are padded to an even size
+    return offset + 8 + size + (size & 1);
+}
@@ -0,0 +1,49 @@
+/*
+ * WebP container (RIFF) header parsing for the webpdec module
+ *
+ * Plain C with no MicroPython dependencies, so it is shared by webpdec.c
+ * and webpdec_full.c. Only chunk headers are read; nothing is decoded.
+ */
+
+#ifndef WEBPDEC_WEBP_HEADER_H
+#define WEBPDEC_WEBP_HEADER_H
+
+#include <stdbool.h>
+#include <stddef.h>
+#include <stdint.h>
+
+// What the headers say about a WebP file
+typedef struct _webp_info_t {
+    int width;                  // Canvas size in pixels
+    int height;
+    bool animated;
+    bool lossless;              // VP8L bitstream (of the first frame)
+    bool alpha;
+    int frame_count;            // ANMF chunks found (1 for stills)
+    int loop_count;             // 0 = forever
+    uint32_t file_size;         // Whole file, from the RIFF header
+} webp_info_t;
+
+// Read the canvas size. Handles extended (VP8X), simple lossy (VP8) and
+// simple lossless (VP8L) files; false if the data is not a WebP file or
+// is too short to contain the size (the first 30 bytes are enough).
+bool webp_get_size(const uint8_t *data, size_t len, int *width, int *height);
+
+// Read everything webp_info_t holds. Only chunks that are complete in
+// data are counted, so compare file_size with len to spot truncation.
+// False if the data is not a WebP file or its headers are malformed.
+bool webp_get_info(const uint8_t *data, size_t len, webp_info_t *info);
+
+// Offset of the first chunk with the given FourCC at or after offset
+// (12 for the first chunk after the RIFF header), or 0 if there is none
+// or its payload is truncated
+size_t webp_find_chunk(const uint8_t *data, size_t len, size_t offset, const char *fourcc);
+
+// Payload size of the chunk at offset
+uint32_t webp_chunk_size(const uint8_t *data, size_t offset);
+
+// Offset of the chunk following the one at offset, or len if that chunk
+// runs past len
+size_t webp_skip_chunk(const uint8_t *data, size_t len, size_t offset);
+
+#endif // WEBPDEC_WEBP_HEADER_H
@@ -7,47 +7,228 @@
  * 1. Download libwebp source
  * 2. Update micropython.mk to include libwebp sources
  * 3. Replace webpdec.c with this file (rename to webpdec.c)
+ * 4. Build with WEBPDEC_HAVE_LIBWEBP=1 defined
  */
 
 #include "py/runtime.h"
 #include "py/obj.h"
 #include "py/objstr.h"
+#include "py/objarray.h"
 
-// Uncomment when libwebp is integrated
-// #include "webp/decode.h"
+#include "arena.h"
+#include "convert.h"
+#include "diff.h"
+#include "webp_header.h"
+
+// Build with -DWEBPDEC_HAVE_LIBWEBP=1 once libwebp is integrated (see micropython.mk)
+#ifndef WEBPDEC_HAVE_LIBWEBP
+#define WEBPDEC_HAVE_LIBWEBP (0)
+#endif
+
+#if WEBPDEC_HAVE_LIBWEBP
+#include "webp/decode.h"
+#include "webp/demux.h"
+#endif
+
+// Output options shared by every decoder: pixel format, palette and
+// where the image lands in the frame
+typedef struct _webpdec_output_t {
+    mp_int_t fmt;
+    mp_buffer_info_t palette;   // RGB triples for FMT_P8, else len 0
+    mp_int_t width;             // Frame size, 0 = viewport size * scale
+    mp_int_t height;
+    mp_int_t scale;             // Integer upscale, 0 = largest that fits
+    mp_int_t view[4];           // Source x, y, w, h; w = 0 for the whole image
+} webpdec_output_t;
+
+/*
+ * Validate the output format, palette and geometry arguments
+ * 
+ * For FMT_P8 opts->palette is the palette buffer; otherwise its length
+ * is 0.
+ */
+STATIC void webpdec_parse_output(webpdec_output_t *opts, mp_int_t fmt, mp_obj_t palette_obj,
+    mp_int_t width, mp_int_t height, mp_int_t scale, mp_obj_t viewport_obj) {
+    if (convert_bytes_per_pixel(fmt) == 0) {
+        mp_raise_ValueError(MP_ERROR_TEXT("Unsupported output format"));
+    }
+    opts->fmt = fmt;
+    
+    opts->palette.buf = NULL;
+    opts->palette.len = 0;
+    if (fmt == CONVERT_P8) {
+        if (palette_obj == mp_const_none) {
+            mp_raise_ValueError(MP_ERROR_TEXT("FMT_P8 needs a palette"));
+        }
+        mp_get_buffer_raise(palette_obj, &opts->palette, MP_BUFFER_READ);
+        if (opts->palette.len == 0 || opts->palette.len % 3 != 0 || opts->palette.len > 256 * 3) {
+            mp_raise_ValueError(MP_ERROR_TEXT("Palette must be 1-256 RGB triples"));
+        }
+    }
+    
+    if (width < 0 || width > 256 || height < 0 || height > 256 || scale < 0 || scale > 16) {
+        mp_raise_ValueError(MP_ERROR_TEXT("Invalid dimensions"));
+    }
+    opts->width = width;
+    opts->height = height;
+    opts->scale = scale;
+    
+    opts->view[2] = 0;
+    if (viewport_obj != mp_const_none) {
+        mp_obj_t *items;
+        mp_obj_get_array_fixed_n(viewport_obj, 4, &items);
+        for (int i = 0; i < 4; i++) {
+            opts->view[i] = mp_obj_get_int(items[i]);
+        }
+        if (opts->view[2] <= 0 || opts->view[3] <= 0) {
+            mp_raise_ValueError(MP_ERROR_TEXT("Invalid viewport"));
+        }
+    }
+}
+
+#if WEBPDEC_HAVE_LIBWEBP
+/*
+ * Bytes in an output frame for a src_width x src_height image
+ * 
+ * Without an explicit width/height the frame is the viewport (or the
+ * whole image) times the scale.
+ */
+STATIC size_t webpdec_frame_size(const webpdec_output_t *opts, mp_int_t src_width, mp_int_t src_height) {
+    mp_int_t scale = MAX(opts->scale, 1);
+    mp_int_t width = opts->width;
+    mp_int_t height = opts->height;
+    if (width == 0) {
+        width = (opts->view[2] ? opts->view[2] : src_width) * scale;
+    }
+    if (height == 0) {
+        height = (opts->view[2] ? opts->view[3] : src_height) * scale;
+    }
+    if (width <= 0 || width > 256 || height <= 0 || height > 256) {
+        mp_raise_ValueError(MP_ERROR_TEXT("Invalid dimensions"));
+    }
+    return width * height * convert_bytes_per_pixel(opts->fmt);
+}
+
+/*
+ * Point an output stage at a buffer for a src_width x src_height image,
+ * checking it holds exactly one frame
+ */
+STATIC void webpdec_init_output(convert_out_t *out, mp_buffer_info_t *outinfo,
+    const webpdec_output_t *opts, mp_int_t src_width, mp_int_t src_height) {
+    if (outinfo->len != webpdec_frame_size(opts, src_width, src_height)) {
+        mp_raise_ValueError(MP_ERROR_TEXT("Output buffer size doesn't match image"));
+    }
+    
+    mp_int_t scale = MAX(opts->scale, 1);
+    mp_int_t width = opts->width;
+    mp_int_t height = opts->height;
+    const mp_int_t *view = opts->view;
+    mp_int_t whole[4] = { 0, 0, src_width, src_height };
+    if (view[2] == 0) {
+        view = whole;
+    }
+    if (width == 0) {
+        width = view[2] * scale;
+    }
+    if (height == 0) {
+        height = view[3] * scale;
+    }
+    
+    convert_out_init(out, opts->fmt, outinfo->buf, width, height,
+        opts->palette.buf, opts->palette.len / 3);
+    if (!convert_out_set_view(out, src_width, src_height, view[0], view[1], view[2], view[3], opts->scale)) {
+        mp_raise_ValueError(MP_ERROR_TEXT("Viewport outside image"));
+    }
+}
+
+// Allocations the arena has refused so far
+STATIC size_t webpdec_arena_failures(void) {
+    webpdec_arena_stats_t stats;
+    webpdec_arena_get_stats(&stats);
+    return stats.failed;
+}
+
+// Raise for a failed libwebp call, telling a full arena from bad data
+STATIC NORETURN void webpdec_raise_failed(size_t failures_before) {
+    if (webpdec_arena_failures() != failures_before) {
+        mp_raise_msg(&mp_type_MemoryError, MP_ERROR_TEXT("WebP arena exhausted"));
+    }
+    mp_raise_ValueError(MP_ERROR_TEXT("WebP decode failed"));
+}
+#endif
 
 /*
  * Decode WebP image to RGB565
  * 
  * Args:
  *   data: bytes - WebP image data
- *   width: int - Expected width
- *   height: int - Expected height
+ *   width: int - Output width
+ *   height: int - Output height
+ *   fmt: int - Output format, one of the FMT_* constants (default FMT_RGB565)
+ *   palette: buffer - RGB triples, required for FMT_P8
+ *   scale: int - Integer upscale, 0 for the largest that fits (default 1)
+ *   viewport: (x, y, w, h) - Source rectangle to show (default whole image)
+ * 
+ * The image (or viewport) is scaled, centred in the output and cropped
+ * to fit, so it doesn't have to be rendered at the panel's size.
  * 
  * Returns:
- *   bytearray - RGB565 pixel data (width * height * 2 bytes)
+ *   bytearray - pixel data (width * height * 2 bytes for RGB565)
  */
-STATIC mp_obj_t webpdec_decode(mp_obj_t data_obj, mp_obj_t width_obj, mp_obj_t height_obj) {
+STATIC mp_obj_t webpdec_decode(size_t n_args, const mp_obj_t *pos_args, mp_map_t *kw_args) {
+    enum { ARG_data, ARG_width, ARG_height, ARG_fmt, ARG_palette, ARG_scale, ARG_viewport };
+    static const mp_arg_t allowed_args[] = {
+        { MP_QSTR_data, MP_ARG_REQUIRED | MP_ARG_OBJ, {.u_obj = MP_OBJ_NULL} },
+        { MP_QSTR_width, MP_ARG_REQUIRED | MP_ARG_INT, {.u_int = 0} },
+        { MP_QSTR_height, MP_ARG_REQUIRED | MP_ARG_INT, {.u_int = 0} },
+        { MP_QSTR_fmt, MP_ARG_INT, {.u_int = CONVERT_RGB565} },
+        { MP_QSTR_palette, MP_ARG_OBJ, {.u_rom_obj = MP_ROM_NONE} },
+        { MP_QSTR_scale, MP_ARG_KW_ONLY | MP_ARG_INT, {.u_int = 1} },
+        { MP_QSTR_viewport, MP_ARG_KW_ONLY | MP_ARG_OBJ, {.u_rom_obj = MP_ROM_NONE} },
+    };
+    mp_arg_val_t args[MP_ARRAY_SIZE(allowed_args)];
+    mp_arg_parse_all(n_args, pos_args, kw_args, MP_ARRAY_SIZE(allowed_args), allowed_args, args);
+    
     // Get WebP data
     mp_buffer_info_t bufinfo;
-    mp_get_buffer_raise(data_obj, &bufinfo, MP_BUFFER_READ);
+    mp_get_buffer_raise(args[ARG_data].u_obj, &bufinfo, MP_BUFFER_READ);
     
-    // Get expected dimensions
-    mp_int_t expected_width = mp_obj_get_int(width_obj);
-    mp_int_t expected_height = mp_obj_get_int(height_obj);
+    // Get output dimensions
+    mp_int_t out_width = args[ARG_width].u_int;
+    mp_int_t out_height = args[ARG_height].u_int;
     
     // Validate dimensions
-    if (expected_width <= 0 || expected_width > 256 || 
-        expected_height <= 0 || expected_height > 256) {
+    if (out_width <= 0 || out_width > 256 || 
+        out_height <= 0 || out_height > 256) {
         mp_raise_ValueError(MP_ERROR_TEXT("Invalid dimensions"));
     }
     
-    /* 
-     * LIBWEBP INTEGRATION CODE (uncomment when libwebp is available)
-     * 
+    // Validate output format and geometry
+    webpdec_output_t opts;
+    webpdec_parse_output(&opts, args[ARG_fmt].u_int, args[ARG_palette].u_obj,
+        out_width, out_height, args[ARG_scale].u_int, args[ARG_viewport].u_obj);
+    
+    #if WEBPDEC_HAVE_LIBWEBP
     int width, height;
     
+    // Set up the output before decoding so a bad viewport never leaks rgb_data
+    if (!WebPGetInfo((const uint8_t*)bufinfo.buf, bufinfo.len, &width, &height)) {
+        mp_raise_ValueError(MP_ERROR_TEXT("Invalid WebP data"));
+    }
+    
+    // Allocate output buffer
+    size_t output_size = out_width * out_height * convert_bytes_per_pixel(opts.fmt);
+    byte *output = m_new(byte, output_size);
+    
+    if (output == NULL) {
+        mp_raise_msg(&mp_type_MemoryError, MP_ERROR_TEXT("Cannot allocate output buffer"));
+    }
+    mp_buffer_info_t outinfo = { .buf = output, .len = output_size };
+    convert_out_t out;
+    webpdec_init_output(&out, &outinfo, &opts, width, height);
+    
     // Decode WebP to RGB
+    size_t failures = webpdec_arena_failures();
     uint8_t* rgb_data = WebPDecodeRGB(
         (const uint8_t*)bufinfo.buf, 
         bufinfo.len, 
@@ -56,51 +237,788 @@ STATIC mp_obj_t webpdec_decode(mp_obj_t data_obj, mp_obj_t width_obj, mp_obj_t h
     );
     
     if (rgb_data == NULL) {
-        mp_raise_ValueError(MP_ERROR_TEXT("WebP decode failed"));
+        webpdec_raise_failed(failures);
     }
     
-    // Verify dimensions match
-    if (width != expected_width || height != expected_height) {
-        WebPFree(rgb_data);
-        mp_raise_ValueError(MP_ERROR_TEXT("Image dimensions don't match"));
-    }
+    // Convert RGB888 to the output format
+    convert_rows(&out, rgb_data, width * 3, 3, 0, height);
     
-    // Allocate RGB565 output buffer
-    size_t output_size = width * height * 2;
-    byte *output = m_new(byte, output_size);
+    // Free WebP decode buffer
+    WebPFree(rgb_data);
     
-    if (output == NULL) {
-        WebPFree(rgb_data);
-        mp_raise_msg(&mp_type_MemoryError, MP_ERROR_TEXT("Cannot allocate output buffer"));
+    // Create and return bytearray
+    return mp_obj_new_bytearray_by_ref(output_size, output);
+    #else
+    // Placeholder: return error until libwebp is integrated
+    mp_raise_NotImplementedError(
+        MP_ERROR_TEXT("libwebp not yet integrated - use webpdec.c placeholder version")
+    );
+    #endif
+}
+STATIC MP_DEFINE_CONST_FUN_OBJ_KW(webpdec_decode_obj, 3, webpdec_decode);
+
+/*
+ * Decode WebP image into a caller-owned buffer
+ * 
+ * Args:
+ *   data: bytes - WebP image data
+ *   out_buf: writable buffer (bytearray, memoryview slice, PicoGraphics
+ *            framebuffer) of exactly width * height * bytes-per-pixel
+ *            bytes for the output size
+ *   fmt: int - Output format, one of the FMT_* constants (default FMT_RGB565)
+ *   palette: buffer - RGB triples, required for FMT_P8
+ *   width, height: int - Output size (default viewport size * scale)
+ *   scale: int - Integer upscale, 0 for the largest that fits (default 1)
+ *   viewport: (x, y, w, h) - Source rectangle to show (default whole image)
+ * 
+ * Returns:
+ *   None - pixels are written in place, no MicroPython heap is allocated
+ */
+STATIC mp_obj_t webpdec_decode_into(size_t n_args, const mp_obj_t *pos_args, mp_map_t *kw_args) {
+    enum { ARG_data, ARG_out_buf, ARG_fmt, ARG_palette, ARG_width, ARG_height, ARG_scale, ARG_viewport };
+    static const mp_arg_t allowed_args[] = {
+        { MP_QSTR_data, MP_ARG_REQUIRED | MP_ARG_OBJ, {.u_obj = MP_OBJ_NULL} },
+        { MP_QSTR_out_buf, MP_ARG_REQUIRED | MP_ARG_OBJ, {.u_obj = MP_OBJ_NULL} },
+        { MP_QSTR_fmt, MP_ARG_INT, {.u_int = CONVERT_RGB565} },
+        { MP_QSTR_palette, MP_ARG_OBJ, {.u_rom_obj = MP_ROM_NONE} },
+        { MP_QSTR_width, MP_ARG_KW_ONLY | MP_ARG_INT, {.u_int = 0} },
+        { MP_QSTR_height, MP_ARG_KW_ONLY | MP_ARG_INT, {.u_int = 0} },
+        { MP_QSTR_scale, MP_ARG_KW_ONLY | MP_ARG_INT, {.u_int = 1} },
+        { MP_QSTR_viewport, MP_ARG_KW_ONLY | MP_ARG_OBJ, {.u_rom_obj = MP_ROM_NONE} },
+    };
+    mp_arg_val_t args[MP_ARRAY_SIZE(allowed_args)];
+    mp_arg_parse_all(n_args, pos_args, kw_args, MP_ARRAY_SIZE(allowed_args), allowed_args, args);
+    
+    // Get WebP data
+    mp_buffer_info_t bufinfo;
+    mp_get_buffer_raise(args[ARG_data].u_obj, &bufinfo, MP_BUFFER_READ);
+    
+    // Get output buffer
+    mp_buffer_info_t outinfo;
+    mp_get_buffer_raise(args[ARG_out_buf].u_obj, &outinfo, MP_BUFFER_WRITE);
+    
+    // Validate output format and geometry
+    webpdec_output_t opts;
+    webpdec_parse_output(&opts, args[ARG_fmt].u_int, args[ARG_palette].u_obj,
+        args[ARG_width].u_int, args[ARG_height].u_int, args[ARG_scale].u_int, args[ARG_viewport].u_obj);
+    
+    #if WEBPDEC_HAVE_LIBWEBP
+    int width, height;
+    
+    // Read canvas size from the headers before decoding anything
+    if (!WebPGetInfo((const uint8_t*)bufinfo.buf, bufinfo.len, &width, &height)) {
+        mp_raise_ValueError(MP_ERROR_TEXT("Invalid WebP data"));
     }
     
-    // Convert RGB888 to RGB565
-    for (int i = 0; i < width * height; i++) {
-        uint8_t r = rgb_data[i * 3 + 0];
-        uint8_t g = rgb_data[i * 3 + 1];
-        uint8_t b = rgb_data[i * 3 + 2];
-        
-        // Pack into RGB565: RRRRR GGGGGG BBBBB
-        uint16_t rgb565 = ((r & 0xF8) << 8) | ((g & 0xFC) << 3) | (b >> 3);
-        
-        // Store as little-endian
-        output[i * 2 + 0] = rgb565 & 0xFF;
-        output[i * 2 + 1] = (rgb565 >> 8) & 0xFF;
+    // Output must hold exactly one frame
+    convert_out_t out;
+    webpdec_init_output(&out, &outinfo, &opts, width, height);
+    
+    // Decode WebP to RGB
+    size_t failures = webpdec_arena_failures();
+    uint8_t* rgb_data = WebPDecodeRGB(
+        (const uint8_t*)bufinfo.buf, 
+        bufinfo.len, 
+        &width, 
+        &height
+    );
+    
+    if (rgb_data == NULL) {
+        webpdec_raise_failed(failures);
     }
     
+    // Convert RGB888 straight into the caller's buffer
+    convert_rows(&out, rgb_data, width * 3, 3, 0, height);
+    
     // Free WebP decode buffer
     WebPFree(rgb_data);
     
-    // Create and return bytearray
-    return mp_obj_new_bytearray_by_ref(output_size, output);
-    */
-    
+    return mp_const_none;
+    #else
     // Placeholder: return error until libwebp is integrated
     mp_raise_NotImplementedError(
         MP_ERROR_TEXT("libwebp not yet integrated - use webpdec.c placeholder version")
     );
+    #endif
+}
+STATIC MP_DEFINE_CONST_FUN_OBJ_KW(webpdec_decode_into_obj, 2, webpdec_decode_into);
+
+/*
+ * Copy an RGB565 frame into a display framebuffer
+ * 
+ * Args:
+ *   dst: writable buffer - framebuffer, e.g. a PicoGraphics object (it
+ *        supports the buffer protocol) or a memoryview slice of one
+ *   src: buffer - little-endian RGB565 pixels, e.g. from decode_into()
+ *   rects: list of (x, y, w, h) - Only copy these regions, e.g. from
+ *          diff() (default None, the whole frame)
+ *   width: int - Frame width in pixels, required with rects
+ * 
+ * The framebuffer format is recognised from its size relative to src:
+ * 4 bytes per pixel is PEN_RGB888, 2 is PEN_RGB565 and 1 is PEN_RGB332.
+ * Slices covering the same pixels blit part of a frame.
+ * 
+ * Returns:
+ *   None
+ */
+STATIC mp_obj_t webpdec_blit(size_t n_args, const mp_obj_t *pos_args, mp_map_t *kw_args) {
+    enum { ARG_dst, ARG_src, ARG_rects, ARG_width };
+    STATIC const mp_arg_t allowed_args[] = {
+        { MP_QSTR_dst, MP_ARG_REQUIRED | MP_ARG_OBJ },
+        { MP_QSTR_src, MP_ARG_REQUIRED | MP_ARG_OBJ },
+        { MP_QSTR_rects, MP_ARG_OBJ, {.u_rom_obj = MP_ROM_NONE} },
+        { MP_QSTR_width, MP_ARG_INT, {.u_int = 0} },
+    };
+    mp_arg_val_t args[MP_ARRAY_SIZE(allowed_args)];
+    mp_arg_parse_all(n_args, pos_args, kw_args, MP_ARRAY_SIZE(allowed_args), allowed_args, args);
+    
+    mp_buffer_info_t dstinfo;
+    mp_get_buffer_raise(args[ARG_dst].u_obj, &dstinfo, MP_BUFFER_WRITE);
+    
+    mp_buffer_info_t srcinfo;
+    mp_get_buffer_raise(args[ARG_src].u_obj, &srcinfo, MP_BUFFER_READ);
+    
+    size_t num_pixels = srcinfo.len / 2;
+    if (num_pixels == 0) {
+        return mp_const_none;
+    }
+    
+    // Work out the framebuffer's pen format from its size
+    int fmt = -1;
+    if (dstinfo.len % num_pixels == 0) {
+        fmt = convert_format_for_bpp(dstinfo.len / num_pixels);
+    }
+    if (fmt < 0) {
+        mp_raise_ValueError(MP_ERROR_TEXT("Unsupported framebuffer format"));
+    }
+    
+    if (args[ARG_rects].u_obj == mp_const_none) {
+        convert_rgb565_to(fmt, srcinfo.buf, dstinfo.buf, num_pixels);
+        return mp_const_none;
+    }
+    
+    // Copy each region a row at a time
+    mp_int_t width = args[ARG_width].u_int;
+    if (width <= 0 || num_pixels % width != 0) {
+        mp_raise_ValueError(MP_ERROR_TEXT("Invalid dimensions"));
+    }
+    mp_int_t height = num_pixels / width;
+    size_t dst_bpp = convert_bytes_per_pixel(fmt);
+    
+    size_t n_rects;
+    mp_obj_t *rects;
+    mp_obj_get_array(args[ARG_rects].u_obj, &n_rects, &rects);
+    for (size_t i = 0; i < n_rects; i++) {
+        mp_obj_t *items;
+        mp_obj_get_array_fixed_n(rects[i], 4, &items);
+        mp_int_t x = mp_obj_get_int(items[0]);
+        mp_int_t y = mp_obj_get_int(items[1]);
+        mp_int_t w = mp_obj_get_int(items[2]);
+        mp_int_t h = mp_obj_get_int(items[3]);
+        if (x < 0 || y < 0 || w < 0 || h < 0 || x + w > width || y + h > height) {
+            mp_raise_ValueError(MP_ERROR_TEXT("Invalid rect"));
+        }
+        for (mp_int_t row = y; row < y + h; row++) {
+            size_t offset = row * width + x;
+            convert_rgb565_to(fmt, (const byte *)srcinfo.buf + offset * 2,
+                (byte *)dstinfo.buf + offset * dst_bpp, w);
+        }
+    }
+    
+    return mp_const_none;
+}
+STATIC MP_DEFINE_CONST_FUN_OBJ_KW(webpdec_blit_obj, 2, webpdec_blit);
+
+/*
+ * Find what changed between two frames
+ * 
+ * Args:
+ *   prev: writable buffer - The frame on the panel; changed pixels are
+ *         copied into it, so it keeps tracking the panel
+ *   cur: buffer - The new frame, the same size as prev
+ *   width: int - Frame width in pixels
+ *   bpp: int - Bytes per pixel (default 2, RGB565)
+ *   max_rects: int - Most boxes to return; the rest are merged into the
+ *              last (default 8)
+ * 
+ * Rows are compared with memcmp, so unchanged frames and mostly static
+ * content cost little more than a memory scan.
+ * 
+ * Returns:
+ *   list - (x, y, w, h) bounding boxes of the changed regions, top to
+ *          bottom; empty if nothing changed
+ */
+STATIC mp_obj_t webpdec_diff(size_t n_args, const mp_obj_t *pos_args, mp_map_t *kw_args) {
+    enum { ARG_prev, ARG_cur, ARG_width, ARG_bpp, ARG_max_rects };
+    STATIC const mp_arg_t allowed_args[] = {
+        { MP_QSTR_prev, MP_ARG_REQUIRED | MP_ARG_OBJ },
+        { MP_QSTR_cur, MP_ARG_REQUIRED | MP_ARG_OBJ },
+        { MP_QSTR_width, MP_ARG_REQUIRED | MP_ARG_INT },
+        { MP_QSTR_bpp, MP_ARG_INT, {.u_int = 2} },
+        { MP_QSTR_max_rects, MP_ARG_KW_ONLY | MP_ARG_INT, {.u_int = 8} },
+    };
+    mp_arg_val_t args[MP_ARRAY_SIZE(allowed_args)];
+    mp_arg_parse_all(n_args, pos_args, kw_args, MP_ARRAY_SIZE(allowed_args), allowed_args, args);
+    
+    mp_buffer_info_t previnfo;
+    mp_get_buffer_raise(args[ARG_prev].u_obj, &previnfo, MP_BUFFER_WRITE);
+    
+    mp_buffer_info_t curinfo;
+    mp_get_buffer_raise(args[ARG_cur].u_obj, &curinfo, MP_BUFFER_READ);
+    
+    mp_int_t width = args[ARG_width].u_int;
+    mp_int_t bpp = args[ARG_bpp].u_int;
+    mp_int_t max_rects = args[ARG_max_rects].u_int;
+    if (width <= 0 || bpp <= 0 || max_rects <= 0 || max_rects > 64 ||
+        curinfo.len % (width * bpp) != 0) {
+        mp_raise_ValueError(MP_ERROR_TEXT("Invalid dimensions"));
+    }
+    if (previnfo.len != curinfo.len) {
+        mp_raise_ValueError(MP_ERROR_TEXT("Frame sizes don't match"));
+    }
+    
+    diff_rect_t rects[64];
+    int count = diff_frames(previnfo.buf, curinfo.buf, width, curinfo.len / (width * bpp),
+        bpp, rects, max_rects);
+    
+    mp_obj_t list = mp_obj_new_list(0, NULL);
+    for (int i = 0; i < count; i++) {
+        mp_obj_t rect[4] = {
+            MP_OBJ_NEW_SMALL_INT(rects[i].x),
+            MP_OBJ_NEW_SMALL_INT(rects[i].y),
+            MP_OBJ_NEW_SMALL_INT(rects[i].w),
+            MP_OBJ_NEW_SMALL_INT(rects[i].h),
+        };
+        mp_obj_list_append(list, mp_obj_new_tuple(4, rect));
+    }
+    return list;
+}
+STATIC MP_DEFINE_CONST_FUN_OBJ_KW(webpdec_diff_obj, 3, webpdec_diff);
+
+/*
+ * Read a WebP file's headers without decoding it
+ * 
+ * Args:
+ *   data: bytes - WebP image data; only the chunk headers are read
+ * 
+ * Cheap enough to call on every payload before choosing buffers or the
+ * animation path. A truncated file still reports what its headers say;
+ * size larger than len(data) shows that some of it is missing.
+ * 
+ * Returns:
+ *   dict - width, height, animated, frames, loop_count, lossless,
+ *          alpha and size (the whole file in bytes)
+ */
+STATIC mp_obj_t webpdec_info(mp_obj_t data_obj) {
+    mp_buffer_info_t bufinfo;
+    mp_get_buffer_raise(data_obj, &bufinfo, MP_BUFFER_READ);
+    
+    webp_info_t info;
+    if (!webp_get_info(bufinfo.buf, bufinfo.len, &info)) {
+        mp_raise_ValueError(MP_ERROR_TEXT("Invalid WebP data"));
+    }
+    
+    mp_obj_t dict = mp_obj_new_dict(8);
+    mp_obj_dict_store(dict, MP_OBJ_NEW_QSTR(MP_QSTR_width), MP_OBJ_NEW_SMALL_INT(info.width));
+    mp_obj_dict_store(dict, MP_OBJ_NEW_QSTR(MP_QSTR_height), MP_OBJ_NEW_SMALL_INT(info.height));
+    mp_obj_dict_store(dict, MP_OBJ_NEW_QSTR(MP_QSTR_animated), mp_obj_new_bool(info.animated));
+    mp_obj_dict_store(dict, MP_OBJ_NEW_QSTR(MP_QSTR_frames), MP_OBJ_NEW_SMALL_INT(info.frame_count));
+    mp_obj_dict_store(dict, MP_OBJ_NEW_QSTR(MP_QSTR_loop_count), MP_OBJ_NEW_SMALL_INT(info.loop_count));
+    mp_obj_dict_store(dict, MP_OBJ_NEW_QSTR(MP_QSTR_lossless), mp_obj_new_bool(info.lossless));
+    mp_obj_dict_store(dict, MP_OBJ_NEW_QSTR(MP_QSTR_alpha), mp_obj_new_bool(info.alpha));
+    mp_obj_dict_store(dict, MP_OBJ_NEW_QSTR(MP_QSTR_size), mp_obj_new_int_from_uint(info.file_size));
+    return dict;
+}
+STATIC MP_DEFINE_CONST_FUN_OBJ_1(webpdec_info_obj, webpdec_info);
+
+/*
+ * Report how much of the decoder's memory arena is in use
+ * 
+ * Args:
+ *   reset: bool - Start a new high-water mark afterwards (default False)
+ * 
+ * All of libwebp's working memory comes from one fixed arena, so the
+ * numbers here are the whole of the decoder's footprint. Use peak to
+ * size WEBPDEC_ARENA_SIZE for the panels and content in use.
+ * 
+ * Returns:
+ *   dict - size, used and peak in bytes, and failed, the number of
+ *          allocations refused for lack of space
+ */
+STATIC mp_obj_t webpdec_arena_info(size_t n_args, const mp_obj_t *pos_args, mp_map_t *kw_args) {
+    enum { ARG_reset };
+    STATIC const mp_arg_t allowed_args[] = {
+        { MP_QSTR_reset, MP_ARG_BOOL, {.u_bool = false} },
+    };
+    mp_arg_val_t args[MP_ARRAY_SIZE(allowed_args)];
+    mp_arg_parse_all(n_args, pos_args, kw_args, MP_ARRAY_SIZE(allowed_args), allowed_args, args);
+    
+    webpdec_arena_stats_t stats;
+    webpdec_arena_get_stats(&stats);
+    if (args[ARG_reset].u_bool) {
+        webpdec_arena_reset_peak();
+    }
+    
+    mp_obj_t dict = mp_obj_new_dict(4);
+    mp_obj_dict_store(dict, MP_OBJ_NEW_QSTR(MP_QSTR_size), mp_obj_new_int_from_uint(stats.size));
+    mp_obj_dict_store(dict, MP_OBJ_NEW_QSTR(MP_QSTR_used), mp_obj_new_int_from_uint(stats.used));
+    mp_obj_dict_store(dict, MP_OBJ_NEW_QSTR(MP_QSTR_peak), mp_obj_new_int_from_uint(stats.peak));
+    mp_obj_dict_store(dict, MP_OBJ_NEW_QSTR(MP_QSTR_failed), mp_obj_new_int_from_uint(stats.failed));
+    return dict;
+}
+STATIC MP_DEFINE_CONST_FUN_OBJ_KW(webpdec_arena_info_obj, 0, webpdec_arena_info);
+
+// Read a float or an (r, g, b) tuple of floats; None leaves the default
+STATIC void webpdec_get_channels(mp_obj_t obj, float channels[3]) {
+    if (obj == mp_const_none) {
+        return;
+    }
+    if (mp_obj_is_type(obj, &mp_type_tuple) || mp_obj_is_type(obj, &mp_type_list)) {
+        mp_obj_t *items;
+        mp_obj_get_array_fixed_n(obj, 3, &items);
+        for (int i = 0; i < 3; i++) {
+            channels[i] = (float)mp_obj_get_float(items[i]);
+        }
+    } else {
+        channels[0] = channels[1] = channels[2] = (float)mp_obj_get_float(obj);
+    }
+}
+
+/*
+ * Set the gamma and brightness correction applied to every decode
+ * 
+ * Args:
+ *   gamma: float or (r, g, b) - Gamma exponent per channel (default 1.0)
+ *   brightness: float or (r, g, b) - Scale per channel, 0.0-1.0 (default 1.0)
+ *   dither: int - DITHER_NONE (default), DITHER_ORDERED or DITHER_TEMPORAL;
+ *           applies to FMT_RGB565, FMT_RGB565_BE and FMT_RGB332
+ * 
+ * The lookup table is rebuilt here, once, so the conversion loops only
+ * do a table load per channel. It stays in effect until changed, also
+ * for decoders that are already open.
+ * 
+ * Returns:
+ *   None
+ */
+STATIC mp_obj_t webpdec_set_correction(size_t n_args, const mp_obj_t *pos_args, mp_map_t *kw_args) {
+    enum { ARG_gamma, ARG_brightness, ARG_dither };
+    static const mp_arg_t allowed_args[] = {
+        { MP_QSTR_gamma, MP_ARG_OBJ, {.u_rom_obj = MP_ROM_NONE} },
+        { MP_QSTR_brightness, MP_ARG_OBJ, {.u_rom_obj = MP_ROM_NONE} },
+        { MP_QSTR_dither, MP_ARG_INT, {.u_int = CONVERT_DITHER_NONE} },
+    };
+    mp_arg_val_t args[MP_ARRAY_SIZE(allowed_args)];
+    mp_arg_parse_all(n_args, pos_args, kw_args, MP_ARRAY_SIZE(allowed_args), allowed_args, args);
+    
+    float gamma[3] = { 1.0f, 1.0f, 1.0f };
+    float brightness[3] = { 1.0f, 1.0f, 1.0f };
+    webpdec_get_channels(args[ARG_gamma].u_obj, gamma);
+    webpdec_get_channels(args[ARG_brightness].u_obj, brightness);
+    
+    for (int i = 0; i < 3; i++) {
+        if (gamma[i] <= 0.0f || brightness[i] < 0.0f) {
+            mp_raise_ValueError(MP_ERROR_TEXT("Invalid correction"));
+        }
+    }
+    
+    mp_int_t dither = args[ARG_dither].u_int;
+    if (dither < CONVERT_DITHER_NONE || dither > CONVERT_DITHER_TEMPORAL) {
+        mp_raise_ValueError(MP_ERROR_TEXT("Invalid dither mode"));
+    }
+    
+    convert_lut_set(gamma, brightness, dither);
+    return mp_const_none;
+}
+STATIC MP_DEFINE_CONST_FUN_OBJ_KW(webpdec_set_correction_obj, 0, webpdec_set_correction);
+
+#if WEBPDEC_HAVE_LIBWEBP
+/*
+ * Animation decoder
+ * 
+ * Wraps libwebp's WebPAnimDecoder, which keeps the composited RGBA canvas;
+ * each step converts the canvas into a single output frame buffer.
+ * Still images play as a single frame with a duration of 0.
+ * 
+ * Usage:
+ *   anim = webpdec.Animation(data, out_buf=None, fmt=FMT_RGB565, palette=None,
+ *                            width=0, height=0, scale=1, viewport=None)
+ *   for frame_view, duration_ms in anim: ...
+ *   anim.rewind()  # start the next loop
+ */
+typedef struct _webpdec_animation_obj_t {
+    mp_obj_base_t base;
+    mp_obj_t data_obj;      // Keeps the WebP payload alive for the decoder
+    mp_obj_t out_obj;       // Keeps the output buffer alive
+    mp_obj_t palette_obj;   // Keeps the P8 palette alive
+    mp_obj_t frame_view;    // memoryview over the output, yielded every step
+    convert_out_t out;      // Output stage (caller's out_buf or owned)
+    WebPAnimDecoder *dec;
+    mp_int_t width;
+    mp_int_t height;
+    mp_int_t frame_count;
+    mp_int_t loop_count;
+    int timestamp;          // End timestamp of the previous frame
+} webpdec_animation_obj_t;
+
+STATIC mp_obj_t webpdec_animation_make_new(const mp_obj_type_t *type, size_t n_args, size_t n_kw, const mp_obj_t *all_args) {
+    enum { ARG_data, ARG_out_buf, ARG_fmt, ARG_palette, ARG_width, ARG_height, ARG_scale, ARG_viewport };
+    static const mp_arg_t allowed_args[] = {
+        { MP_QSTR_data, MP_ARG_REQUIRED | MP_ARG_OBJ, {.u_obj = MP_OBJ_NULL} },
+        { MP_QSTR_out_buf, MP_ARG_OBJ, {.u_rom_obj = MP_ROM_NONE} },
+        { MP_QSTR_fmt, MP_ARG_INT, {.u_int = CONVERT_RGB565} },
+        { MP_QSTR_palette, MP_ARG_OBJ, {.u_rom_obj = MP_ROM_NONE} },
+        { MP_QSTR_width, MP_ARG_KW_ONLY | MP_ARG_INT, {.u_int = 0} },
+        { MP_QSTR_height, MP_ARG_KW_ONLY | MP_ARG_INT, {.u_int = 0} },
+        { MP_QSTR_scale, MP_ARG_KW_ONLY | MP_ARG_INT, {.u_int = 1} },
+        { MP_QSTR_viewport, MP_ARG_KW_ONLY | MP_ARG_OBJ, {.u_rom_obj = MP_ROM_NONE} },
+    };
+    mp_arg_val_t args[MP_ARRAY_SIZE(allowed_args)];
+    mp_arg_parse_all_kw_array(n_args, n_kw, all_args, MP_ARRAY_SIZE(allowed_args), allowed_args, args);
+    
+    // Get WebP data
+    mp_buffer_info_t bufinfo;
+    mp_get_buffer_raise(args[ARG_data].u_obj, &bufinfo, MP_BUFFER_READ);
+    
+    // Validate output format and geometry
+    webpdec_output_t opts;
+    webpdec_parse_output(&opts, args[ARG_fmt].u_int, args[ARG_palette].u_obj,
+        args[ARG_width].u_int, args[ARG_height].u_int, args[ARG_scale].u_int, args[ARG_viewport].u_obj);
+    
+    webpdec_animation_obj_t *self = mp_obj_malloc_with_finaliser(webpdec_animation_obj_t, type);
+    self->data_obj = args[ARG_data].u_obj;
+    self->palette_obj = args[ARG_palette].u_obj;
+    self->dec = NULL;
+    self->timestamp = 0;
+    
+    WebPAnimDecoderOptions options;
+    WebPAnimDecoderOptionsInit(&options);
+    options.color_mode = MODE_RGBA;
+    options.use_threads = 0;
+    
+    WebPData webp_data = { (const uint8_t*)bufinfo.buf, bufinfo.len };
+    size_t failures = webpdec_arena_failures();
+    self->dec = WebPAnimDecoderNew(&webp_data, &options);
+    if (self->dec == NULL) {
+        webpdec_raise_failed(failures);
+    }
+    
+    WebPAnimInfo info;
+    WebPAnimDecoderGetInfo(self->dec, &info);
+    self->width = info.canvas_width;
+    self->height = info.canvas_height;
+    self->frame_count = info.frame_count;
+    self->loop_count = info.loop_count;
+    size_t frame_size = webpdec_frame_size(&opts, self->width, self->height);
+    
+    // Render into the caller's buffer if given, else allocate one once
+    self->out_obj = args[ARG_out_buf].u_obj;
+    mp_buffer_info_t outinfo;
+    if (self->out_obj != mp_const_none) {
+        mp_get_buffer_raise(self->out_obj, &outinfo, MP_BUFFER_WRITE);
+    } else {
+        outinfo.buf = m_new(byte, frame_size);
+        outinfo.len = frame_size;
+    }
+    webpdec_init_output(&self->out, &outinfo, &opts, self->width, self->height);
+    self->frame_view = mp_obj_new_memoryview('B', frame_size, outinfo.buf);
+    
+    return MP_OBJ_FROM_PTR(self);
+}
+
+/*
+ * Decode the next frame
+ * 
+ * Returns:
+ *   tuple - (frame_view, duration_ms); the view is reused for every frame.
+ *   Stops after the last frame; call rewind() to play the next loop.
+ */
+STATIC mp_obj_t webpdec_animation_iternext(mp_obj_t self_in) {
+    webpdec_animation_obj_t *self = MP_OBJ_TO_PTR(self_in);
+    
+    if (self->dec == NULL || !WebPAnimDecoderHasMoreFrames(self->dec)) {
+        return MP_OBJ_STOP_ITERATION;
+    }
+    
+    uint8_t *canvas;
+    int timestamp;
+    size_t failures = webpdec_arena_failures();
+    if (!WebPAnimDecoderGetNext(self->dec, &canvas, &timestamp)) {
+        webpdec_raise_failed(failures);
+    }
+    
+    convert_out_next_frame(&self->out);
+    convert_rows(&self->out, canvas, self->width * 4, 4, self->out.src_y,
+        self->out.src_y + self->out.rows);
+    
+    mp_int_t duration_ms = timestamp - self->timestamp;
+    self->timestamp = timestamp;
+    
+    mp_obj_t items[2] = { self->frame_view, mp_obj_new_int(duration_ms) };
+    return mp_obj_new_tuple(2, items);
+}
+
+/*
+ * Restart from the first frame
+ */
+STATIC mp_obj_t webpdec_animation_rewind(mp_obj_t self_in) {
+    webpdec_animation_obj_t *self = MP_OBJ_TO_PTR(self_in);
+    
+    if (self->dec != NULL) {
+        WebPAnimDecoderReset(self->dec);
+    }
+    self->timestamp = 0;
+    return mp_const_none;
+}
+STATIC MP_DEFINE_CONST_FUN_OBJ_1(webpdec_animation_rewind_obj, webpdec_animation_rewind);
+
+/*
+ * Free the libwebp decoder and its canvas (also run by the finaliser)
+ */
+STATIC mp_obj_t webpdec_animation_close(mp_obj_t self_in) {
+    webpdec_animation_obj_t *self = MP_OBJ_TO_PTR(self_in);
+    
+    if (self->dec != NULL) {
+        WebPAnimDecoderDelete(self->dec);
+        self->dec = NULL;
+    }
+    return mp_const_none;
+}
+STATIC MP_DEFINE_CONST_FUN_OBJ_1(webpdec_animation_close_obj, webpdec_animation_close);
+
+// Read-only attributes: width, height, frame_count, loop_count
+STATIC void webpdec_animation_attr(mp_obj_t self_in, qstr attr, mp_obj_t *dest) {
+    webpdec_animation_obj_t *self = MP_OBJ_TO_PTR(self_in);
+    
+    if (dest[0] != MP_OBJ_NULL) {
+        return;
+    }
+    if (attr == MP_QSTR_width) {
+        dest[0] = MP_OBJ_NEW_SMALL_INT(self->width);
+    } else if (attr == MP_QSTR_height) {
+        dest[0] = MP_OBJ_NEW_SMALL_INT(self->height);
+    } else if (attr == MP_QSTR_frame_count) {
+        dest[0] = MP_OBJ_NEW_SMALL_INT(self->frame_count);
+    } else if (attr == MP_QSTR_loop_count) {
+        dest[0] = MP_OBJ_NEW_SMALL_INT(self->loop_count);
+    } else {
+        // Continue lookup in locals_dict
+        dest[1] = MP_OBJ_SENTINEL;
+    }
+}
+
+STATIC const mp_rom_map_elem_t webpdec_animation_locals_dict_table[] = {
+    { MP_ROM_QSTR(MP_QSTR_rewind), MP_ROM_PTR(&webpdec_animation_rewind_obj) },
+    { MP_ROM_QSTR(MP_QSTR_close), MP_ROM_PTR(&webpdec_animation_close_obj) },
+    { MP_ROM_QSTR(MP_QSTR___del__), MP_ROM_PTR(&webpdec_animation_close_obj) },
+};
+STATIC MP_DEFINE_CONST_DICT(webpdec_animation_locals_dict, webpdec_animation_locals_dict_table);
+
+STATIC MP_DEFINE_CONST_OBJ_TYPE(
+    webpdec_animation_type,
+    MP_QSTR_Animation,
+    MP_TYPE_FLAG_ITER_IS_ITERNEXT,
+    make_new, webpdec_animation_make_new,
+    attr, webpdec_animation_attr,
+    iter, webpdec_animation_iternext,
+    locals_dict, &webpdec_animation_locals_dict
+    );
+/*
+ * Streaming decoder
+ * 
+ * Wraps libwebp's incremental decoder (WebPIDecoder). Pieces of the
+ * payload are appended as they arrive from the socket and every row that
+ * libwebp has finished is converted into out_buf straight away, so
+ * decoding overlaps the download. Animated files are not supported by
+ * the incremental decoder; use Animation for those.
+ * 
+ * Usage:
+ *   dec = webpdec.StreamDecoder(out_buf, fmt=FMT_RGB565, palette=None,
+ *                               width=0, height=0, scale=1, viewport=None)
+ *   rows = dec.feed(chunk)   # rows of out_buf that are final so far
+ *   dec.done                 # True once the whole image is decoded
+ *   dec.reset()              # reuse for the next payload
+ */
+typedef struct _webpdec_stream_obj_t {
+    mp_obj_base_t base;
+    mp_obj_t out_obj;       // Keeps the output buffer alive
+    mp_obj_t palette_obj;   // Keeps the P8 palette alive
+    webpdec_output_t opts;  // Format and geometry for the output stage
+    convert_out_t out;      // Output stage, set up once the size is known
+    WebPIDecoder *idec;
+    mp_int_t width;         // 0 until the headers have arrived
+    mp_int_t height;
+    mp_int_t rows;          // Source rows written to out so far
+    bool done;
+} webpdec_stream_obj_t;
+
+STATIC mp_obj_t webpdec_stream_reset(mp_obj_t self_in);
+
+// Rows of out_buf that are final, which differs from the source rows
+// decoded once the image is scaled or cropped
+STATIC mp_obj_t webpdec_stream_rows(webpdec_stream_obj_t *self) {
+    if (self->width == 0) {
+        return MP_OBJ_NEW_SMALL_INT(0);
+    }
+    return MP_OBJ_NEW_SMALL_INT(convert_out_rows_done(&self->out, self->rows));
+}
+
+STATIC mp_obj_t webpdec_stream_make_new(const mp_obj_type_t *type, size_t n_args, size_t n_kw, const mp_obj_t *all_args) {
+    enum { ARG_out_buf, ARG_fmt, ARG_palette, ARG_width, ARG_height, ARG_scale, ARG_viewport };
+    static const mp_arg_t allowed_args[] = {
+        { MP_QSTR_out_buf, MP_ARG_REQUIRED | MP_ARG_OBJ, {.u_obj = MP_OBJ_NULL} },
+        { MP_QSTR_fmt, MP_ARG_INT, {.u_int = CONVERT_RGB565} },
+        { MP_QSTR_palette, MP_ARG_OBJ, {.u_rom_obj = MP_ROM_NONE} },
+        { MP_QSTR_width, MP_ARG_KW_ONLY | MP_ARG_INT, {.u_int = 0} },
+        { MP_QSTR_height, MP_ARG_KW_ONLY | MP_ARG_INT, {.u_int = 0} },
+        { MP_QSTR_scale, MP_ARG_KW_ONLY | MP_ARG_INT, {.u_int = 1} },
+        { MP_QSTR_viewport, MP_ARG_KW_ONLY | MP_ARG_OBJ, {.u_rom_obj = MP_ROM_NONE} },
+    };
+    mp_arg_val_t args[MP_ARRAY_SIZE(allowed_args)];
+    mp_arg_parse_all_kw_array(n_args, n_kw, all_args, MP_ARRAY_SIZE(allowed_args), allowed_args, args);
+    
+    // Check the buffer and format up front; the size is checked once known
+    mp_buffer_info_t outinfo;
+    mp_get_buffer_raise(args[ARG_out_buf].u_obj, &outinfo, MP_BUFFER_WRITE);
+    webpdec_output_t opts;
+    webpdec_parse_output(&opts, args[ARG_fmt].u_int, args[ARG_palette].u_obj,
+        args[ARG_width].u_int, args[ARG_height].u_int, args[ARG_scale].u_int, args[ARG_viewport].u_obj);
+    
+    webpdec_stream_obj_t *self = mp_obj_malloc_with_finaliser(webpdec_stream_obj_t, type);
+    self->out_obj = args[ARG_out_buf].u_obj;
+    self->palette_obj = args[ARG_palette].u_obj;
+    self->opts = opts;
+    self->idec = NULL;
+    webpdec_stream_reset(MP_OBJ_FROM_PTR(self));
+    
+    return MP_OBJ_FROM_PTR(self);
+}
+
+/*
+ * Feed the next piece of the WebP payload
+ * 
+ * Args:
+ *   chunk: bytes/bytearray/memoryview - next bytes of the file
+ * 
+ * Returns:
+ *   int - number of rows of out_buf decoded so far
+ */
+STATIC mp_obj_t webpdec_stream_feed(mp_obj_t self_in, mp_obj_t chunk_obj) {
+    webpdec_stream_obj_t *self = MP_OBJ_TO_PTR(self_in);
+    
+    mp_buffer_info_t bufinfo;
+    mp_get_buffer_raise(chunk_obj, &bufinfo, MP_BUFFER_READ);
+    
+    if (self->done || self->idec == NULL) {
+        return webpdec_stream_rows(self);
+    }
+    
+    size_t failures = webpdec_arena_failures();
+    VP8StatusCode status = WebPIAppend(self->idec, (const uint8_t*)bufinfo.buf, bufinfo.len);
+    if (status != VP8_STATUS_OK && status != VP8_STATUS_SUSPENDED) {
+        webpdec_raise_failed(failures);
+    }
+    
+    int last_y, width, height, stride;
+    const uint8_t *rgb_data = WebPIDecGetRGB(self->idec, &last_y, &width, &height, &stride);
+    if (rgb_data == NULL) {
+        // Headers not complete yet
+        return MP_OBJ_NEW_SMALL_INT(0);
+    }
+    
+    if (self->width == 0) {
+        mp_buffer_info_t outinfo;
+        mp_get_buffer_raise(self->out_obj, &outinfo, MP_BUFFER_WRITE);
+        webpdec_init_output(&self->out, &outinfo, &self->opts, width, height);
+        self->width = width;
+        self->height = height;
+    }
+    
+    // Convert the rows libwebp has finished since the last call
+    convert_rows(&self->out, rgb_data, stride, 3, self->rows, last_y);
+    if (last_y > self->rows) {
+        self->rows = last_y;
+    }
+    self->done = (status == VP8_STATUS_OK);
+    
+    return webpdec_stream_rows(self);
 }
-STATIC MP_DEFINE_CONST_FUN_OBJ_3(webpdec_decode_obj, webpdec_decode);
+STATIC MP_DEFINE_CONST_FUN_OBJ_2(webpdec_stream_feed_obj, webpdec_stream_feed);
+
+/*
+ * Forget the current payload so the decoder can take the next one
+ */
+STATIC mp_obj_t webpdec_stream_reset(mp_obj_t self_in) {
+    webpdec_stream_obj_t *self = MP_OBJ_TO_PTR(self_in);
+    
+    if (self->idec != NULL) {
+        WebPIDelete(self->idec);
+    }
+    
+    // RGB output into memory owned by libwebp, converted row by row
+    self->idec = WebPINewRGB(MODE_RGB, NULL, 0, 0);
+    if (self->idec == NULL) {
+        mp_raise_msg(&mp_type_MemoryError, MP_ERROR_TEXT("Cannot allocate decoder"));
+    }
+    self->width = 0;
+    self->height = 0;
+    self->rows = 0;
+    self->done = false;
+    return mp_const_none;
+}
+STATIC MP_DEFINE_CONST_FUN_OBJ_1(webpdec_stream_reset_obj, webpdec_stream_reset);
+
+/*
+ * Free the libwebp decoder (also run by the finaliser)
+ */
+STATIC mp_obj_t webpdec_stream_close(mp_obj_t self_in) {
+    webpdec_stream_obj_t *self = MP_OBJ_TO_PTR(self_in);
+    
+    if (self->idec != NULL) {
+        WebPIDelete(self->idec);
+        self->idec = NULL;
+    }
+    return mp_const_none;
+}
+STATIC MP_DEFINE_CONST_FUN_OBJ_1(webpdec_stream_close_obj, webpdec_stream_close);
+
+// Read-only attributes: width, height, rows, done
+STATIC void webpdec_stream_attr(mp_obj_t self_in, qstr attr, mp_obj_t *dest) {
+    webpdec_stream_obj_t *self = MP_OBJ_TO_PTR(self_in);
+    
+    if (dest[0] != MP_OBJ_NULL) {
+        return;
+    }
+    if (attr == MP_QSTR_width) {
+        dest[0] = MP_OBJ_NEW_SMALL_INT(self->width);
+    } else if (attr == MP_QSTR_height) {
+        dest[0] = MP_OBJ_NEW_SMALL_INT(self->height);
+    } else if (attr == MP_QSTR_rows) {
+        dest[0] = webpdec_stream_rows(self);
+    } else if (attr == MP_QSTR_done) {
+        dest[0] = mp_obj_new_bool(self->done);
+    } else {
+        // Continue lookup in locals_dict
+        dest[1] = MP_OBJ_SENTINEL;
+    }
+}
+
+STATIC const mp_rom_map_elem_t webpdec_stream_locals_dict_table[] = {
+    { MP_ROM_QSTR(MP_QSTR_feed), MP_ROM_PTR(&webpdec_stream_feed_obj) },
+    { MP_ROM_QSTR(MP_QSTR_reset), MP_ROM_PTR(&webpdec_stream_reset_obj) },
+    { MP_ROM_QSTR(MP_QSTR_close), MP_ROM_PTR(&webpdec_stream_close_obj) },
+    { MP_ROM_QSTR(MP_QSTR___del__), MP_ROM_PTR(&webpdec_stream_close_obj) },
+};
+STATIC MP_DEFINE_CONST_DICT(webpdec_stream_locals_dict, webpdec_stream_locals_dict_table);
+
+STATIC MP_DEFINE_CONST_OBJ_TYPE(
+    webpdec_stream_type,
+    MP_QSTR_StreamDecoder,
+    MP_TYPE_FLAG_NONE,
+    make_new, webpdec_stream_make_new,
+    attr, webpdec_stream_attr,
+    locals_dict, &webpdec_stream_locals_dict
+    );
+#endif
 
 // Module version info
 STATIC mp_obj_t webpdec_version(void) {
@@ -112,7 +1030,29 @@ STATIC MP_DEFINE_CONST_FUN_OBJ_0(webpdec_version_obj, webpdec_version);
 STATIC const mp_rom_map_elem_t webpdec_module_globals_table[] = {
     { MP_ROM_QSTR(MP_QSTR___name__), MP_ROM_QSTR(MP_QSTR_webpdec) },
     { MP_ROM_QSTR(MP_QSTR_decode), MP_ROM_PTR(&webpdec_decode_obj) },
+    { MP_ROM_QSTR(MP_QSTR_decode_into), MP_ROM_PTR(&webpdec_decode_into_obj) },
+    { MP_ROM_QSTR(MP_QSTR_info), MP_ROM_PTR(&webpdec_info_obj) },
+    { MP_ROM_QSTR(MP_QSTR_arena_info), MP_ROM_PTR(&webpdec_arena_info_obj) },
+    { MP_ROM_QSTR(MP_QSTR_blit), MP_ROM_PTR(&webpdec_blit_obj) },
+    { MP_ROM_QSTR(MP_QSTR_diff), MP_ROM_PTR(&webpdec_diff_obj) },
+    { MP_ROM_QSTR(MP_QSTR_set_correction), MP_ROM_PTR(&webpdec_set_correction_obj) },
+    #if WEBPDEC_HAVE_LIBWEBP
+    { MP_ROM_QSTR(MP_QSTR_Animation), MP_ROM_PTR(&webpdec_animation_type) },
+    { MP_ROM_QSTR(MP_QSTR_StreamDecoder), MP_ROM_PTR(&webpdec_stream_type) },
+    #endif
     { MP_ROM_QSTR(MP_QSTR_version), MP_ROM_PTR(&webpdec_version_obj) },
+    
+    // Output formats (PicoGraphics pen types)
+    { MP_ROM_QSTR(MP_QSTR_FMT_RGB565), MP_ROM_INT(CONVERT_RGB565) },
+    { MP_ROM_QSTR(MP_QSTR_FMT_RGB565_BE), MP_ROM_INT(CONVERT_RGB565_BE) },
+    { MP_ROM_QSTR(MP_QSTR_FMT_RGB888), MP_ROM_INT(CONVERT_RGB888) },
+    { MP_ROM_QSTR(MP_QSTR_FMT_RGB332), MP_ROM_INT(CONVERT_RGB332) },
+    { MP_ROM_QSTR(MP_QSTR_FMT_P8), MP_ROM_INT(CONVERT_P8) },
+    
+    // Dither modes for set_correction()
+    { MP_ROM_QSTR(MP_QSTR_DITHER_NONE), MP_ROM_INT(CONVERT_DITHER_NONE) },
+    { MP_ROM_QSTR(MP_QSTR_DITHER_ORDERED), MP_ROM_INT(CONVERT_DITHER_ORDERED) },
+    { MP_ROM_QSTR(MP_QSTR_DITHER_TEMPORAL), MP_ROM_INT(CONVERT_DITHER_TEMPORAL) },
 };
 STATIC MP_DEFINE_CONST_DICT(webpdec_module_globals, webpdec_module_globals_table);
 